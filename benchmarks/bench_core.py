@@ -0,0 +1,163 @@
+"""Benchmarks of the core hot paths."""
+
+import collections
+import itertools
+import json
+import random
+
+from harness import benchmark
+
+from i3pystatus.core import Status
+from i3pystatus.core.color import color_range
+from i3pystatus.core.io import IOHandler, JSONIO
+from i3pystatus.core.modules import Module
+from i3pystatus.core.threading import Job, Scheduler, WorkloadWrapper
+from i3pystatus.core.util import FormatTemplate, Graph, formatp, make_graph, partition
+
+MODULE_COUNTS = (1, 10, 100, 500)
+
+
+class Block(Module):
+    """A module with a typical output block."""
+
+    def __init__(self, n):
+        super().__init__()
+        self.output = {
+            "full_text": "block {} 42.0%".format(n),
+            "color": "#00FF00",
+            "urgent": False,
+        }
+
+
+def blocks(count):
+    return [Block(n) for n in range(count)]
+
+
+FORMATS = {
+    "simple": ("{status} {percentage:.2f}%", {}),
+    "battery": ("{status}[ {percentage:.2f}%][ {remaining}][ {consumption:.1f}W]", {"remaining": ""}),
+    "nested": ("[{artist}[ - {title}[ ({album})]]] [{song_elapsed}/{song_length}]", {"album": ""}),
+}
+
+
+@benchmark("formatp", ("simple", "battery", "nested"))
+def bench_formatp(style):
+    """Rendering a format string (parsed once and cached)."""
+    fmt, overrides = FORMATS[style]
+    kwargs = dict(status="BAT", percentage=42.123, remaining="1:23", consumption=9.81,
+                  artist="Artist", title="Title", album="Album", song_elapsed="1:00", song_length="3:00")
+    kwargs.update(overrides)
+    return lambda: formatp(fmt, **kwargs)
+
+
+@benchmark("formatp_compile", ("simple", "battery", "nested"))
+def bench_formatp_compile(style):
+    """Parsing a format string, i.e. the cost of a cache miss."""
+    fmt, _ = FORMATS[style]
+    return lambda: FormatTemplate(fmt)
+
+
+@benchmark("make_graph", ("blocks", "braille-fill", "braille-peak", "braille-snake"))
+def bench_make_graph(style):
+    rng = random.Random(0)
+    values = [rng.uniform(0, 100) for _ in range(60)]
+    return lambda: make_graph(values, 0.0, 100.0, style)
+
+
+@benchmark("graph_push", ("blocks", "braille-fill", "braille-peak", "braille-snake"))
+def bench_graph_push(style):
+    """Adding a value to a 60 values wide graph and drawing it, as graph modules do on every update."""
+    rng = random.Random(0)
+    values = itertools.cycle([rng.uniform(0, 100) for _ in range(61)])
+    graph = Graph(60, 0.0, 100.0, style)
+
+    def push():
+        graph.push(next(values))
+        return graph.draw()
+    return push
+
+
+@benchmark("inject", MODULE_COUNTS)
+def bench_inject(count):
+    modules = blocks(count)
+
+    def inject():
+        line = []
+        for module in modules:
+            module.inject(line)
+        return json.dumps(line)
+    return inject
+
+
+@benchmark("render_frame", MODULE_COUNTS)
+def bench_render_frame(count):
+    """Standalone mode status line with one module changing per frame."""
+    status = Status(standalone=False)
+    for module in blocks(count):
+        status.register(module)
+    modules = list(status.modules)
+    counter = iter(range(10 ** 12))
+
+    def render():
+        module = modules[next(counter) % len(modules)]
+        module.output = dict(module.output, full_text=str(next(counter)))
+        return status.render_frame()
+    return render
+
+
+@benchmark("parse_line", MODULE_COUNTS)
+def bench_parse_line(count):
+    """Chained mode: one line of i3status output with `count` blocks."""
+    jsonio = JSONIO(IOHandler(out=NullFile()), skiplines=0)
+    line = "," + json.dumps([{"name": "block", "instance": str(n), "full_text": "block {}".format(n)}
+                             for n in range(count)])
+
+    def parse():
+        with jsonio.parse_line(line):
+            pass
+    return parse
+
+
+@benchmark("click_event")
+def bench_click_event():
+    jsonio = JSONIO(IOHandler(out=NullFile()), skiplines=0, echo=False)
+    line = ',{"name":"i3pystatus.clock.Clock","instance":"140584102960080","button":1,"x":1650,"y":12}'
+
+    def parse():
+        with jsonio.parse_line(line):
+            pass
+    return parse
+
+
+@benchmark("partition", MODULE_COUNTS)
+def bench_partition(count):
+    rng = random.Random(0)
+    costs = [rng.uniform(0, 0.1) for _ in range(count)]
+    return lambda: partition(list(costs), 0.5)
+
+
+@benchmark("scheduler_load", MODULE_COUNTS)
+def bench_scheduler_load(count):
+    """The scheduler's worker pool sizing, run on every rebalance."""
+    rng = random.Random(0)
+    scheduler = Scheduler()
+    for _ in range(count):
+        workload = WorkloadWrapper(lambda: None)
+        workload.ewma = rng.uniform(0, 0.1)
+        workload.samples = collections.deque(rng.uniform(0, 0.1) for _ in range(workload.window))
+        scheduler.jobs.append(Job(workload, rng.choice((1, 5, 60))))
+    return scheduler.load
+
+
+@benchmark("color_range", (10, 100, 1000))
+def bench_color_range(quantity):
+    """Computing a gradient between hex colors, i.e. the cost of a cache miss."""
+    return lambda: color_range.__wrapped__("#00FF00", "#FF0000", quantity)
+
+
+class NullFile:
+    def write(self, data):
+        pass
+
+    def flush(self):
+        pass
@@ -0,0 +1,82 @@
+"""Benchmarks of modules whose updates are expensive."""
+
+import os
+import random
+import tempfile
+
+from harness import Skip, benchmark
+
+
+@benchmark("cpu_usage", (1, 3))
+def bench_cpu_usage(count):
+    """One tick of `count` CPU modules (usage, bar and graph) sharing the /proc/stat sampler."""
+    if not os.path.exists("/proc/stat"):
+        raise Skip("No /proc/stat")
+    from i3pystatus import cpu_usage, cpu_usage_bar, cpu_usage_graph
+    modules = [cpu_usage.CpuUsage(), cpu_usage_bar.CpuUsageBar(), cpu_usage_graph.CpuUsageGraph()][:count]
+
+    def tick():
+        # A new tick: the sample is out of date
+        cpu_usage.proc_stat.sample = None
+        for module in modules:
+            module.run()
+    return tick
+
+
+def fake_proc_stat(cores):
+    """A ProcStat reading a /proc/stat of `cores` cores, with a different load on every read."""
+    from i3pystatus.cpu_usage import ProcStat
+    path = os.path.join(tempfile.mkdtemp(), "stat")
+    rng = random.Random(0)
+    stat = ProcStat(path)
+    times = [[0, 0] for _ in range(cores)]
+
+    def write():
+        for core in times:
+            busy = rng.randint(0, 100)
+            core[0] += busy
+            core[1] += 100 - busy
+        lines = ["cpu  {} 0 0 {} 0 0 0 0 0 0".format(sum(t[0] for t in times), sum(t[1] for t in times))]
+        lines += ["cpu{} {} 0 0 {} 0 0 0 0 0 0".format(i, *t) for i, t in enumerate(times)]
+        with open(path, "w") as file:
+            file.write("\n".join(lines + ["intr 1 2 3", ""]))
+    write()
+    return stat, write
+
+
+def cpu_cores(modules, cores):
+    from i3pystatus import cpu_usage
+    stat, write = fake_proc_stat(cores)
+    write()
+
+    def tick():
+        # A new tick: the sample is out of date (the file does not change, it is not part of the benchmark)
+        stat.sample = None
+        shared, cpu_usage.proc_stat = cpu_usage.proc_stat, stat
+        try:
+            for module in modules:
+                module.run()
+        finally:
+            cpu_usage.proc_stat = shared
+    return tick
+
+
+@benchmark("cpu_usage_bar_cores", (4, 256))
+def bench_cpu_usage_bar_cores(cores):
+    """One tick of a CpuUsageBar showing the average of `cores` cores."""
+    from i3pystatus import cpu_usage_bar
+    return cpu_cores([cpu_usage_bar.CpuUsageBar()], cores)
+
+
+@benchmark("cpu_usage_all_cores", (4, 256))
+def bench_cpu_usage_all_cores(cores):
+    """One tick of a CpuUsage listing every one of `cores` cores with {usage_all}."""
+    from i3pystatus import cpu_usage
+    return cpu_cores([cpu_usage.CpuUsage(format="{usage_all}")], cores)
+
+
+@benchmark("cpu_usage_heat_cores", (4, 256))
+def bench_cpu_usage_heat_cores(cores):
+    """One tick of a CpuUsage showing a heat strip and a histogram of `cores` cores."""
+    from i3pystatus import cpu_usage
+    return cpu_cores([cpu_usage.CpuUsage(format="{usage_heat} {usage_histogram}", heat_width=32)], cores)
@@ -0,0 +1,41 @@
+"""Benchmarks of creating modules and other SettingsBase objects."""
+
+from harness import benchmark
+
+from i3pystatus.core.settings import SettingsBase
+
+
+class Backend(SettingsBase):
+    """A backend like the mail backends, whose password is looked up in the keyring."""
+
+    settings = (
+        ("host", "Host name"),
+        ("port", "Port"),
+        ("username", "User name"),
+        ("password", "Password"),
+        "ssl",
+    )
+    required = ("host", "username")
+    port = 993
+    password = None
+    ssl = True
+
+
+@benchmark("settings_init", ("text", "clock", "backend"))
+def bench_settings_init(kind):
+    """Creating one object, including settings validation and keyring lookups."""
+    if kind == "text":
+        from i3pystatus.text import Text
+        return lambda: Text(text="hello", color="#FF0000")
+    if kind == "clock":
+        from i3pystatus.clock import Clock
+        return lambda: Clock(format="%H:%M")
+    return lambda: Backend(host="imap.example.com", username="user")
+
+
+@benchmark("settings_class")
+def bench_settings_class():
+    """Creating a module class, which merges the settings of all base classes."""
+    from i3pystatus.core.modules import IntervalModule
+    namespace = {"settings": (("format", "Format string"), "color"), "required": ("format",)}
+    return lambda: type("Example", (IntervalModule,), dict(namespace))
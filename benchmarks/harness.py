@@ -0,0 +1,91 @@
+"""Registry and timing of the benchmarks, see run.py."""
+
+import fnmatch
+import glob
+import importlib
+import os
+import platform
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CASES = []
+
+
+class Skip(Exception):
+    """Raised by a benchmark setup if it cannot run (e.g. a missing dependency)."""
+
+
+class Case:
+    def __init__(self, name, setup, param):
+        self.name = name
+        self.setup = setup
+        self.param = param
+
+
+def benchmark(name, params=(None,)):
+    """
+    Registers a benchmark. The decorated function is called with every
+    item of `params` (or without arguments) and returns the function to be
+    timed.
+    """
+    def decorator(setup):
+        for param in params:
+            CASES.append(Case(name if param is None else "{}/{}".format(name, param), setup, param))
+        return setup
+    return decorator
+
+
+def reference():
+    d = {}
+    for i in range(1000):
+        d[str(i)] = i * i
+    return sum(d.values())
+
+
+def measure(function, repeat):
+    """Returns the best time of a single call of `function` in seconds."""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(pattern=None, repeat=5):
+    for path in sorted(glob.glob(os.path.join(HERE, "bench_*.py"))):
+        importlib.import_module(os.path.splitext(os.path.basename(path))[0])
+
+    calibration = measure(reference, repeat)
+    results = {}
+    skipped = []
+    for case in CASES:
+        if pattern and not fnmatch.fnmatch(case.name, "*{}*".format(pattern)):
+            continue
+        try:
+            function = case.setup() if case.param is None else case.setup(case.param)
+        except Skip as e:
+            skipped.append((case.name, str(e)))
+            continue
+        seconds = measure(function, repeat)
+        results[case.name] = {"seconds": seconds, "relative": seconds / calibration}
+    return {
+        "python": platform.python_version(),
+        "calibration": calibration,
+        "results": results,
+        "skipped": dict(skipped),
+    }
+
+
+def compare(baseline, current, threshold):
+    """Returns the names of benchmarks slower than `threshold` times the baseline."""
+    regressions = []
+    for name, result in sorted(current["results"].items()):
+        base = baseline["results"].get(name)
+        if base is None:
+            print("{:<40} {:>12} {:>12.3f} {:>8}".format(name, "-", result["relative"], "new"))
+            continue
+        ratio = result["relative"] / base["relative"]
+        flag = "SLOWER" if ratio > threshold else ""
+        print("{:<40} {:>12.3f} {:>12.3f} {:>7.2f}x {}".format(name, base["relative"], result["relative"], ratio, flag))
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Runs the benchmarks in the bench_*.py files of this directory.
+
+Times are stored relative to a fixed pure Python reference loop, so a
+baseline recorded on one machine is roughly comparable on another one.
+
+    # Record a baseline
+    python3 benchmarks/run.py --save benchmarks/baseline.json
+    # Fail if a benchmark got more than 50% slower than the baseline
+    python3 benchmarks/run.py --compare benchmarks/baseline.json --threshold 1.5
+    # Only run some benchmarks
+    python3 benchmarks/run.py -k formatp
+
+Interpreter versions differ too much in speed for a comparison to be
+meaningful, so regressions only fail the run if the baseline was recorded
+with the same Python version (major.minor), or with --strict.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from harness import compare, run  # noqa: E402
+
+
+def minor_version(version):
+    """'3.11.7' -> '3.11'"""
+    return ".".join((version or "").split(".")[:2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks whose name contains PATTERN")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timing runs per benchmark")
+    parser.add_argument("--save", metavar="FILE", help="write the results to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="compare the results with the baseline in FILE")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="slowdown relative to the baseline that counts as regression")
+    parser.add_argument("--strict", action="store_true",
+                        help="fail on regressions even if the baseline was recorded with another Python version")
+    args = parser.parse_args()
+
+    current = run(args.pattern, args.repeat)
+    for name, reason in sorted(current["skipped"].items()):
+        print("{:<40} skipped: {}".format(name, reason))
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        same_python = minor_version(baseline.get("python")) == minor_version(current["python"])
+        if baseline.get("python") != current["python"]:
+            print("Baseline was recorded with Python {}, this is {}".format(baseline.get("python"), current["python"]))
+        print("{:<40} {:>12} {:>12} {:>8}".format("benchmark", "baseline", "current", "ratio"))
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print("{} benchmark(s) more than {}x slower than the baseline: {}".format(
+                len(regressions), args.threshold, ", ".join(regressions)))
+            if same_python or args.strict:
+                status = 1
+            else:
+                print("Not failing, the baseline is from another Python version (use --strict to fail anyway)")
+    else:
+        print("{:<40} {:>12} {:>12}".format("benchmark", "µs", "relative"))
+        for name, result in sorted(current["results"].items()):
+            print("{:<40} {:>12.2f} {:>12.3f}".format(name, result["seconds"] * 1e6, result["relative"]))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
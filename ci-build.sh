@@ -9,7 +9,7 @@ BUILD=${1:-ci-build}
 rm -rf ${BUILD}/
 mkdir -p $BUILD
 
-python3 -mpycodestyle i3pystatus tests
+python3 -mpycodestyle i3pystatus tests benchmarks
 
 # Check that the setup.py script works
 rm -rf ${BUILD}/test-install{,-bin}
@@ -21,5 +21,9 @@ test -f ${BUILD}/test-install-bin/i3pystatus-setting-util
 
 PYTHONPATH="$(echo ${BUILD}/test-install/i3pystatus-*.egg)" py.test -q --junitxml ${BUILD}/testlog.xml tests
 
+# Compare the core against the stored baseline. Regressions only fail the
+# build if the baseline was recorded with the Python version used here.
+python3 benchmarks/run.py --compare benchmarks/baseline.json
+
 # Check that the docs build w/o warnings (-W flag)
 sphinx-build -Nq -b html -W docs ${BUILD}/docs/
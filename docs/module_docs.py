@@ -1,6 +1,5 @@
 
-import pkgutil
-import importlib
+import os
 
 import sphinx.application
 from docutils.parsers.rst import Directive
@@ -9,11 +8,9 @@ from docutils.statemachine import StringList
 
 import i3pystatus.core.settings
 import i3pystatus.core.modules
-from i3pystatus.core.imputil import ClassFinder
+from i3pystatus.core.imputil import ModuleIndex
 from i3pystatus.core.color import ColorRangeModule
 
-IGNORE_MODULES = ("__main__", "core", "tools")
-
 
 def is_module(obj):
     return (isinstance(obj, type)
@@ -118,37 +115,25 @@ def process_signature(app, what, name, obj, options, signature, return_annotatio
         return ("", return_annotation)
 
 
-def get_modules(path, package):
-    modules = []
-    for finder, modname, is_package in pkgutil.iter_modules(path):
-        if modname not in IGNORE_MODULES:
-            modules.append(get_module(finder, modname, package))
-    return modules
-
-
-def get_module(finder, modname, package):
-    fullname = "{package}.{modname}".format(package=package, modname=modname)
-    return (modname, finder.find_loader(fullname)[0].load_module(fullname))
-
-
-def get_all(module_path, modname, basecls):
+def get_all(modname, basecls, index_path=False):
     mods = []
 
-    finder = ClassFinder(basecls)
+    index = ModuleIndex(basecls, modname, index_path)
 
-    for name, module in get_modules(module_path, modname):
-        classes = finder.get_matching_classes(module)
+    for name, entry in index.entries().items():
+        if "error" in entry:
+            raise ImportError(entry["error"])
         found = []
-        for cls in classes:
-            if cls.__name__ not in found:
-                found.append(cls.__name__)
-                mods.append((module.__name__, cls.__name__))
+        for cls in entry["classes"]:
+            if cls["name"] not in found:
+                found.append(cls["name"])
+                mods.append(("{}.{}".format(modname, name), cls["name"]))
 
     return sorted(mods, key=lambda module: module[0])
 
 
-def generate_automodules(path, name, basecls):
-    modules = get_all(path, name, basecls)
+def generate_automodules(name, basecls, index_path=False):
+    modules = get_all(name, basecls, index_path)
 
     contents = []
 
@@ -173,14 +158,16 @@ class AutogenDirective(Directive):
         self.assert_has_content()
 
         modname = self.arguments[0]
-        modpath = importlib.import_module(modname).__path__
         basecls = getattr(i3pystatus.core.modules, self.arguments[1])
+        # Kept next to the doctrees, so incremental builds reuse it
+        env = self.state.document.settings.env
+        index_path = os.path.join(env.doctreedir, "module-index-{}-{}.json".format(modname, basecls.__name__))
 
         contents = []
         for e in self.content:
             contents.append(e)
         contents.append("")
-        contents.extend(generate_automodules(modpath, modname, basecls))
+        contents.extend(generate_automodules(modname, basecls, index_path))
 
         node = paragraph()
         self.state.nested_parse(StringList(contents), 0, node)
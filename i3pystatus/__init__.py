@@ -1,20 +1,22 @@
 from pkgutil import extend_path
 
 from i3pystatus.core import Status
-from i3pystatus.core.modules import Module, IntervalModule
+from i3pystatus.core.imputil import load_config
+from i3pystatus.core.modules import Module, IntervalModule, AsyncIntervalModule
 from i3pystatus.core.settings import SettingsBase
 from i3pystatus.core.util import formatp, get_module
 
-import argparse
-import imp
+import atexit
 import logging
 import os
+import signal
+import sys
 
 __path__ = extend_path(__path__, __name__)
 
 __all__ = [
     "Status",
-    "Module", "IntervalModule",
+    "Module", "IntervalModule", "AsyncIntervalModule",
     "SettingsBase",
     "formatp",
     "get_module",
@@ -35,15 +37,65 @@ def clock_example():
     status.run()
 
 
+def setup_profiler(path):
+    from i3pystatus.core.profiler import SamplingProfiler
+
+    profiler = SamplingProfiler(path or None)
+    signal.signal(signal.SIGPROF, profiler.toggle)
+    if path is not None:
+        profiler.start()
+        atexit.register(profiler.finish)
+        exit_on_sigterm()
+    return profiler
+
+
+def setup_tracer(path):
+    from i3pystatus.core.tracing import tracer
+
+    tracer.enable()
+    atexit.register(tracer.write_chrome_trace, path)
+    exit_on_sigterm()
+    return tracer
+
+
+def exit_on_sigterm():
+    # i3 stops the status command with SIGTERM; exit normally so atexit handlers run
+    signal.signal(signal.SIGTERM, lambda signo, frame: sys.exit(0))
+
+
 def main():
+    import argparse
+
     parser = argparse.ArgumentParser(description='''
         run i3pystatus configuration file. Starts i3pystatus clock example if no arguments were provided
     ''')
     parser.add_argument('-c', '--config', help='path to configuration file', default=None, required=False)
+    parser.add_argument('--connect', metavar='SOCKET', default=None, required=False,
+                        help='attach to the i3pystatus server listening on SOCKET instead of running a configuration')
+    parser.add_argument('--output', default=None, required=False,
+                        help='output of this bar, used with --connect to select modules')
+    parser.add_argument('--profile', metavar='FILE', nargs='?', const='', default=None, required=False,
+                        help='sample all threads and write collapsed stacks (for flame graphs) to FILE on exit, '
+                             'by default to i3pystatus-<pid>.collapsed in the temporary directory. '
+                             'Without this option, SIGPROF starts profiling and a second SIGPROF writes the file')
+    parser.add_argument('--trace', metavar='FILE', default=None, required=False,
+                        help='trace the latency from clicks and module updates to the status line and write it '
+                             'to FILE on exit (Chrome trace event format)')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print the import and initialization time of every module to stderr '
+                             'once the first status line was written')
     args = parser.parse_args()
 
-    if args.config:
-        module_name = "i3pystatus-config"
-        imp.load_source(module_name, args.config)
+    if args.startup_report:
+        from i3pystatus.core.startup import report
+        report.print_report = True
+    setup_profiler(args.profile)
+    if args.trace:
+        setup_tracer(args.trace)
+    if args.connect:
+        from i3pystatus.core.server import connect
+        sys.exit(connect(args.connect, args.output))
+    elif args.config:
+        load_config(args.config)
     else:
         clock_example()
@@ -5,13 +5,15 @@ import os
 import xml.etree.ElementTree as etree
 from datetime import datetime
 
-import requests
 import vlc
 from dateutil import parser
 from dateutil.tz import tzutc
 from i3pystatus import IntervalModule
 from i3pystatus.core.desktop import DesktopNotification
 from i3pystatus.core.util import internet, require
+from i3pystatus.core.imputil import lazy_import
+
+requests = lazy_import("requests")
 
 
 class State:
@@ -200,6 +202,13 @@ class ABCRadio(IntervalModule):
             if not self.player.is_alive():
                 self.player.start()
 
+    def unregistered(self):
+        super().unregistered()
+        if self.destroy_timer:
+            self.destroy_timer.cancel()
+            self.destroy_timer = None
+        self.destroy()
+
     def destroy(self):
         log.debug("Destroying player: {}".format(id(self.player)))
         if self.player:
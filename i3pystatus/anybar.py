@@ -40,15 +40,20 @@ class AnyBar(IntervalModule):
 
     def main_loop(self):
         """ Mainloop blocks so we thread it."""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock = self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         port = int(getattr(self, 'port', 1738))
         sock.bind(('127.0.0.1', port))
         while True:
             data, addr = sock.recvfrom(512)
+            if self.stopped:
+                sock.close()
+                return
             color = data.decode().strip()
             self.color = self.colors.get(color, color)
 
     def init(self):
+        self.sock = None
+        self.stopped = False
         try:
             t = threading.Thread(target=self.main_loop)
             t.daemon = True
@@ -59,6 +64,16 @@ class AnyBar(IntervalModule):
                 "color": "#AE2525"
             }
 
+    def unregistered(self):
+        super().unregistered()
+        self.stopped = True
+        if self.sock is not None:
+            try:
+                # Wakes up recvfrom, so that the port is released
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
     def run(self):
         self.output = {
             "full_text": "●",
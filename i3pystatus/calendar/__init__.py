@@ -171,6 +171,7 @@ class Calendar(IntervalModule, ColorRangeModule):
             raise ImportError('Missing humanize module')
 
         self.condition = threading.Condition()
+        self.stopped = False
         self.thread = threading.Thread(target=self.update_thread, daemon=True)
         self.thread.start()
         self.colors = self.get_hex_color_range(self.end_color, self.start_color, self.urgent_seconds * 2)
@@ -179,9 +180,18 @@ class Calendar(IntervalModule, ColorRangeModule):
         self.refresh_events()
         while True:
             with self.condition:
-                self.condition.wait(self.update_interval)
+                if not self.stopped:
+                    self.condition.wait(self.update_interval)
+            if self.stopped:
+                return
             self.refresh_events()
 
+    def unregistered(self):
+        super().unregistered()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
     def refresh_events(self):
         self.backend.update()
 
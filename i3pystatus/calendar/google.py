@@ -3,12 +3,14 @@ from datetime import timezone
 
 import httplib2
 from oauth2client import file as file_, client, tools
-import pytz
 from googleapiclient import discovery
 from dateutil import parser
 from googleapiclient.errors import HttpError
 from i3pystatus.calendar import CalendarBackend, CalendarEvent, formatter
 from i3pystatus.core.util import user_open, require, internet
+from i3pystatus.core.imputil import lazy_import
+
+pytz = lazy_import("pytz")
 
 
 SCOPES = 'https://www.googleapis.com/auth/calendar.readonly'
@@ -1,9 +1,11 @@
 import sqlite3
 from datetime import datetime
 
-import pytz
 from dateutil.tz import tzlocal
 from i3pystatus.calendar import CalendarEvent, CalendarBackend, formatter
+from i3pystatus.core.imputil import lazy_import
+
+pytz = lazy_import("pytz")
 
 
 class Flag:
@@ -1,9 +1,11 @@
-import requests
 import json
 from decimal import Decimal
 
 from i3pystatus import IntervalModule
 from i3pystatus.core.util import internet, require
+from i3pystatus.core.imputil import lazy_import
+
+requests = lazy_import("requests")
 
 
 class Coin(IntervalModule):
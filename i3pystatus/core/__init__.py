@@ -1,12 +1,14 @@
 import logging
 import os
+import signal
 import sys
 from threading import Thread
 
-from i3pystatus.core import io, util
+from i3pystatus.core import codec, io, metrics, reload, startup, util
 from i3pystatus.core.exceptions import ConfigError
 from i3pystatus.core.imputil import ClassFinder
-from i3pystatus.core.modules import Module
+from i3pystatus.core.modules import Module, IntervalModule
+from i3pystatus.core.tracing import tracer
 
 DEFAULT_LOG_FORMAT = '%(asctime)s [%(levelname)-8s][%(name)s %(lineno)d] %(message)s'
 log = logging.getLogger(__name__)
@@ -33,20 +35,31 @@ class CommandEndpoint:
 
     def _command_endpoint(self):
         for cmd in self.io_handler_factory().read():
-            target_module = self.modules.get(cmd["instance"])
-
-            button = cmd["button"]
-            kwargs = {"button_id": button}
-            try:
-                kwargs.update({"pos_x": cmd["x"],
-                               "pos_y": cmd["y"]})
-            except Exception:
-                continue
-
-            if target_module:
-                target_module.on_click(button, **kwargs)
+            self.dispatch(cmd)
+
+    def dispatch(self, cmd):
+        """Runs the click handler of the module a click event is meant for."""
+        target_module = self.modules.get(cmd.get("instance", 0))
+
+        button = cmd.get("button")
+        kwargs = {"button_id": button}
+        try:
+            kwargs.update({"pos_x": cmd["x"],
+                           "pos_y": cmd["y"]})
+        except Exception:
+            return
+
+        if target_module:
+            tracer.start(target_module, "click")
+            target_module.on_click(button, **kwargs)
+            if isinstance(target_module, IntervalModule):
+                target_module()
+            else:
+                tracer.run_started(target_module)
                 target_module.run()
-                self.io.async_refresh()
+                target_module.dirty = True
+                tracer.run_finished(target_module)
+            self.io.async_refresh()
 
 
 class Status:
@@ -61,15 +74,52 @@ class Status:
     :param tuple internet_check: Address of server that will be used to check for internet connection by :py:class:`.internet`.
     :param keep_alive: If True, modules that define the keep_alive flag will not be put to sleep when the status bar is hidden.
     :param dictionary default_hints: Dictionary of default hints to apply to all modules. Can be overridden at a module level.
+    :param resend_interval: In standalone mode the status line is only written when the output of a module changed.
+        If set, an unchanged status line is sent again after this many seconds.
+    :param json_codec: JSON library used for the i3bar protocol: "orjson", "ujson" or "json". By default the fastest
+        installed one is used.
+    :param float min_frame_interval: Minimum time in seconds between two status lines caused by refresh requests
+        (clicks, modules sending output). Requests within this window are merged into one status line.
+    :param float max_latency: Maximum time in seconds a refresh request may be delayed by merging.
+    :param str server: Path of a Unix socket. If set, i3pystatus runs as a server for any number of bars
+        started with ``i3pystatus --connect`` instead of writing to stdout (see :ref:`server`).
+    :param str metrics_file: Path of a file the runtime metrics of all modules are written to in the
+        Prometheus text format every `metrics_interval` seconds (see :ref:`metrics`).
+    :param str metrics_socket: Path of a Unix socket serving the runtime metrics of all modules.
+    :param int metrics_interval: Seconds between two writes of `metrics_file`.
+
+    In standalone mode stdout is switched to non-blocking mode while status
+    lines are written (see :py:class:`.FrameWriter`), which affects the whole
+    process: other code writing to the stdout file descriptor directly may
+    get :py:exc:`BlockingIOError` if i3bar does not read.
+
+    On SIGHUP the configuration file is executed again and only the modules
+    that were added, changed or removed are created or stopped, see
+    :py:mod:`i3pystatus.core.reload`.
     """
 
+    def __new__(cls, *args, **kwargs):
+        if cls is Status and reload.collector is not None:
+            # The configuration file is executed again by reload()
+            return reload.collector(args, kwargs)
+        status = super().__new__(cls)
+        status.arguments = (args, kwargs)
+        return status
+
     def __init__(self, standalone=True, click_events=True, interval=1,
                  input_stream=None, logfile=None, internet_check=None,
                  keep_alive=False, logformat=DEFAULT_LOG_FORMAT,
-                 default_hints=None):
-        self.standalone = standalone
+                 default_hints=None, resend_interval=None, json_codec=None,
+                 min_frame_interval=0.05, max_latency=0.25, server=None,
+                 metrics_file=None, metrics_socket=None, metrics_interval=15):
+        self.standalone = standalone or bool(server)
         self.default_hints = default_hints
-        self.click_events = standalone and click_events
+        self.resend_interval = resend_interval
+        self.frames = {}
+        self.reload_requested = False
+        config = sys.modules.get("i3pystatus-config") or sys.modules.get("__main__")
+        self.config_path = getattr(config, "__file__", None)
+        self.click_events = self.standalone and click_events
         input_stream = input_stream or sys.stdin
         logger = logging.getLogger("i3pystatus")
         if logfile:
@@ -84,17 +134,30 @@ class Status:
                 logger.handlers[index].setFormatter(logging.Formatter(logformat))
         if internet_check:
             util.internet.address = internet_check
+        if json_codec:
+            codec.use(json_codec)
 
         self.modules = util.ModuleList(self, ClassFinder(Module))
         if self.standalone:
-            self.io = io.StandaloneIO(self.click_events, self.modules, keep_alive, interval)
+            self.io = io.StandaloneIO(self.click_events, self.modules, keep_alive, interval,
+                                      min_frame_interval, max_latency)
             if self.click_events:
                 self.command_endpoint = CommandEndpoint(
                     self.modules,
-                    lambda: io.JSONIO(io=io.IOHandler(sys.stdin, open(os.devnull, "w")), skiplines=1),
+                    lambda: io.JSONIO(io=io.IOHandler(sys.stdin, open(os.devnull, "w")), skiplines=1, echo=False),
                     self.io)
         else:
             self.io = io.IOHandler(input_stream)
+        self.metrics = None
+        if metrics_file or metrics_socket:
+            self.metrics = metrics.Exporter(metrics.registry, metrics_file, metrics_socket, metrics_interval)
+        self.server = None
+        if server:
+            from i3pystatus.core.server import Server
+            self.server = Server(
+                server, self.render_frames,
+                self.command_endpoint.dispatch if self.click_events else lambda cmd: None,
+                self.io.async_refresh, self.click_events)
 
     def register(self, module, *args, **kwargs):
         """
@@ -131,12 +194,98 @@ class Status:
                 )
             ))
 
+    def request_reload(self, signo=None, frame=None):
+        """Reloads the configuration before the next status line is rendered (SIGHUP handler)."""
+        self.reload_requested = True
+        if self.standalone:
+            self.io.async_refresh()
+
+    def reload(self):
+        """
+        Executes the configuration file again and applies the changed module
+        set. Returns False if the configuration could not be reloaded, in
+        which case the running modules are kept.
+        """
+        self.reload_requested = False
+        if not self.config_path:
+            log.warning("Cannot reload, the configuration file is unknown")
+            return False
+        try:
+            collector = reload.collect(self, self.config_path)
+        except Exception:
+            log.exception("Reloading %s failed, keeping the running configuration", self.config_path)
+            return False
+        if collector.arguments is None:
+            log.warning("Reloading %s failed, it did not create a Status", self.config_path)
+            collector.discard()
+            return False
+        if not reload.settings_equal(collector.arguments, self.arguments):
+            log.warning("The settings of Status changed, restart i3pystatus to apply them")
+
+        registrations = collector.modules.registrations
+        kept = sum(1 for module, _ in registrations if module in self.modules)
+        removed = len(self.modules) - kept
+        self.modules.replace(registrations)
+        self.frames.clear()
+        log.info("Reloaded %s: %d modules kept, %d created, %d removed",
+                 self.config_path, kept, len(registrations) - kept, removed)
+        return True
+
     def run(self):
         """
         Run main loop.
         """
+        startup.report.run_called()
+        signal.signal(signal.SIGHUP, self.request_reload)
+        if self.metrics:
+            self.metrics.start()
+        if self.server:
+            self.server.start()
+            self.server.serve(self.io.read())
+            return
         if self.click_events:
             self.command_endpoint.start()
-        for j in io.JSONIO(self.io).read():
-            for module in self.modules:
-                module.inject(j)
+        if self.standalone:
+            io.JSONIO(self.io, resend_interval=self.resend_interval).write_frames(self.render_frame)
+        else:
+            for j in io.JSONIO(self.io).read():
+                if self.reload_requested:
+                    self.reload()
+                for module in self.modules:
+                    module.inject(j)
+
+    def render_frame(self, output=None):
+        """
+        Returns the serialized status line.
+
+        Every module keeps its block as a serialized fragment which is only
+        rebuilt when its output changed, and the line is only joined again
+        if a fragment changed; otherwise the previous line object is
+        returned.
+
+        :param output: Only include modules shown on this output (server mode)
+        """
+        return self.render_frames([output])[output]
+
+    def render_frames(self, outputs):
+        """Like :py:meth:`render_frame` for several outputs at once; returns a dict."""
+        if self.reload_requested:
+            self.reload()
+        changed = False
+        for module in self.modules:
+            if module.update_fragment():
+                changed = True
+                if tracer.enabled:
+                    tracer.rendered(module, True)
+            elif tracer.enabled:
+                tracer.rendered(module, False)
+        if changed:
+            self.frames.clear()
+        for output in outputs:
+            if output not in self.frames:
+                fragments = []
+                for module in self.modules:
+                    if module.shown_on(output):
+                        module.inject_fragment(fragments)
+                self.frames[output] = "[" + ", ".join(fragments) + "]"
+        return {output: self.frames[output] for output in outputs}
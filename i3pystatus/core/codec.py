@@ -0,0 +1,102 @@
+"""
+JSON codecs for the i3bar protocol.
+
+The status line and the click event stream are encoded with the fastest
+available JSON library: `orjson`, then `ujson`, then the standard library.
+All codecs take and return ``str``.
+"""
+
+import json
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class Codec:
+    """Standard library codec, always available."""
+
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+    def loads(self, string):
+        return json.loads(string)
+
+
+class OrjsonCodec(Codec):
+    """Requires the PyPI package `orjson`."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def dumps(self, obj):
+        try:
+            return self.orjson.dumps(obj).decode("UTF-8")
+        except TypeError:
+            # e.g. integers exceeding 64 bit
+            return super().dumps(obj)
+
+    def loads(self, string):
+        return self.orjson.loads(string)
+
+
+class UjsonCodec(Codec):
+    """Requires the PyPI package `ujson`."""
+
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self.ujson = ujson
+
+    def dumps(self, obj):
+        try:
+            return self.ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+        except (TypeError, OverflowError):
+            return super().dumps(obj)
+
+    def loads(self, string):
+        return self.ujson.loads(string)
+
+
+CODECS = (OrjsonCodec, UjsonCodec, Codec)
+
+
+def get_codec(name=None):
+    """
+    Returns a codec instance.
+
+    :param name: "orjson", "ujson" or "json", or None for the fastest one
+        that is installed.
+    """
+    for cls in CODECS:
+        if name is not None and cls.name != name:
+            continue
+        try:
+            return cls()
+        except ImportError:
+            if name is not None:
+                log.warning("JSON codec %s is not installed, using json", name)
+    return Codec()
+
+
+default = get_codec()
+
+
+def use(name=None):
+    """Selects the codec used by :py:func:`dumps` and :py:func:`loads`."""
+    global default
+    default = get_codec(name)
+    return default
+
+
+def dumps(obj):
+    return default.dumps(obj)
+
+
+def loads(string):
+    return default.loads(string)
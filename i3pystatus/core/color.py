@@ -1,41 +1,140 @@
-from colour import Color
+import functools
+import re
+
+HEX_COLOR = re.compile(r"^#(?:[0-9a-fA-F]{3}){1,2}$")
+
+# Tolerance used by the colour package, so that gradients between hex colors
+# are exactly the same with or without it
+FLOAT_ERROR = 0.0000005
+
+
+def hex_to_hsl(color):
+    """
+    Converts a hex color ('#00FF00' or '#0F0') to hue, saturation and
+    lightness (each between 0 and 1).
+    """
+    digits = color[1:]
+    if len(digits) == 3:
+        digits = "".join(c * 2 for c in digits)
+    r, g, b = (int(digits[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+    vmin = min(r, g, b)
+    vmax = max(r, g, b)
+    diff = vmax - vmin
+    vsum = vmin + vmax
+    lightness = vsum / 2
+    if diff < FLOAT_ERROR:
+        # A gray
+        return 0.0, 0.0, lightness
+
+    if lightness < 0.5:
+        saturation = diff / vsum
+    else:
+        saturation = diff / (2.0 - vsum)
+
+    dr = (((vmax - r) / 6) + (diff / 2)) / diff
+    dg = (((vmax - g) / 6) + (diff / 2)) / diff
+    db = (((vmax - b) / 6) + (diff / 2)) / diff
+    if r == vmax:
+        hue = db - dg
+    elif g == vmax:
+        hue = (1.0 / 3) + dr - db
+    else:
+        hue = (2.0 / 3) + dg - dr
+    if hue < 0:
+        hue += 1
+    if hue > 1:
+        hue -= 1
+    return hue, saturation, lightness
+
+
+def _hue_to_rgb(v1, v2, hue):
+    while hue < 0:
+        hue += 1
+    while hue > 1:
+        hue -= 1
+    if 6 * hue < 1:
+        return v1 + (v2 - v1) * 6 * hue
+    if 2 * hue < 1:
+        return v2
+    if 3 * hue < 2:
+        return v1 + (v2 - v1) * ((2.0 / 3) - hue) * 6
+    return v1
+
+
+def hsl_to_hex(hsl):
+    """Converts hue, saturation and lightness to a hex color ('#00ff00')."""
+    hue, saturation, lightness = hsl
+    if saturation == 0:
+        rgb = (lightness,) * 3
+    else:
+        if lightness < 0.5:
+            v2 = lightness * (1.0 + saturation)
+        else:
+            v2 = (lightness + saturation) - (saturation * lightness)
+        v1 = 2.0 * lightness - v2
+        rgb = (_hue_to_rgb(v1, v2, hue + (1.0 / 3)),
+               _hue_to_rgb(v1, v2, hue),
+               _hue_to_rgb(v1, v2, hue - (1.0 / 3)))
+    return "#" + "".join("%02x" % int(c * 255 + 0.5 - FLOAT_ERROR) for c in rgb)
+
+
+@functools.lru_cache(maxsize=64)
+def color_range(start_color, end_color, quantity):
+    """
+    Generates a tuple of quantity hex colors from start_color to end_color.
+
+    Gradients are computed once per process and shared by all modules
+    asking for the same one. Gradients between hex colors are interpolated
+    here, colors given by name need the PyPI package `colour`.
+
+    :param start_color: Hex or plain English color for start of range
+    :param end_color: Hex or plain English color for end of range
+    :param quantity: Number of colours to return
+    :return: A tuple of hex color values
+    """
+    if not (HEX_COLOR.match(start_color) and HEX_COLOR.match(end_color)):
+        from colour import Color
+        raw_colors = [c.hex for c in Color(start_color).range_to(Color(end_color), quantity)]
+        # i3bar expects the full Hex value but for some colors the colour
+        # module only returns partial values.
+        return tuple("#" + "".join(c * 2 for c in color[1:]) if len(color) == 4 else color
+                     for color in raw_colors)
+
+    steps = quantity - 1
+    if steps < 0:
+        raise ValueError("Unsupported negative number of colors (%r)." % quantity)
+    start = hex_to_hsl(start_color)
+    end = hex_to_hsl(end_color)
+    step = tuple((e - s) / steps for s, e in zip(start, end)) if steps else (0, 0, 0)
+    return tuple(hsl_to_hex(tuple(s + d * i for s, d in zip(start, step)))
+                 for i in range(quantity))
 
 
 class ColorRangeModule(object):
     """
     Class to dynamically generate and select colors.
 
-    Requires the PyPI package `colour`
+    Colors given by name (instead of hex) require the PyPI package `colour`
     """
 
     start_color = "#00FF00"
-    end_color = 'red'
+    end_color = "#FF0000"
 
     @staticmethod
     def get_hex_color_range(start_color, end_color, quantity):
         """
-        Generates a list of quantity Hex colors from start_color to end_color.
+        Generates a tuple of quantity Hex colors from start_color to end_color.
+
+        The gradient is shared with every other module using the same one,
+        see :py:func:`color_range`.
 
         :param start_color: Hex or plain English color for start of range
         :param end_color: Hex or plain English color for end of range
         :param quantity: Number of colours to return
-        :return: A list of Hex color values
+        :return: A tuple of Hex color values
         """
-        raw_colors = [c.hex for c in list(Color(start_color).range_to(Color(end_color), quantity))]
-        colors = []
-        for color in raw_colors:
-
-            # i3bar expects the full Hex value but for some colors the colour
-            # module only returns partial values. So we need to convert these colors to the full
-            # Hex value.
-            if len(color) == 4:
-                fixed_color = "#"
-                for c in color[1:]:
-                    fixed_color += c * 2
-                colors.append(fixed_color)
-            else:
-                colors.append(color)
-        return colors
+        return color_range(start_color, end_color, quantity)
 
     def get_gradient(self, value, colors, upper_limit=100):
         """
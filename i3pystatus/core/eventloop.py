@@ -0,0 +1,392 @@
+import asyncio
+import functools
+import json
+import shlex
+import ssl
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from i3pystatus.core import metrics
+from i3pystatus.core.command import CommandResult
+from i3pystatus.core.threading import ExceptionWrapper, Scheduler, timer
+from i3pystatus.core.tracing import tracer
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+#: Request headers that are not sent along when a redirect leads to another origin
+SENSITIVE_HEADERS = frozenset(("authorization", "proxy-authorization", "cookie"))
+
+#: Limit of the status line and headers of a response, in bytes
+MAX_HEADER_SIZE = 64 * 1024
+#: Default limit of the body of a response, in bytes
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+class HTTPError(OSError):
+    """Raised by :py:func:`fetch` for a malformed or oversized response."""
+
+
+class EventLoop:
+    """
+    Runs a single asyncio event loop in a daemon thread.
+
+    All :py:class:`.AsyncIntervalModule` instances share this loop, so any
+    number of I/O bound modules cost one thread. Each module gets a task
+    that awaits its ``run`` coroutine every ``interval`` seconds; like the
+    :py:class:`.Scheduler`, the points in time are aligned to a common grid.
+
+    Modules whose ``run`` is a plain function are run in the loop's default
+    executor instead, so they cannot block the loop. Such a run cannot be
+    cancelled: when it exceeds ``run_timeout`` the module output is marked
+    stale and the module is not run again until the hung run returns.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.modules = []
+        self.breakers = {}
+        self.tasks = {}
+        #: Executor futures of plain run() methods that exceeded their run_timeout
+        self.hung = {}
+        self.lock = threading.Lock()
+        self.epoch = time.monotonic()
+        self._suspended = threading.Event()
+
+    def start(self):
+        """Starts the loop thread (if not already running) and returns the loop."""
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self._run_forever, name="EventLoop", daemon=True)
+                self.thread.start()
+        return self.loop
+
+    def _run_forever(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedules `coro` on the loop from any thread and returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.start())
+
+    def append(self, module):
+        self.modules.append(module)
+        self.breakers[module] = ExceptionWrapper(module)
+        self.tasks[module] = self.submit(self.update_loop(module))
+        return self.tasks[module]
+
+    def remove(self, module):
+        """Cancels the update loop of `module`."""
+        task = self.tasks.pop(module, None)
+        if task is not None:
+            task.cancel()
+        self.breakers.pop(module, None)
+        if module in self.modules:
+            self.modules.remove(module)
+
+    async def update_loop(self, module):
+        while True:
+            if self.should_execute(module):
+                await self.execute(module)
+            breaker = self.breakers.get(module)
+            if breaker is None:
+                # Removed while it was running
+                return
+            interval = module.interval * breaker.backoff
+            if interval <= 0:
+                await asyncio.sleep(0)
+                continue
+            elapsed = time.monotonic() - self.epoch
+            await asyncio.sleep(interval - elapsed % interval)
+
+    async def execute(self, module):
+        """Runs `module` once, handling exceptions and ``run_timeout`` like the scheduler."""
+        if module in self.hung:
+            # The last run() still blocks an executor thread
+            return
+        breaker = self.breakers.get(module) or ExceptionWrapper(module)
+        failed = True
+        start = timer()
+        tracer.run_started(module)
+        if asyncio.iscoroutinefunction(module.run):
+            pending = module.run()
+            awaited = pending
+        else:
+            pending = asyncio.get_event_loop().run_in_executor(None, module.run)
+            # wait_for must not cancel the future, the thread keeps running anyway
+            awaited = asyncio.shield(pending)
+        try:
+            await asyncio.wait_for(awaited, module.run_timeout)
+        except asyncio.TimeoutError:
+            metrics.registry.observe_timeout(module)
+            fresh_output = module.output
+            stale_output = Scheduler.mark_stale(module)
+            if pending is awaited:
+                module.logger.warning("run() exceeded run_timeout of %ss, cancelled", module.run_timeout)
+            else:
+                module.logger.warning("run() exceeded run_timeout of %ss, not running %s until it returns",
+                                      module.run_timeout, module.__class__.__name__)
+                self.hung[module] = pending
+                pending.add_done_callback(functools.partial(
+                    self.recovered, module, fresh_output, stale_output, start))
+        except Exception:
+            breaker.handle_exception()
+        else:
+            breaker.reset()
+            failed = False
+        metrics.registry.observe_run(module, timer() - start, failed)
+        module.dirty = True
+        tracer.run_finished(module)
+
+    def recovered(self, module, fresh_output, stale_output, start, future):
+        """Called when the hung run() of `module` finally returned."""
+        del self.hung[module]
+        if future.cancelled():
+            return
+        try:
+            future.result()
+        except Exception:
+            (self.breakers.get(module) or ExceptionWrapper(module)).handle_exception()
+        else:
+            if module.output is stale_output:
+                module.output = fresh_output
+        module.dirty = True
+        module.logger.warning("%s recovered after %.1fs", module.__class__.__name__, timer() - start)
+
+    def should_execute(self, module):
+        """See :py:meth:`.Scheduler.should_execute`."""
+        if not self._suspended.is_set():
+            return True
+        return bool(getattr(module, 'keep_alive', False))
+
+    def suspend(self):
+        self._suspended.set()
+
+    def resume(self):
+        self._suspended.clear()
+
+
+async def to_thread(func, *args, **kwargs):
+    """
+    Runs the blocking `func` in the loop's default executor and returns its
+    result. Useful for libraries without asyncio support.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+async def open_connection(host, port, timeout=10, **kwargs):
+    """
+    :py:func:`asyncio.open_connection` with a connect timeout.
+
+    :returns: A (reader, writer) tuple
+    """
+    return await asyncio.wait_for(asyncio.open_connection(host, port, **kwargs), timeout)
+
+
+async def run_process(command, enable_shell=False, timeout=None):
+    """
+    Asynchronous counterpart of :py:func:`.run_through_shell`.
+
+    :param command: A string or a list of strings containing the name and
+     arguments of the program.
+    :param enable_shell: If set to `True` the users default shell will be
+     invoked and given ``command`` to execute.
+    :param timeout: Seconds after which the process is killed.
+    :returns: :py:data:`.CommandResult`
+    """
+    if enable_shell:
+        proc = await asyncio.create_subprocess_shell(
+            command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    else:
+        if isinstance(command, str):
+            command = shlex.split(command)
+        proc = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    return CommandResult(proc.returncode, out.decode("UTF-8"), err.decode("UTF-8"))
+
+
+class Response:
+    """Result of :py:func:`fetch`."""
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    def text(self, encoding=None):
+        if encoding is None:
+            content_type = self.headers.get("content-type", "")
+            encoding = "utf-8"
+            for param in content_type.split(";")[1:]:
+                key, _, value = param.strip().partition("=")
+                if key.lower() == "charset" and value:
+                    encoding = value.strip('"')
+        return self.body.decode(encoding)
+
+    def json(self):
+        return json.loads(self.text())
+
+
+async def fetch(url, method="GET", headers=None, data=None, timeout=30, max_redirects=5,
+                max_size=MAX_BODY_SIZE):
+    """
+    Minimal asynchronous HTTP/1.1 client for http and https URLs.
+
+    :param url: URL to request
+    :param method: HTTP method
+    :param headers: dict of additional request headers. Authorization and
+     cookie headers are dropped when a redirect leads to another scheme,
+     host or port.
+    :param data: Request body (bytes or str)
+    :param timeout: Seconds the whole request (including redirects) may take
+    :param max_redirects: Number of redirects to follow
+    :param max_size: Maximum size of the response body in bytes
+    :returns: :py:class:`Response`
+    :raises HTTPError: if the response is malformed, or its headers or body
+     are too large. Like other errors of the connection (which are raised
+     as they are), it is an :py:exc:`OSError`. A response with an error
+     status is returned, not raised.
+    """
+    return await asyncio.wait_for(_fetch(url, method, headers or {}, data, max_redirects, max_size), timeout)
+
+
+async def _fetch(url, method, headers, data, max_redirects, max_size):
+    for _ in range(max_redirects + 1):
+        response = await _request(url, method, headers, data, max_size)
+        location = response.headers.get("location")
+        if response.status not in (301, 302, 303, 307, 308) or not location:
+            return response
+        location = urljoin(url, location)
+        if _origin(location) != _origin(url):
+            headers = {key: value for key, value in headers.items() if key.lower() not in SENSITIVE_HEADERS}
+        url = location
+        if response.status == 303:
+            method, data = "GET", None
+    return response
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return parts.scheme, parts.hostname, parts.port or DEFAULT_PORTS.get(parts.scheme)
+
+
+def _host_header(parts):
+    # Not parts.netloc, which includes user:password
+    host = parts.hostname
+    if ":" in host:
+        host = "[{}]".format(host)
+    if parts.port and parts.port != DEFAULT_PORTS[parts.scheme]:
+        host += ":{}".format(parts.port)
+    return host
+
+
+async def _request(url, method, headers, data, max_size):
+    parts = urlsplit(url)
+    if parts.scheme not in DEFAULT_PORTS:
+        raise ValueError("Unsupported URL scheme: {}".format(parts.scheme))
+    https = parts.scheme == "https"
+    port = parts.port or DEFAULT_PORTS[parts.scheme]
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, port, ssl=ssl.create_default_context() if https else None, limit=MAX_HEADER_SIZE)
+    try:
+        if isinstance(data, str):
+            data = data.encode("UTF-8")
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        request_headers = {
+            "Host": _host_header(parts),
+            "User-Agent": "i3pystatus",
+            "Accept-Encoding": "identity",
+            "Connection": "close",
+        }
+        request_headers.update(headers)
+        if data is not None:
+            request_headers["Content-Length"] = str(len(data))
+        head = "{} {} HTTP/1.1\r\n".format(method, path)
+        head += "".join("{}: {}\r\n".format(key, value) for key, value in request_headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + (data or b""))
+        await writer.drain()
+
+        try:
+            status, reason, response_headers, body = await _read_response(reader, max_size)
+        except (ValueError, EOFError) as e:
+            # EOFError: asyncio.IncompleteReadError, the connection was closed early
+            raise HTTPError("Invalid response from {}: {}".format(_host_header(parts), e)) from e
+        return Response(url, status, reason, response_headers, body)
+    finally:
+        writer.close()
+
+
+async def _read_response(reader, max_size):
+    """Reads a response from `reader`, raising ValueError or EOFError if it is malformed."""
+    # readline() raises ValueError for a line longer than the limit of the reader
+    head_size = 0
+
+    async def read_line():
+        nonlocal head_size
+        line = await reader.readline()
+        head_size += len(line)
+        if head_size > MAX_HEADER_SIZE:
+            raise ValueError("headers exceed {} bytes".format(MAX_HEADER_SIZE))
+        if not line.endswith(b"\n"):
+            raise EOFError("connection closed in the headers")
+        return line.decode("latin-1").rstrip("\r\n")
+
+    version, _, rest = (await read_line()).partition(" ")
+    status, _, reason = rest.partition(" ")
+    if not version.startswith("HTTP/") or len(status) != 3 or not status.isdigit():
+        raise ValueError("malformed status line")
+    response_headers = {}
+    while True:
+        line = await read_line()
+        if not line:
+            break
+        key, _, value = line.partition(":")
+        response_headers[key.strip().lower()] = value.strip()
+
+    def check_size(size):
+        if size > max_size:
+            raise ValueError("body exceeds {} bytes".format(max_size))
+
+    if response_headers.get("transfer-encoding", "").lower() == "chunked":
+        body = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size < 0:
+                raise ValueError("negative chunk size")
+            if not size:
+                break
+            check_size(len(body) + size)
+            body += await reader.readexactly(size)
+            await reader.readline()
+    elif "content-length" in response_headers:
+        size = int(response_headers["content-length"])
+        if size < 0:
+            raise ValueError("negative content length")
+        check_size(size)
+        body = await reader.readexactly(size)
+    else:
+        body = bytearray()
+        while True:
+            data = await reader.read(64 * 1024)
+            if not data:
+                break
+            body += data
+            check_size(len(body))
+    return int(status), reason, response_headers, bytes(body)
@@ -1,11 +1,31 @@
+import hashlib
+import importlib.machinery
+import importlib.util
 import inspect
+import json
+import logging
+import os
+import pkgutil
+import sys
+import threading
 import types
+import weakref
 from importlib import import_module
 from i3pystatus.core.exceptions import ConfigAmbigiousClassesError, ConfigInvalidModuleError
 
+log = logging.getLogger(__name__)
+
+# module -> {baseclass: matching classes}, shared by all ClassFinders
+_matching_classes = weakref.WeakKeyDictionary()
+
 
 class ClassFinder:
-    """Support class to find classes of specific bases in a module"""
+    """
+    Support class to find classes of specific bases in a module
+
+    The classes found in a module are remembered, so registering the same
+    module again is a dictionary lookup.
+    """
 
     def __init__(self, baseclass):
         self.baseclass = baseclass
@@ -21,9 +41,13 @@ class ClassFinder:
         return predicate
 
     def get_matching_classes(self, module):
-        # Transpose [ (name, list), ... ] to ( [name, ...], [list, ...] )
-        classes = list(zip(*inspect.getmembers(module, self.predicate_factory(module))))
-        return classes[1] if classes else []
+        by_base = _matching_classes.setdefault(module, {})
+        classes = by_base.get(self.baseclass)
+        if classes is None:
+            predicate = self.predicate_factory(module)
+            # Sorted by name, like inspect.getmembers
+            classes = by_base[self.baseclass] = [obj for name, obj in sorted(vars(module).items()) if predicate(obj)]
+        return classes
 
     def get_class(self, module):
         classes = self.get_matching_classes(module)
@@ -40,6 +64,14 @@ class ClassFinder:
     def get_module(self, module):
         return import_module("i3pystatus.{mod}".format(mod=module))
 
+    def resolve(self, module):
+        """Returns the class for a module name or module; classes and instances are returned unchanged."""
+        if isinstance(module, str):
+            module = self.get_module(module)
+        if isinstance(module, types.ModuleType):
+            module = self.get_class(module)
+        return module
+
     def instanciate_class_from_module(self, module, *args, **kwargs):
         if isinstance(module, types.ModuleType):
             return self.get_class(module)(*args, **kwargs)
@@ -51,3 +83,171 @@ class ClassFinder:
             raise ValueError(
                 "Additional arguments are invalid if 'module' is already an object")
         return module
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Created by :py:func:`lazy_import`.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_LazyModule__lock"] = threading.Lock()
+
+    def __getattr__(self, attr):
+        with self.__lock:
+            module = import_module(self.__name__)
+        # Later lookups bypass __getattr__
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return "<lazy module {!r}>".format(self.__name__)
+
+
+def lazy_import(name):
+    """
+    Returns module `name`, imported when it is first used.
+
+    Heavy optional dependencies of modules are imported like this, so
+    i3pystatus starts quickly. Whether the module is installed is checked
+    right away, so a missing dependency still raises ImportError when the
+    module using it is registered.
+
+    .. code:: python
+
+        requests = lazy_import("requests")
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ImportError("No module named {!r}".format(name), name=name)
+    return LazyModule(name)
+
+
+def load_config(path, module_name="i3pystatus-config"):
+    """Executes the configuration file at `path` as module `module_name`."""
+    loader = importlib.machinery.SourceFileLoader(module_name, path)
+    spec = importlib.util.spec_from_file_location(module_name, path, loader=loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    loader.exec_module(module)
+    return module
+
+
+def default_index_path(package_path):
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    digest = hashlib.sha1(package_path.encode()).hexdigest()[:12]
+    return os.path.join(cache, "i3pystatus", "module-index-{}.json".format(digest))
+
+
+class ModuleIndex:
+    """
+    Index of the modules of a package: the classes every module provides
+    (as found by :py:class:`ClassFinder`) and their settings.
+
+    Building the index imports every module, so it is stored in a JSON
+    file and only rebuilt when a file of the package changed (or the
+    Python version did). Modules that could not be imported are tried
+    again every time, as their dependencies may have been installed since.
+
+    :param baseclass: Base class of the classes to index
+    :param package: Name of the package
+    :param path: File the index is stored in, None for a file in the user's
+        cache directory, False to not store it
+    """
+
+    IGNORE_MODULES = ("__main__", "core", "tools")
+
+    def __init__(self, baseclass, package="i3pystatus", path=None):
+        self.finder = ClassFinder(baseclass)
+        self.package = package
+        self.package_path = os.path.dirname(import_module(package).__file__)
+        self.path = default_index_path(self.package_path) if path is None else path
+
+    def signature(self):
+        """Hash over the name, size and modification time of every source file of the package."""
+        digest = hashlib.sha1(sys.version.encode())
+        for root, dirs, files in os.walk(self.package_path):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    stat = os.stat(os.path.join(root, name))
+                    relpath = os.path.relpath(os.path.join(root, name), self.package_path)
+                    digest.update("{}:{}:{}\n".format(relpath, stat.st_size, stat.st_mtime_ns).encode())
+        return digest.hexdigest()
+
+    def entries(self):
+        """
+        Returns {module name: entry}, where entry is either
+        ``{"error": message}`` or ``{"classes": [class entry, ...]}`` with
+        one class entry per class (see :py:meth:`class_entry`).
+        """
+        signature = self.signature()
+        entries = self.load(signature)
+        if entries is None:
+            entries = {name: self.index_module(name) for name in self.module_names()}
+        else:
+            for name, entry in entries.items():
+                if "error" in entry:
+                    entries[name] = self.index_module(name)
+        self.save(signature, entries)
+        return entries
+
+    def module_names(self):
+        return sorted(name for _, name, _ in pkgutil.iter_modules([self.package_path])
+                      if name not in self.IGNORE_MODULES)
+
+    def index_module(self, name):
+        try:
+            module = import_module("{}.{}".format(self.package, name))
+        except Exception as e:
+            # Not only ImportError, bindings also fail to load their libraries (OSError)
+            return {"error": str(e)}
+        return {"classes": [self.class_entry(cls) for cls in self.finder.get_matching_classes(module)]}
+
+    @staticmethod
+    def class_entry(cls):
+        """
+        Returns the metadata of `cls` stored in the index: its name and
+        path, its settings as (name, docstring) pairs, the required settings
+        and the settings (including protected ones) having a default.
+        """
+        settings = [list(setting) if isinstance(setting, tuple) else [setting, None]
+                    for setting in getattr(cls, "settings", ())]
+        protected = getattr(cls, "_SettingsBase__PROTECTED_SETTINGS", [])
+        names = [setting[0] for setting in settings]
+        names += [name for name in protected if name not in names]
+        return {
+            "name": cls.__name__,
+            "path": "{}.{}".format(cls.__module__, cls.__name__),
+            "settings": settings,
+            "required": sorted(getattr(cls, "required", ())),
+            "defaults": [name for name in names if hasattr(cls, name)],
+        }
+
+    def load(self, signature):
+        if not self.path:
+            return None
+        try:
+            with open(self.path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get("signature") != signature:
+            return None
+        return index["modules"]
+
+    def save(self, signature, entries):
+        if not self.path:
+            return
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump({"signature": signature, "modules": entries}, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log.warning("Could not write module index %s: %s", self.path, e)
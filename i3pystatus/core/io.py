@@ -1,11 +1,20 @@
+import _thread
+import atexit
+import collections
 import json
+import os
+import select
 import signal
 import sys
+import time
 
 from contextlib import contextmanager
 from threading import Condition
 from threading import Thread
-from i3pystatus.core.modules import IntervalModule
+from i3pystatus.core import codec, metrics, startup
+from i3pystatus.core.modules import IntervalModule, AsyncIntervalModule
+from i3pystatus.core.tracing import tracer
+from i3pystatus.core.util import lchop
 
 
 class IOHandler:
@@ -19,6 +28,11 @@ class IOHandler:
         self.out.write(message + "\n")
         self.out.flush()
 
+    def write_frame(self, message):
+        """Writes a status line. Unlike other lines, a status line may be superseded by a newer one."""
+
+        self.write_line(message)
+
     def read(self):
         """Iterate over all input lines (Generator)"""
 
@@ -46,14 +60,162 @@ class IOHandler:
         return line
 
 
+class FrameWriter:
+    """
+    Writes lines to `out` from a dedicated thread, so a slow or stopped
+    reader (e.g. i3bar while it is hidden) never blocks the caller.
+
+    Ordinary lines are queued and written in order. Status lines go into a
+    single slot instead: a newer status line replaces one that was not
+    written yet, so a reader that catches up only sees the latest state.
+    Status lines are passed without the separating comma of the i3bar
+    protocol, which the writer adds itself so that dropping lines cannot
+    break the stream.
+
+    If `out` is backed by a file descriptor, it is switched to non-blocking
+    mode and the writer waits for it with select(). The mode belongs to the
+    open file (it is shared with dup'd descriptors and other processes
+    writing to the same pipe), so it is restored when the writer stops or
+    the interpreter exits.
+
+    `blocked_time`, `blocked_writes`, `dropped_frames` and `frames` count
+    how the reader kept up. They are exported through
+    :py:data:`i3pystatus.core.metrics.registry` while the writer runs.
+
+    :param out: File-like object to write to
+    :param on_close: Called from the writer thread if the reader went away
+    :param name: Name of the writer in the metrics
+    """
+
+    def __init__(self, out, on_close=None, name="writer"):
+        self.out = out
+        self.name = name
+        self.on_close = on_close
+        try:
+            self.fd = out.fileno()
+        except (AttributeError, OSError, ValueError):
+            self.fd = None
+        self.cond = Condition()
+        self.lines = collections.deque()
+        self.frame = None
+        self.frames = 0
+        self.dropped_frames = 0
+        self.blocked_writes = 0
+        self.blocked_time = 0.0
+        self.closed = False
+        self.was_blocking = None
+        self.thread = Thread(target=self._write_loop, name="FrameWriter", daemon=True)
+
+    def start(self):
+        with self.cond:
+            if self.thread.ident is not None:
+                return
+            if self.fd is not None:
+                self.out.flush()
+                self.was_blocking = os.get_blocking(self.fd)
+                os.set_blocking(self.fd, False)
+                atexit.register(self.restore_blocking)
+            metrics.registry.add_writer(self)
+            self.thread.start()
+
+    def close(self):
+        """Stops the writer thread once all queued lines are written."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+    def write_line(self, line):
+        with self.cond:
+            self.lines.append(line)
+            self.cond.notify()
+
+    def write_frame(self, line):
+        with self.cond:
+            if self.frame is not None:
+                self.dropped_frames += 1
+            self.frame = line
+            self.cond.notify()
+
+    def _write_loop(self):
+        try:
+            self._write_lines()
+        finally:
+            metrics.registry.remove_writer(self)
+            self.restore_blocking()
+
+    def restore_blocking(self):
+        """Switches `out` back to blocking mode if it was before :py:meth:`start`."""
+        if self.was_blocking:
+            # Only once, the descriptor may be reused after out is closed
+            self.was_blocking = None
+            atexit.unregister(self.restore_blocking)
+            try:
+                os.set_blocking(self.fd, True)
+            except OSError:
+                # Already closed
+                pass
+
+    def _write_lines(self):
+        while True:
+            with self.cond:
+                while not self.lines and self.frame is None and not self.closed:
+                    self.cond.wait()
+                is_frame = not self.lines
+                if self.lines:
+                    line = self.lines.popleft()
+                elif self.frame is None:
+                    return
+                else:
+                    line, self.frame = self.frame, None
+                    if self.frames:
+                        line = "," + line
+                    self.frames += 1
+            try:
+                self._write(line + "\n")
+            except (ConnectionError, ValueError):
+                if self.on_close:
+                    self.on_close()
+                return
+            if is_frame:
+                tracer.frame_written()
+                if self.frames == 1:
+                    startup.report.first_frame()
+
+    def _write(self, data):
+        if self.fd is None:
+            self.out.write(data)
+            self.out.flush()
+            return
+        data = data.encode("UTF-8")
+        while data:
+            try:
+                written = os.write(self.fd, data)
+            except BlockingIOError:
+                self.blocked_writes += 1
+                start = time.monotonic()
+                select.select([], [self.fd], [])
+                self.blocked_time += time.monotonic() - start
+            else:
+                data = data[written:]
+
+
 class StandaloneIO(IOHandler):
     """
     I/O handler for standalone usage of i3pystatus (w/o i3status)
 
-    Writing works as usual, but reading will always return a empty JSON array,
+    Writing is done by a :py:class:`FrameWriter`, but reading will always return a empty JSON array,
     and the i3bar protocol header
+
+    Refresh requests (see :py:meth:`async_refresh`) are rate limited: the
+    first request after a quiet period produces a frame at once, further
+    requests within `min_frame_interval` of the last frame are merged into
+    a single frame at the end of that window. No request waits longer than
+    `max_latency`. `refresh_requests`, `merged_refreshes` and `frames`
+    count what happened.
     """
 
+    #: Time source of the rate limiting (replaced by tests)
+    clock = time.monotonic
     n = -1
     proto = [
         {
@@ -62,7 +224,8 @@ class StandaloneIO(IOHandler):
         }, "[", "[]", ",[]",
     ]
 
-    def __init__(self, click_events, modules, keep_alive, interval=1):
+    def __init__(self, click_events, modules, keep_alive, interval=1,
+                 min_frame_interval=0.05, max_latency=0.25):
         """
         StandaloneIO instance must be created in main thread to be able to set
         the SIGUSR1 signal handler.
@@ -71,8 +234,11 @@ class StandaloneIO(IOHandler):
         super().__init__()
         self.interval = interval
         self.modules = modules
+        self.min_frame_interval = min_frame_interval
+        self.max_latency = max_latency
 
-        self.proto[0]['click_events'] = click_events
+        # A copy, the class attribute is shared by all instances
+        self.proto = [dict(self.proto[0], click_events=click_events)] + self.proto[1:]
 
         if keep_alive:
             self.proto[0].update(dict(stop_signal=signal.SIGUSR2,
@@ -82,24 +248,62 @@ class StandaloneIO(IOHandler):
         self.proto[0] = json.dumps(self.proto[0])
 
         self.refresh_cond = Condition()
+        self.refresh_pending = None
+        self.last_frame = self.clock()
+        self.refresh_requests = 0
+        self.merged_refreshes = 0
+        self.frames = 0
         self.treshold_interval = 20.0
 
         self.stopped = False
         signal.signal(signal.SIGUSR1, self.refresh_signal_handler)
 
+        # Stop the main loop like a closed stdout did when it was written synchronously.
+        # The writer is started on first use, so stdout stays untouched in server mode.
+        self.writer = FrameWriter(self.out, on_close=_thread.interrupt_main, name="stdout")
+
+    def write_line(self, message):
+        self.writer.start()
+        self.writer.write_line(message)
+
+    def write_frame(self, message):
+        self.writer.start()
+        self.writer.write_frame(lchop(message, ","))
+
     def read(self):
         self.compute_treshold_interval()
-        self.refresh_cond.acquire()
+        self.last_frame = self.clock()
 
         while True:
             try:
-                self.refresh_cond.wait(timeout=self.interval)
+                with self.refresh_cond:
+                    while True:
+                        now = self.clock()
+                        due = self.next_frame()
+                        if due <= now:
+                            break
+                        self.refresh_cond.wait(timeout=due - now)
+                    self.start_frame(now)
+                tracer.mark_ready("wakeup")
             except KeyboardInterrupt:
-                self.refresh_cond.release()
                 return
 
             yield self.read_line()
 
+    def start_frame(self, now):
+        """Consumes the pending refresh requests for a frame produced at `now`."""
+        # Must be called with self.refresh_cond held
+        self.refresh_pending = None
+        self.last_frame = now
+        self.frames += 1
+
+    def next_frame(self):
+        """Returns the point in time at which the next frame is due."""
+        if self.refresh_pending is None:
+            return self.last_frame + self.interval
+        return min(self.last_frame + self.min_frame_interval,
+                   self.refresh_pending + self.max_latency)
+
     def read_line(self):
         self.n += 1
 
@@ -117,12 +321,18 @@ class StandaloneIO(IOHandler):
     def async_refresh(self):
         """
         Calling this method will send the status line to i3bar immediately
-        without waiting for timeout (1s by default).
+        without waiting for timeout (1s by default), or at the end of the
+        current rate limiting window, merged with other requests.
         """
 
-        self.refresh_cond.acquire()
-        self.refresh_cond.notify()
-        self.refresh_cond.release()
+        tracer.mark_ready("refresh")
+        with self.refresh_cond:
+            self.refresh_requests += 1
+            if self.refresh_pending is not None:
+                self.merged_refreshes += 1
+                return
+            self.refresh_pending = self.clock()
+            self.refresh_cond.notify()
 
     def refresh_signal_handler(self, signo, frame):
         """
@@ -144,12 +354,12 @@ class StandaloneIO(IOHandler):
             return
 
         for module in self.modules:
-            if hasattr(module, "interval"):
+            if isinstance(module, IntervalModule):
                 if module.interval > self.treshold_interval:
-                    thread = Thread(target=module.run)
+                    thread = Thread(target=module)
                     thread.start()
                 else:
-                    module.run()
+                    module()
             else:
                 module.run()
 
@@ -163,22 +373,43 @@ class StandaloneIO(IOHandler):
         and "cont_signal" key/value pairs in the header to allow sending a custom signal when these events occur.
 
         Here we use SIGUSR2 for both "stop_signal" and "cont_signal" and maintain a toggle to determine whether
-        we have just been stopped or continued. When we have been stopped, notify the IntervalModule managers
-        that they should suspend any module that does not set the keep_alive flag to a truthy value, and when we
-        have been continued, notify the IntervalModule managers that they can resume execution of all modules.
+        we have just been stopped or continued. When we have been stopped, notify the IntervalModule scheduler
+        and event loop that they should suspend any module that does not set the keep_alive flag to a truthy
+        value, and when we have been continued, notify them that they can resume execution of all modules.
         """
         if signo != signal.SIGUSR2:
             return
         self.stopped = not self.stopped
+        runtime = AsyncIntervalModule.runtime
         if self.stopped:
-            [m.suspend() for m in IntervalModule.managers.values()]
+            IntervalModule.scheduler.suspend()
+            if runtime is not None:
+                runtime.suspend()
         else:
-            [m.resume() for m in IntervalModule.managers.values()]
+            IntervalModule.scheduler.resume()
+            if runtime is not None:
+                runtime.resume()
 
 
 class JSONIO:
-    def __init__(self, io, skiplines=2):
+    """
+    Reads i3bar protocol lines from `io`, lets the caller modify each parsed
+    line and writes it back.
+
+    :param io: IOHandler to read from and write to
+    :param skiplines: Number of header lines copied verbatim
+    :param resend_interval: Seconds after which :py:meth:`write_frames`
+        writes an unchanged line again (None never re-sends)
+    :param echo: If False, lines yielded by :py:meth:`read` are not written
+        back (e.g. for the click event stream)
+    """
+
+    def __init__(self, io, skiplines=2, resend_interval=None, echo=True):
         self.io = io
+        self.echo = echo
+        self.resend_interval = resend_interval
+        self.last_line = None
+        self.last_write = time.monotonic()
         for i in range(skiplines):
             self.io.write_line(self.io.read_line())
 
@@ -189,6 +420,37 @@ class JSONIO:
             with self.parse_line(line) as j:
                 yield j
 
+    def write_frames(self, render):
+        """
+        Writes a status line for every input line without parsing the input
+        (standalone mode, where input lines are placeholders).
+
+        :param render: Callable returning the serialized status line. If it
+            returns the same line as before, nothing is written.
+        """
+        last_frame = None
+        for line in self.io.read():
+            prefix = "," if line.startswith(",") else ""
+            frame = render()
+            if frame == last_frame:
+                self.resend()
+            else:
+                last_frame = frame
+                self.write_line(prefix + frame)
+
+    def resend(self):
+        """Write the last line again if `resend_interval` has passed."""
+        if self.resend_interval is None or self.last_line is None:
+            return
+        if time.monotonic() - self.last_write >= self.resend_interval:
+            # Every line but the first continues the infinite array
+            self.write_line("," + lchop(self.last_line, ","))
+
+    def write_line(self, line):
+        self.last_line = line
+        self.last_write = time.monotonic()
+        self.io.write_frame(line)
+
     @contextmanager
     def parse_line(self, line):
         """Parse a single line of JSON and write modified JSON back."""
@@ -198,6 +460,7 @@ class JSONIO:
         if line.startswith(","):
             line, prefix = line[1:], ","
 
-        j = json.loads(line)
+        j = codec.loads(line)
         yield j
-        self.io.write_line(prefix + json.dumps(j))
+        if self.echo:
+            self.write_line(prefix + codec.dumps(j))
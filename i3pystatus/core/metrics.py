@@ -0,0 +1,268 @@
+"""
+Runtime metrics of modules.
+
+For every module the number of runs, failed runs and runs exceeding
+``run_timeout``, a histogram of run times, the number of output changes
+and the time of the last successful run are recorded in
+:py:data:`registry`, as well as how the reader of the status lines kept
+up with every :py:class:`~i3pystatus.core.io.FrameWriter`. The metrics can be exported in the Prometheus text
+format, to a file (e.g. for the textfile collector of the node exporter)
+or over a Unix socket:
+
+.. code:: bash
+
+    curl --unix-socket $XDG_RUNTIME_DIR/i3pystatus-metrics.sock http://localhost/metrics
+
+The metrics of a module are dropped when it is unregistered, e.g. because
+a reload removed it.
+"""
+
+import bisect
+import logging
+import os
+import socket
+import threading
+import time
+import weakref
+
+log = logging.getLogger(__name__)
+
+#: Upper bounds of the run time histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class ModuleMetrics:
+    """Metrics of a single module."""
+
+    def __init__(self, module):
+        self.name = getattr(module, "__name__", None) or module.__class__.__name__
+        self.instance = str(id(module))
+        try:
+            self.ref = weakref.ref(module)
+        except TypeError:
+            self.ref = None
+        self.runs = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.output_changes = 0
+        self.last_success = None
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.run_time = 0.0
+
+    def is_for(self, module):
+        """Whether these are the metrics of `module` (and not of a collected module with the same id)."""
+        return self.ref is None or self.ref() is module
+
+    @property
+    def collected(self):
+        return self.ref is not None and self.ref() is None
+
+    def observe_run(self, duration, failed):
+        self.runs += 1
+        self.run_time += duration
+        self.buckets[bisect.bisect_left(BUCKETS, duration)] += 1
+        if failed:
+            self.errors += 1
+        else:
+            self.last_success = time.time()
+
+
+class Registry:
+    """Collects :py:class:`ModuleMetrics` of all modules."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.modules = {}
+        self.writers = weakref.WeakSet()
+        self.started = time.time()
+
+    def get(self, module):
+        with self.lock:
+            return self._get(module)
+
+    def _get(self, module):
+        metrics = self.modules.get(id(module))
+        if metrics is None or not metrics.is_for(module):
+            metrics = self.modules[id(module)] = ModuleMetrics(module)
+        return metrics
+
+    def remove(self, module):
+        """Drops the metrics of `module`, e.g. when a reload removed it."""
+        with self.lock:
+            metrics = self.modules.get(id(module))
+            if metrics is not None and metrics.is_for(module):
+                del self.modules[id(module)]
+
+    def add_writer(self, writer):
+        """Exports the counters of a :py:class:`~i3pystatus.core.io.FrameWriter`."""
+        with self.lock:
+            self.writers.add(writer)
+
+    def remove_writer(self, writer):
+        with self.lock:
+            self.writers.discard(writer)
+
+    def observe_run(self, module, duration, failed=False):
+        """Records a run of `module` that took `duration` seconds."""
+        with self.lock:
+            self._get(module).observe_run(duration, failed)
+
+    def observe_timeout(self, module):
+        """Records that a run of `module` exceeded its ``run_timeout``."""
+        with self.lock:
+            self._get(module).timeouts += 1
+
+    def observe_output_change(self, module):
+        with self.lock:
+            self._get(module).output_changes += 1
+
+    def prometheus(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self.lock:
+            # Recorded by a run that finished after its module was removed
+            for key, metrics in list(self.modules.items()):
+                if metrics.collected:
+                    del self.modules[key]
+            modules = sorted(self.modules.values(), key=lambda m: (m.name, m.instance))
+            writers = sorted(self.writers, key=lambda w: (w.name, id(w)))
+            lines = []
+
+            def family(name, type, help, samples):
+                lines.append("# HELP {} {}".format(name, help))
+                lines.append("# TYPE {} {}".format(name, type))
+                lines.extend(samples)
+
+            def labels(metrics, **extra):
+                pairs = [("module", metrics.name), ("instance", metrics.instance)] + sorted(extra.items())
+                return "{" + ",".join('{}="{}"'.format(key, escape(value)) for key, value in pairs) + "}"
+
+            family("i3pystatus_module_runs_total", "counter", "Number of runs of the module.",
+                   ["i3pystatus_module_runs_total{} {}".format(labels(m), m.runs) for m in modules])
+            family("i3pystatus_module_errors_total", "counter", "Number of failed runs.",
+                   ["i3pystatus_module_errors_total{} {}".format(labels(m), m.errors) for m in modules])
+            family("i3pystatus_module_timeouts_total", "counter", "Number of runs exceeding run_timeout.",
+                   ["i3pystatus_module_timeouts_total{} {}".format(labels(m), m.timeouts) for m in modules])
+            family("i3pystatus_module_output_changes_total", "counter", "Number of changes of the module's output.",
+                   ["i3pystatus_module_output_changes_total{} {}".format(labels(m), m.output_changes)
+                    for m in modules])
+            family("i3pystatus_module_last_success_timestamp_seconds", "gauge",
+                   "Unix time of the last successful run.",
+                   ["i3pystatus_module_last_success_timestamp_seconds{} {:.3f}".format(labels(m), m.last_success)
+                    for m in modules if m.last_success is not None])
+            samples = []
+            for m in modules:
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), m.buckets):
+                    cumulative += count
+                    samples.append("i3pystatus_module_run_seconds_bucket{} {}".format(
+                        labels(m, le=str(bound)), cumulative))
+                samples.append("i3pystatus_module_run_seconds_sum{} {:.6f}".format(labels(m), m.run_time))
+                samples.append("i3pystatus_module_run_seconds_count{} {}".format(labels(m), m.runs))
+            family("i3pystatus_module_run_seconds", "histogram", "Run time of the module.", samples)
+
+            def writer_labels(writer):
+                return '{{writer="{}",instance="{}"}}'.format(escape(writer.name), id(writer))
+
+            family("i3pystatus_writer_frames_total", "counter", "Number of status lines written.",
+                   ["i3pystatus_writer_frames_total{} {}".format(writer_labels(w), w.frames) for w in writers])
+            family("i3pystatus_writer_dropped_frames_total", "counter",
+                   "Number of status lines replaced by a newer one before they were written.",
+                   ["i3pystatus_writer_dropped_frames_total{} {}".format(writer_labels(w), w.dropped_frames)
+                    for w in writers])
+            family("i3pystatus_writer_blocked_writes_total", "counter",
+                   "Number of writes that had to wait for the reader.",
+                   ["i3pystatus_writer_blocked_writes_total{} {}".format(writer_labels(w), w.blocked_writes)
+                    for w in writers])
+            family("i3pystatus_writer_blocked_seconds_total", "counter", "Time spent waiting for the reader.",
+                   ["i3pystatus_writer_blocked_seconds_total{} {:.6f}".format(writer_labels(w), w.blocked_time)
+                    for w in writers])
+            family("i3pystatus_start_time_seconds", "gauge", "Unix time i3pystatus was started.",
+                   ["i3pystatus_start_time_seconds {:.3f}".format(self.started)])
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Writes :py:meth:`prometheus` to `path` (atomically)."""
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+#: The process-wide registry
+registry = Registry()
+
+
+class Exporter:
+    """
+    Exports a :py:class:`Registry` from a background thread.
+
+    :param registry: Registry to export
+    :param textfile: Path of a file that is rewritten every `interval` seconds
+    :param socket_path: Path of a Unix socket answering every connection
+        with the metrics (as an HTTP response if the client sent a request)
+    :param interval: Seconds between two writes of `textfile`
+    """
+
+    def __init__(self, registry, textfile=None, socket_path=None, interval=15):
+        self.registry = registry
+        self.textfile = textfile and os.path.expandvars(os.path.expanduser(textfile))
+        self.socket_path = socket_path and os.path.expandvars(os.path.expanduser(socket_path))
+        self.interval = interval
+        self.sock = None
+
+    def start(self):
+        if self.textfile:
+            threading.Thread(target=self._write_loop, name="MetricsFile", daemon=True).start()
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.bind(self.socket_path)
+            os.chmod(self.socket_path, 0o600)
+            self.sock.listen()
+            threading.Thread(target=self._accept_loop, name="MetricsSocket", daemon=True).start()
+
+    def _write_loop(self):
+        while True:
+            try:
+                self.registry.write_textfile(self.textfile)
+            except OSError as e:
+                log.warning("Cannot write metrics to %s: %s", self.textfile, e)
+            time.sleep(self.interval)
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    self._respond(conn)
+                except OSError:
+                    pass
+
+    def _respond(self, conn):
+        request = b""
+        conn.settimeout(0.5)
+        try:
+            while b"\r\n\r\n" not in request and b"\n\n" not in request:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                request += data
+        except socket.timeout:
+            pass
+        body = self.registry.prometheus().encode("UTF-8")
+        if request.split(b" ", 1)[0] in (b"GET", b"HEAD"):
+            head = ("HTTP/1.0 200 OK\r\n"
+                    "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                    "Content-Length: {}\r\n\r\n").format(len(body)).encode("ascii")
+            if request.startswith(b"HEAD"):
+                body = b""
+            body = head + body
+        conn.sendall(body)
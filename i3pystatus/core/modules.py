@@ -2,8 +2,10 @@ import html
 import inspect
 import traceback
 
+from i3pystatus.core import codec, metrics
+from i3pystatus.core.tracing import tracer
 from i3pystatus.core.settings import SettingsBase
-from i3pystatus.core.threading import Manager
+from i3pystatus.core.threading import Scheduler
 from i3pystatus.core.util import (convert_position,
                                   MultiClickHandler)
 from i3pystatus.core.command import execute
@@ -41,6 +43,8 @@ class Module(SettingsBase):
         ('on_change', "Callback called when output is changed (see :ref:`callbacks`)"),
         ('multi_click_timeout', "Time (in seconds) before a single click is executed."),
         ('hints', "Additional output blocks for module output (see :ref:`hints`)"),
+        ('outputs', "List of outputs the module is shown on in server mode (see :ref:`server`), "
+                    "all outputs if not set"),
     )
 
     on_leftclick = None
@@ -62,8 +66,12 @@ class Module(SettingsBase):
 
     hints = {"markup": "none"}
 
+    outputs = None
+
     def __init__(self, *args, **kwargs):
         self._output = None
+        self.dirty = True
+        self.fragment = None
         super(Module, self).__init__(*args, **kwargs)
         self.__multi_click = MultiClickHandler(self.__button_callback_handler,
                                                self.multi_click_timeout)
@@ -75,6 +83,7 @@ class Module(SettingsBase):
     @output.setter
     def output(self, value):
         self._output = value
+        self.dirty = True
         if self.on_change:
             self.on_change()
 
@@ -82,21 +91,62 @@ class Module(SettingsBase):
         """Called when this module is registered with a status handler"""
         self.__status_handler = status_handler
 
-    def inject(self, json):
+    def unregistered(self):
+        """
+        Called when this module was removed from its status handler, e.g.
+        because a reloaded configuration does not contain it anymore.
+        Modules holding connections or threads release them here.
+        """
+        metrics.registry.remove(self)
+
+    def inject(self, blocks):
         if self.output:
-            if "name" not in self.output:
-                self.output["name"] = self.__name__
-            self.output["instance"] = str(id(self))
-            if (self.output.get("color", "") or "").lower() == "#ffffff":
-                del self.output["color"]
-            if self.hints:
-                for key, val in self.hints.items():
-                    if key not in self.output:
-                        self.output.update({key: val})
-            if self.output.get("markup") == "pango":
-                self.text_to_pango()
-
-            json.insert(convert_position(self.position, json), self.output)
+            self.complete_block(self.output)
+            blocks.insert(convert_position(self.position, blocks), self.output)
+
+    def complete_block(self, block):
+        """Adds name, instance and hints to an output block (in place)."""
+        if "name" not in block:
+            block["name"] = self.__name__
+        block["instance"] = str(id(self))
+        if (block.get("color", "") or "").lower() == "#ffffff":
+            del block["color"]
+        if self.hints:
+            for key, val in self.hints.items():
+                if key not in block:
+                    block[key] = val
+        if block.get("markup") == "pango":
+            self.text_to_pango(block)
+        return block
+
+    def update_fragment(self):
+        """
+        Rebuilds `fragment`, the serialized i3bar block of this module, if
+        the output may have changed since the last call.
+
+        Unlike :py:meth:`inject` this works on a copy of the output.
+
+        :returns: True if the fragment changed
+        """
+        if not self.dirty:
+            return False
+        self.dirty = False
+        output = self.output
+        fragment = codec.dumps(self.complete_block(dict(output))) if output else None
+        if fragment == self.fragment:
+            return False
+        self.fragment = fragment
+        metrics.registry.observe_output_change(self)
+        return True
+
+    def shown_on(self, output):
+        """Whether the module is shown on the bar of `output` (None: any bar)."""
+        return output is None or not self.outputs or output in self.outputs
+
+    def inject_fragment(self, fragments):
+        """Like :py:meth:`inject`, but inserts the serialized block into a list of strings."""
+        if self.fragment is not None:
+            fragments.insert(convert_position(self.position, fragments), self.fragment)
 
     def run(self):
         pass
@@ -111,6 +161,7 @@ class Module(SettingsBase):
         self.logger.debug(msg)
 
     def __button_callback_handler(self, button, cb, **kwargs):
+        tracer.callback(self)
 
         def call_callback(cb, *args, **kwargs):
             # Recover the function if wrapped (with get_module for example)
@@ -245,6 +296,7 @@ class Module(SettingsBase):
             delay_execution = (not double and double_handler)
 
             if delay_execution:
+                tracer.wait_for_callback(self)
                 m_click.set_timer(button, cb, **kwargs)
             else:
                 self.__button_callback_handler(button, cb, **kwargs)
@@ -253,10 +305,10 @@ class Module(SettingsBase):
         self.position = position
         return self
 
-    def text_to_pango(self):
+    def text_to_pango(self, block=None):
         """
         Replaces all ampersands in `full_text` and `short_text` attributes of
-        `self.output` with `&amp;`.
+        `block` (`self.output` by default) with `&amp;`.
 
         It is called internally when pango markup is used.
 
@@ -274,34 +326,95 @@ class Module(SettingsBase):
                     out += "&amp;" + item
             return out
 
-        if "full_text" in self.output.keys():
-            self.output["full_text"] = replace(self.output["full_text"])
-        if "short_text" in self.output.keys():
-            self.output["short_text"] = replace(self.output["short_text"])
+        if block is None:
+            block = self.output
+        if "full_text" in block.keys():
+            block["full_text"] = replace(block["full_text"])
+        if "short_text" in block.keys():
+            block["short_text"] = replace(block["short_text"])
 
 
 class IntervalModule(Module):
     settings = (
         ("interval", "interval in seconds between module updates"),
+        ("run_timeout", "Seconds a single update may take before the module is detached "
+                        "from the shared workers and shown as stale (None to disable)"),
     )
     interval = 5  # seconds
-    managers = {}
+    run_timeout = 60  # seconds
+    scheduler = Scheduler()
 
     def registered(self, status_handler):
         super(IntervalModule, self).registered(status_handler)
-        if self.interval in IntervalModule.managers:
-            IntervalModule.managers[self.interval].append(self)
-        else:
-            am = Manager(self.interval)
-            am.append(self)
-            IntervalModule.managers[self.interval] = am
-            am.start()
+        IntervalModule.scheduler.append(self, self.interval, self.run_timeout)
+
+    def unregistered(self):
+        IntervalModule.scheduler.remove(self)
+        super().unregistered()
 
     def __call__(self):
-        self.run()
+        tracer.run_started(self)
+        try:
+            self.run()
+        finally:
+            # run() may have modified the output dict in place
+            self.dirty = True
+            tracer.run_finished(self)
 
     def run(self):
         """Called approximately every self.interval seconds
 
         Do not rely on this being called from the same thread at all times.
         If you need to always have the same thread context, subclass AsyncModule."""
+
+
+class AsyncIntervalModule(IntervalModule):
+    """
+    Base class for I/O bound modules whose ``run`` is a coroutine.
+
+    All instances share a single asyncio event loop running in one thread
+    (see :py:class:`.EventLoop`), so ``run`` must never block: use the
+    helpers in :py:mod:`i3pystatus.core.eventloop` (``fetch``,
+    ``run_process``, ``open_connection``) or wrap blocking calls with
+    ``to_thread``.
+
+    .. code:: python
+
+        from i3pystatus import AsyncIntervalModule
+        from i3pystatus.core.eventloop import fetch
+
+        class Example(AsyncIntervalModule):
+            async def run(self):
+                response = await fetch("https://example.com/status.json")
+                self.output = {"full_text": response.json()["status"]}
+
+    Subclasses that keep a plain ``run`` method still work, they are run in
+    the loop's executor.
+    """
+
+    #: The shared :py:class:`.EventLoop`, created with the first instance (asyncio takes a while to import)
+    runtime = None
+
+    @staticmethod
+    def get_runtime():
+        if AsyncIntervalModule.runtime is None:
+            from i3pystatus.core.eventloop import EventLoop
+            AsyncIntervalModule.runtime = EventLoop()
+        return AsyncIntervalModule.runtime
+
+    def registered(self, status_handler):
+        Module.registered(self, status_handler)
+        self.get_runtime().append(self)
+
+    def unregistered(self):
+        self.get_runtime().remove(self)
+        Module.unregistered(self)
+
+    def __call__(self):
+        """Runs the module once from outside the event loop and waits until it finished."""
+        runtime = self.get_runtime()
+        runtime.submit(runtime.execute(self)).result()
+        self.dirty = True
+
+    async def run(self):
+        """Called approximately every self.interval seconds, from the event loop thread."""
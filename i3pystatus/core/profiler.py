@@ -0,0 +1,148 @@
+"""
+Sampling profiler for a running i3pystatus process.
+
+All threads are sampled at a low rate and every sample is attributed to the
+module whose code the thread was running. The result is written in the
+collapsed stack format read by flamegraph.pl, speedscope and similar tools,
+one line per distinct stack: the module (or thread) name, the functions
+from the outermost to the innermost separated by semicolons, and the
+number of samples.
+
+Started with ``i3pystatus --profile``, or toggled with SIGPROF:
+
+.. code:: bash
+
+    pkill -PROF -f "python /home/user/.config/i3/pystatus.py"
+"""
+
+import collections
+import logging
+import os
+import selectors
+import sys
+import tempfile
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+def default_path():
+    return os.path.join(tempfile.gettempdir(), "i3pystatus-{}.collapsed".format(os.getpid()))
+
+
+class SamplingProfiler:
+    """
+    :param path: File the collapsed stacks are written to
+    :param interval: Seconds between two samples
+    :param include_idle: Also record threads waiting for work
+    """
+
+    def __init__(self, path=None, interval=0.02, include_idle=False):
+        self.path = path or default_path()
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+        self.thread = None
+        self.attribution = {}
+        self.idle = set()
+
+    def start(self):
+        if self.running.is_set():
+            return
+        self.setup()
+        self.running.set()
+        self.thread = threading.Thread(target=self._sample_loop, name="SamplingProfiler", daemon=True)
+        self.thread.start()
+        log.info("Profiling to %s", self.path)
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def toggle(self, signo=None, frame=None):
+        """Starts profiling, or stops it and writes the result (usable as signal handler)."""
+        if self.running.is_set():
+            self.finish()
+        else:
+            self.start()
+
+    def finish(self):
+        """Stops profiling and writes the result, if profiling is running."""
+        if self.running.is_set():
+            self.stop()
+            self.write()
+
+    def setup(self):
+        """Collects the code objects used to attribute and filter samples."""
+        from i3pystatus.core import CommandEndpoint
+        from i3pystatus.core.eventloop import EventLoop
+        from i3pystatus.core.modules import IntervalModule
+
+        # Code object -> name of the local variable holding the module
+        self.attribution = {
+            IntervalModule.__call__.__code__: "self",
+            EventLoop.execute.__code__: "module",
+            CommandEndpoint.dispatch.__code__: "target_module",
+        }
+        self.idle = {
+            threading.Condition.wait.__code__,
+            threading.Event.wait.__code__,
+            selectors.DefaultSelector.select.__code__,
+        }
+        if hasattr(threading.Thread, "_wait_for_tstate_lock"):
+            self.idle.add(threading.Thread._wait_for_tstate_lock.__code__)
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while self.running.is_set():
+            threads = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.sample(threads.get(ident, str(ident)), frame)
+            time.sleep(self.interval)
+
+    def sample(self, thread_name, frame):
+        if frame.f_code in self.idle and not self.include_idle:
+            with self.lock:
+                self.idle_samples += 1
+            return
+        stack = []
+        root = "thread:" + thread_name
+        while frame is not None:
+            code = frame.f_code
+            local = self.attribution.get(code)
+            if local is not None and root.startswith("thread:"):
+                module = frame.f_locals.get(local)
+                if module is not None:
+                    root = "{}@{}".format(getattr(module, "__name__", module.__class__.__name__), id(module))
+            stack.append("{} ({}:{})".format(code.co_name, short_path(code.co_filename), code.co_firstlineno))
+            frame = frame.f_back
+        stack.append(root)
+        key = ";".join(reversed(stack))
+        with self.lock:
+            self.stacks[key] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        with self.lock:
+            return "".join("{} {}\n".format(stack, count) for stack, count in sorted(self.stacks.items()))
+
+    def write(self, path=None):
+        """Writes the collapsed stacks recorded so far."""
+        path = path or self.path
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        log.info("Wrote %d samples (%d idle samples skipped) to %s", self.samples, self.idle_samples, path)
+        return path
+
+
+def short_path(filename):
+    """The last two components of `filename`, e.g. ``i3pystatus/clock.py``."""
+    return "/".join(filename.replace(";", "_").split(os.sep)[-2:])
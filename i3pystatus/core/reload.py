@@ -0,0 +1,189 @@
+"""
+Reloading the configuration file of a running i3pystatus (on SIGHUP).
+
+.. code:: bash
+
+    pkill -HUP -f "python /home/user/.config/i3/pystatus.py"
+
+The configuration file is executed again, but instead of a new
+:py:class:`.Status` it gets a :py:class:`ConfigCollector`. Every module
+registered with the same class and the same settings as a running module
+gets the running instance, so it keeps its state (open connections,
+counters, fetched data). Only modules that were added or changed are
+created, and modules that are not registered anymore are stopped. If the
+configuration file fails, the modules it created (including the ones of a
+:py:class:`.Group`) are stopped again and the running ones are kept.
+
+Settings are compared by value; callbacks are the same if they have the
+same code and closure, and objects such as backends are the same if they
+are of the same class and were created with the same settings. Modules
+registered as instances are always created again, and changed settings of
+:py:class:`.Status` itself only take effect after a restart.
+"""
+
+import logging
+import sys
+import threading
+import types
+
+from i3pystatus.core.imputil import load_config
+from i3pystatus.core.settings import SettingsBase
+
+log = logging.getLogger(__name__)
+
+#: The :py:class:`ConfigCollector` while a configuration file is executed again
+collector = None
+lock = threading.Lock()
+
+
+def settings_equal(a, b):
+    """Whether the settings `a` and `b` (or settings of a module) are the same."""
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(map(settings_equal, a, b))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(settings_equal(a[key], b[key]) for key in a)
+    if isinstance(a, types.FunctionType):
+        return (code_equal(a.__code__, b.__code__)
+                and settings_equal(a.__defaults__, b.__defaults__)
+                and settings_equal(a.__kwdefaults__, b.__kwdefaults__)
+                and settings_equal(cell_contents(a), cell_contents(b)))
+    if isinstance(a, types.CodeType):
+        return code_equal(a, b)
+    if isinstance(a, types.MethodType):
+        return a.__func__ is b.__func__ and settings_equal(a.__self__, b.__self__)
+    if isinstance(a, SettingsBase):
+        return settings_equal(getattr(a, "_given_settings", None), getattr(b, "_given_settings", None))
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+def code_equal(a, b):
+    """Like ``a == b``, but ignoring where the code is in the file (registrations may move)."""
+    return (a.co_code == b.co_code
+            and a.co_names == b.co_names
+            and a.co_varnames == b.co_varnames
+            and a.co_freevars == b.co_freevars
+            and a.co_argcount == b.co_argcount
+            and a.co_kwonlyargcount == b.co_kwonlyargcount
+            and a.co_flags == b.co_flags
+            and settings_equal(a.co_consts, b.co_consts))
+
+
+def cell_contents(function):
+    contents = []
+    for cell in function.__closure__ or ():
+        try:
+            contents.append(cell.cell_contents)
+        except ValueError:
+            # Empty cell
+            contents.append(None)
+    return contents
+
+
+class RegistrationList:
+    """
+    Takes the place of the :py:class:`.ModuleList` of the running
+    :py:class:`.Status` while the configuration is executed again.
+
+    :param modules: The running ModuleList
+    """
+
+    def __init__(self, modules):
+        self.finder = modules.finder
+        self.running = [(module, modules.registrations.get(id(module))) for module in modules]
+        #: (module, registration) pairs in the order they were registered
+        self.registrations = []
+        #: Modules created while the configuration was executed, including
+        #: the ones registered with a :py:class:`.Group`
+        self.created = []
+
+    def append(self, module, *args, **kwargs):
+        cls = self.finder.resolve(module)
+        for index, (running, registration) in enumerate(self.running):
+            if registration is not None and registration[0] is cls \
+                    and settings_equal(registration[1:], (args, kwargs)):
+                del self.running[index]
+                self.registrations.append((running, registration))
+                return running
+        module = self.finder.instanciate_class_from_module(cls, *args, **kwargs)
+        self.registrations.append((module, (cls, args, kwargs)))
+        self.created.append(module)
+        return module
+
+    def __iter__(self):
+        return (module for module, _ in self.registrations)
+
+    def __len__(self):
+        return len(self.registrations)
+
+
+class ConfigCollector:
+    """
+    Stands in for the :py:class:`.Status` created by the configuration file
+    while it is executed again and collects the registered modules.
+
+    :param status: The running Status
+    """
+
+    def __init__(self, status):
+        self.modules = RegistrationList(status.modules)
+        self.default_hints = None
+        #: The arguments the configuration file passed to Status
+        self.arguments = None
+
+    def __call__(self, args, kwargs):
+        # Called by Status.__new__
+        self.arguments = (args, kwargs)
+        self.default_hints = kwargs.get("default_hints")
+        return self
+
+    def register(self, module, *args, **kwargs):
+        from i3pystatus.core import Status
+        return Status.register(self, module, *args, **kwargs)
+
+    def run(self):
+        pass
+
+    def discard(self):
+        """
+        Unregisters the modules created while the configuration file was
+        executed, for a reload that is not applied. Modules nested in
+        another created module (e.g. a Group) are left to their parent.
+        """
+        from i3pystatus.core.util import ModuleList
+        created = self.modules.created
+        nested = {id(child) for module in created for child in ModuleList.nested(module) if child is not module}
+        for module in reversed(created):
+            if id(module) in nested:
+                continue
+            try:
+                module.unregistered()
+            except Exception:
+                log.exception("Could not unregister %r", module)
+
+
+def collect(status, path, module_name="i3pystatus-config"):
+    """
+    Executes the configuration file at `path` again and returns the
+    :py:class:`ConfigCollector` that took the place of its Status.
+    """
+    global collector
+    with lock:
+        previous = sys.modules.get(module_name)
+        collector = ConfigCollector(status)
+        try:
+            load_config(path, module_name)
+        except BaseException:
+            if previous is not None:
+                sys.modules[module_name] = previous
+            collector.discard()
+            raise
+        finally:
+            result, collector = collector, None
+    return result
@@ -0,0 +1,243 @@
+"""
+Server mode: one i3pystatus process collects the data, any number of bars
+attach to it over a Unix socket.
+
+The protocol on the socket is the i3bar protocol itself, so a client only
+has to copy bytes: the client sends one JSON line naming its output (e.g.
+``{"output": "DP-1"}``) and then forwards the click events it reads from
+i3bar. The server answers with the i3bar header, the opening ``[`` and a
+status line whenever the line for that output changed.
+"""
+
+import json
+import logging
+import os
+import select
+import socket
+import sys
+import threading
+
+from i3pystatus.core import codec
+from i3pystatus.core.io import FrameWriter
+from i3pystatus.core.util import lchop
+
+log = logging.getLogger(__name__)
+
+
+class Client:
+    """A bar connected to a :py:class:`Server`."""
+
+    def __init__(self, server, sock, output):
+        self.server = server
+        self.sock = sock
+        self.output = output
+        self.last_frame = None
+        self.writer = FrameWriter(sock.makefile("w", encoding="UTF-8"), on_close=self.close, name="client")
+        self.thread = threading.Thread(target=self._read_loop, name="Client", daemon=True)
+
+    def start(self, header):
+        self.writer.write_line(header)
+        self.writer.write_line("[")
+        self.writer.start()
+        self.thread.start()
+
+    def write_frame(self, frame):
+        if frame is not self.last_frame:
+            self.last_frame = frame
+            self.writer.write_frame(frame)
+
+    def close(self):
+        self.server.remove(self)
+        self.writer.close()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _read_loop(self):
+        for line in read_lines(self.sock):
+            line = lchop(line.strip(), ",")
+            if not line or line == "[":
+                continue
+            try:
+                cmd = codec.loads(line)
+            except ValueError:
+                log.warning("Invalid click event from %s: %r", self.output, line)
+                continue
+            self.server.dispatch(cmd)
+        self.close()
+        self.writer.thread.join()
+        self.writer.out.close()
+        self.sock.close()
+
+
+class Server:
+    """
+    Serves status lines to bars connected to the Unix socket at `path`.
+
+    Every module is shown on the outputs in its ``outputs`` setting, or on
+    all outputs if that is not set. Click events of all clients are routed
+    to the modules of this process.
+
+    :param path: Path of the Unix socket
+    :param render_frames: Callable taking a list of outputs and returning a
+        dict mapping each output to its serialized status line
+    :param dispatch: Callable handling a click event dict
+    :param refresh: Callable requesting a new status line (e.g.
+        :py:meth:`.StandaloneIO.async_refresh`)
+    :param click_events: Whether click events are requested from i3bar
+    """
+
+    def __init__(self, path, render_frames, dispatch, refresh, click_events=True):
+        self.path = os.path.expandvars(os.path.expanduser(path))
+        self.render_frames = render_frames
+        self.dispatch = dispatch
+        self.refresh = refresh
+        self.header = json.dumps({"version": 1, "click_events": click_events})
+        self.clients = []
+        self.lock = threading.Lock()
+        self.sock = None
+        self.thread = threading.Thread(target=self._accept_loop, name="Server", daemon=True)
+
+    def start(self):
+        if os.path.exists(self.path):
+            # A stale socket of a previous run; fails if another server listens on it
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                os.unlink(self.path)
+            else:
+                probe.close()
+                raise OSError("Another i3pystatus server is listening on {}".format(self.path))
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self.sock.listen()
+        self.thread.start()
+
+    def stop(self):
+        for client in list(self.clients):
+            client.close()
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def serve(self, ticks):
+        """Writes the status lines to all clients for every item of `ticks`."""
+        try:
+            for _ in ticks:
+                self.write_frames()
+        finally:
+            self.stop()
+
+    def write_frames(self):
+        with self.lock:
+            clients = list(self.clients)
+        frames = self.render_frames(list({client.output for client in clients}))
+        for client in clients:
+            client.write_frame(frames[client.output])
+
+    def remove(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+                log.info("Client for output %s disconnected", client.output)
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handshake, args=(sock,), daemon=True).start()
+
+    def _handshake(self, sock):
+        try:
+            sock.settimeout(5)
+            # Read byte-wise, the client may send click events right after the handshake
+            line = b""
+            while not line.endswith(b"\n"):
+                data = sock.recv(1)
+                if not data:
+                    raise EOFError()
+                line += data
+            sock.settimeout(None)
+            output = json.loads(line.decode("UTF-8")).get("output")
+        except (OSError, EOFError, ValueError, AttributeError):
+            log.warning("Invalid handshake on %s", self.path)
+            sock.close()
+            return
+        client = Client(self, sock, output)
+        with self.lock:
+            self.clients.append(client)
+        log.info("Client for output %s connected", output)
+        client.start(self.header)
+        self.refresh()
+
+
+def read_lines(sock):
+    """Yields the lines received on `sock` (which may be non-blocking) until EOF."""
+    buffer = b""
+    while True:
+        select.select([sock], [], [])
+        try:
+            data = sock.recv(4096)
+        except BlockingIOError:
+            continue
+        except OSError:
+            return
+        if not data:
+            return
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("UTF-8", "replace")
+
+
+def connect(path, output=None, inp=sys.stdin, out=sys.stdout):
+    """
+    Runs a thin client: attaches to the server at `path`, writes the status
+    lines for `output` to `out` and forwards click events from `inp`.
+
+    If the server cannot be reached, a status line with the error is shown.
+
+    :returns: Exit status
+    """
+    path = os.path.expandvars(os.path.expanduser(path))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError as e:
+        out.write(json.dumps({"version": 1}) + "\n[\n")
+        out.write(json.dumps([{
+            "full_text": "i3pystatus: cannot connect to {}: {}".format(path, e.strerror or e),
+            "color": "#FF0000",
+        }]) + "\n")
+        out.flush()
+        return 1
+    sock.sendall(json.dumps({"output": output}).encode("UTF-8") + b"\n")
+
+    def forward_clicks():
+        try:
+            for line in inp:
+                sock.sendall(line.encode("UTF-8"))
+        except OSError:
+            pass
+        try:
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    threading.Thread(target=forward_clicks, daemon=True).start()
+    try:
+        for line in read_lines(sock):
+            out.write(line + "\n")
+            out.flush()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+    finally:
+        sock.close()
+    return 0
@@ -1,5 +1,5 @@
-from i3pystatus.core.util import KeyConstraintDict
 from i3pystatus.core.exceptions import ConfigKeyError, ConfigMissingError
+import functools
 import inspect
 import logging
 import getpass
@@ -22,24 +22,66 @@ class SettingsBaseMeta(type):
             return [setting for setting in settings if not (
                 name(setting) in seen or seen.add(name(setting)))]
 
-        settings = tuple()
+        settings = []
         required = set()
+        covered = set()
         # getmro returns base classes according to Method Resolution Order,
         # which always includes the class itself as the first element.
-        for base in inspect.getmro(cls):
-            settings += tuple(getattr(base, "settings", []))
+        mro = inspect.getmro(cls)
+        for base in mro:
+            if base in covered:
+                continue
+            settings.extend(getattr(base, "settings", []))
             required |= set(getattr(base, "required", []))
+            if base is not cls and isinstance(base, SettingsBaseMeta):
+                # The settings of this base already include those of its bases
+                covered.update(inspect.getmro(base))
         # if a derived class defines a default for a setting it is not
         # required anymore, provided that default is not set to None.
-        for base in inspect.getmro(cls):
-            for r in list(required):
-                if hasattr(base, r) and getattr(base, r) != getattr(cls, r) \
-                        or hasattr(cls, r) and getattr(cls, r) is not None:
-                    required.remove(r)
+        for r in list(required):
+            default = getattr(cls, r, None)
+            if default is not None or any(hasattr(base, r) and getattr(base, r) != default for base in mro):
+                required.remove(r)
 
         return unique(settings), required
 
 
+class SettingsSchema:
+    """
+    What creating an instance of a :py:class:`SettingsBase` class needs to
+    know about its settings, computed once per class.
+    """
+
+    def __init__(self, cls):
+        self.settings = cls.settings
+        self.required = cls.required
+        self.names = frozenset(SettingsBase.flatten_settings(cls.settings))
+        self.required_names = frozenset(cls.required)
+        # Protected settings that are looked up in the keyring if not given
+        self.protected = tuple(name for name in SettingsBase._SettingsBase__PROTECTED_SETTINGS
+                               if name in cls.required or hasattr(cls, name))
+
+    @classmethod
+    def of(cls, settings_class):
+        schema = settings_class.__dict__.get("_settings_schema")
+        # Rebuilt if the settings of the class were replaced
+        if schema is None or schema.settings is not settings_class.settings \
+                or schema.required is not settings_class.required:
+            schema = SettingsSchema(settings_class)
+            settings_class._settings_schema = schema
+        return schema
+
+
+@functools.lru_cache(maxsize=None)
+def get_keyring():
+    """Returns the keyring module, or None if it is not installed."""
+    try:
+        import keyring
+    except ImportError:
+        return None
+    return keyring
+
+
 class SettingsBase(metaclass=SettingsBaseMeta):
     """
     Support class for providing a nice and flexible settings interface
@@ -82,30 +124,30 @@ class SettingsBase(metaclass=SettingsBaseMeta):
 
         self.__name__ = "{}.{}".format(self.__module__, self.__class__.__name__)
 
-        settings = self.flatten_settings(self.settings)
-
-        sm = KeyConstraintDict(settings, self.required)
+        schema = SettingsSchema.of(type(self))
         settings_source = get_argument_dict(args, kwargs)
+        # Compared by a configuration reload to find unchanged objects (see core.reload)
+        self._given_settings = dict(settings_source)
 
         protected = self.get_protected_settings(settings_source)
         settings_source.update(protected)
 
-        try:
-            sm.update(settings_source)
-        except KeyError as exc:
-            raise ConfigKeyError(type(self).__name__, key=exc.args[0]) from exc
+        for key in settings_source:
+            if key not in schema.names:
+                raise ConfigKeyError(type(self).__name__, key=key)
 
-        try:
-            self.__dict__.update(sm)
-        except KeyConstraintDict.MissingKeys as exc:
-            raise ConfigMissingError(
-                type(self).__name__, missing=exc.keys) from exc
+        missing = schema.required_names.difference(settings_source)
+        if missing:
+            raise ConfigMissingError(type(self).__name__, missing=set(missing))
+        self.__dict__.update(settings_source)
 
         if self.__name__.startswith("i3pystatus"):
             self.logger = logging.getLogger(self.__name__)
         else:
             self.logger = logging.getLogger("i3pystatus." + self.__name__)
-        self.logger.setLevel(self.log_level)
+        # Setting the level clears the cache of all loggers, even if it did not change
+        if self.logger.level != self.log_level:
+            self.logger.setLevel(self.log_level)
         self.init()
 
     def get_protected_settings(self, settings_source):
@@ -114,17 +156,13 @@ class SettingsBase(metaclass=SettingsBaseMeta):
         """
         user_backend = settings_source.get('keyring_backend')
         found_settings = dict()
-        for setting_name in self.__PROTECTED_SETTINGS:
+        for setting_name in SettingsSchema.of(type(self)).protected:
             # Nothing to do if the setting is already defined.
             if settings_source.get(setting_name):
                 continue
 
-            setting = None
             identifier = "%s.%s" % (self.__name__, setting_name)
-            if hasattr(self, 'required') and setting_name in getattr(self, 'required'):
-                setting = self.get_setting_from_keyring(identifier, user_backend)
-            elif hasattr(self, setting_name):
-                setting = self.get_setting_from_keyring(identifier, user_backend)
+            setting = self.get_setting_from_keyring(identifier, user_backend)
             if setting:
                 found_settings.update({setting_name: setting})
         return found_settings
@@ -139,11 +177,8 @@ class SettingsBase(metaclass=SettingsBaseMeta):
             return keyring_backend.get_password(setting_identifier, getpass.getuser())
 
         # Otherwise try and use default keyring.
-        try:
-            import keyring
-        except ImportError:
-            pass
-        else:
+        keyring = get_keyring()
+        if keyring is not None:
             return keyring.get_password(setting_identifier, getpass.getuser())
 
     def init(self):
@@ -0,0 +1,83 @@
+"""
+Measures how long i3pystatus takes until the first status line is written.
+
+For every registered module the time to import it (when registered by
+name) and to create and register the instance is recorded, as well as
+when :py:meth:`.Status.run` was called and the age of the process when
+the first status line was written. ``i3pystatus --startup-report`` prints
+the report to stderr after the first status line.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+timer = time.perf_counter
+
+
+def process_age():
+    """Seconds since this process was started, or None if unknown (i.e. not on Linux)."""
+    try:
+        with open("/proc/self/stat") as f:
+            stat = f.read()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except OSError:
+        return None
+    # The command name in parentheses may contain spaces
+    start_ticks = int(stat.rsplit(")", 1)[1].split()[19])
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+class StartupReport:
+    def __init__(self):
+        self.modules = []
+        self.run_time = None
+        self.first_frame_age = None
+        self.first_frame_time = None
+        self.print_report = False
+        self.started = timer()
+        self.started_age = process_age()
+        self.lock = threading.Lock()
+
+    def record_module(self, name, import_time, init_time):
+        self.modules.append((name, import_time, init_time))
+
+    def run_called(self):
+        if self.run_time is None:
+            self.run_time = timer() - self.started
+
+    def first_frame(self):
+        """Called after a status line was written; only the first call counts."""
+        with self.lock:
+            if self.first_frame_time is not None:
+                return
+            self.first_frame_time = timer() - self.started
+            self.first_frame_age = process_age()
+        log.info("%s", self.report())
+        if self.print_report:
+            sys.stderr.write(self.report() + "\n")
+            sys.stderr.flush()
+
+    def report(self):
+        lines = ["{:<40} {:>10} {:>10}".format("module", "import ms", "init ms")]
+        for name, import_time, init_time in sorted(self.modules, key=lambda m: -(m[1] + m[2])):
+            lines.append("{:<40} {:>10.1f} {:>10.1f}".format(name, import_time * 1000, init_time * 1000))
+        lines.append("{:<40} {:>10.1f} {:>10.1f}".format(
+            "total", sum(m[1] for m in self.modules) * 1000, sum(m[2] for m in self.modules) * 1000))
+        if self.started_age is not None:
+            lines.append("process age when i3pystatus was imported: {:.0f} ms".format(self.started_age * 1000))
+        if self.run_time is not None:
+            lines.append("Status.run(): {:.1f} ms after import".format(self.run_time * 1000))
+        if self.first_frame_time is not None:
+            lines.append("first status line: {:.1f} ms after import".format(self.first_frame_time * 1000))
+        if self.first_frame_age is not None:
+            lines.append("process age at first status line: {:.0f} ms".format(self.first_frame_age * 1000))
+        return "\n".join(lines)
+
+
+#: The report of this process
+report = StartupReport()
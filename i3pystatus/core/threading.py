@@ -1,8 +1,15 @@
+import collections
+import heapq
+import itertools
+import logging
+import math
 import threading
 import time
 import sys
-from i3pystatus.core.util import partition
 
+from i3pystatus.core import metrics
+
+log = logging.getLogger(__name__)
 timer = time.perf_counter if hasattr(time, "perf_counter") else time.clock
 
 
@@ -13,95 +20,88 @@ def unwrap_workload(workload):
     return workload
 
 
-class Thread(threading.Thread):
-    def __init__(self, target_interval, workloads=None, start_barrier=1):
-        super().__init__()
-        self.workloads = workloads or []
-        self.target_interval = target_interval
-        self.start_barrier = start_barrier
-        self._suspended = threading.Event()
-        self.daemon = True
-
-    def __iter__(self):
-        return iter(self.workloads)
-
-    def __len__(self):
-        return len(self.workloads)
-
-    def pop(self):
-        return self.workloads.pop()
-
-    def append(self, workload):
-        self.workloads.append(workload)
-
-    @property
-    def time(self):
-        return sum(map(lambda workload: workload.time, self))
-
-    def wait_for_start_barrier(self):
-        while len(self) <= self.start_barrier:
-            time.sleep(0.4)
-
-    def execute_workloads(self):
-        for workload in self:
-            if self.should_execute(workload):
-                workload()
-        self.workloads.sort(key=lambda workload: workload.time)
-
-    def should_execute(self, workload):
-        """
-        If we have been suspended by i3bar, only execute those modules that set the keep_alive flag to a truthy
-        value. See the docs on the suspend_signal_handler method of the io module for more information.
-        """
-        if not self._suspended.is_set():
-            return True
-        workload = unwrap_workload(workload)
-        return hasattr(workload, 'keep_alive') and getattr(workload, 'keep_alive')
+class Wrapper:
+    def __init__(self, workload):
+        self.workload = workload
 
-    def run(self):
-        while self:
-            self.execute_workloads()
-            filltime = self.target_interval - self.time
-            if filltime > 0:
-                time.sleep(filltime)
+    def __repr__(self):
+        return repr(self.workload)
 
-    def branch(self, vtime, bound):
-        if len(self) > 1 and vtime > bound:
-            remove = self.pop()
-            return [remove] + self.branch(vtime - remove.time, bound)
-        return []
 
-    def suspend(self):
-        self._suspended.set()
+class ExceptionWrapper(Wrapper):
+    """
+    Catches exceptions of a workload, logs them and shows them in the bar.
 
-    def resume(self):
-        self._suspended.clear()
+    It also acts as a circuit breaker: after repeated failures `backoff`
+    grows exponentially (up to `max_backoff` seconds, which modules can
+    override with an attribute of the same name), which the scheduler
+    multiplies with the interval of the workload. Exceptions are logged at
+    most once per backoff window and the first successful run resets the
+    breaker.
+    """
 
+    max_backoff = 300  # seconds
 
-class Wrapper:
     def __init__(self, workload):
-        self.workload = workload
+        super().__init__(workload)
+        self.failures = 0
+        self.last_logged = None
 
-    def __repr__(self):
-        return repr(self.workload)
+    @property
+    def interval(self):
+        return getattr(self.workload, "interval", 0)
+
+    @property
+    def backoff(self):
+        """Factor by which the interval of the workload is currently stretched."""
+        if self.failures < 2 or self.interval <= 0:
+            return 1
+        max_backoff = getattr(self.workload, "max_backoff", self.max_backoff)
+        limit = max(1, max_backoff // self.interval)
+        return min(2 ** (self.failures - 1), limit)
 
+    @property
+    def is_open(self):
+        """True while runs of the workload are being delayed."""
+        return self.backoff > 1
 
-class ExceptionWrapper(Wrapper):
     def __call__(self):
         try:
             self.workload()
         except:
+            self.handle_exception()
+        else:
+            self.reset()
+
+    def reset(self):
+        if self.failures and hasattr(self.workload, "logger"):
+            self.workload.logger.info("Recovered after %d failed runs", self.failures)
+        self.failures = 0
+        self.last_logged = None
+
+    def handle_exception(self):
+        """Log the exception currently being handled and show it in the bar."""
+        self.failures += 1
+        now = time.monotonic()
+        window = self.interval * self.backoff
+        if self.last_logged is None or now - self.last_logged >= window:
+            self.last_logged = now
             message = "Exception in {thread} at {time}, module {name}".format(
                 thread=threading.current_thread().name,
                 time=time.strftime("%c"),
                 name=self.workload.__class__.__name__
             )
+            if self.failures > 1:
+                message += " ({} failures in a row)".format(self.failures)
             if hasattr(self.workload, "logger"):
                 self.workload.logger.error(message, exc_info=True)
-            self.workload.output = {
-                "full_text": self.format_exception(),
-                "color": "#FF0000",
-            }
+        full_text = self.format_exception()
+        if self.is_open:
+            full_text += " (retry in {:.0f}s)".format(window)
+        self.workload.output = {
+            "full_text": full_text,
+            "color": "#FF0000",
+        }
 
     def format_exception(self):
         type, value, _ = sys.exc_info()
@@ -120,58 +120,373 @@ class ExceptionWrapper(Wrapper):
 
 
 class WorkloadWrapper(Wrapper):
+    """
+    Measures the run time of a workload.
+
+    Besides the duration of the last run (`time`) an exponentially weighted
+    moving average (`ewma`) and the 95th percentile of the last `window`
+    runs (`p95`) are kept, so a single slow run does not dominate.
+
+    Every run is also recorded in :py:data:`.metrics.registry`.
+    """
+
     time = 0.0
+    ewma = None
+    alpha = 0.2
+    window = 20
+
+    def __init__(self, workload):
+        super().__init__(workload)
+        self.samples = collections.deque(maxlen=self.window)
+        self.module = unwrap_workload(workload)
 
     def __call__(self):
         tp1 = timer()
         self.workload()
         self.time = timer() - tp1
+        # An ExceptionWrapper resets its failure count after a successful run
+        metrics.registry.observe_run(self.module, self.time, getattr(self.workload, "failures", 0) > 0)
+        self.samples.append(self.time)
+        if self.ewma is None:
+            self.ewma = self.time
+        else:
+            self.ewma += self.alpha * (self.time - self.ewma)
+
+    @property
+    def p95(self):
+        if not self.samples:
+            return None
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+class Job:
+    """
+    A workload in the scheduler queue, due every `interval` seconds.
+
+    If `timeout` is set, a single run taking longer than `timeout` seconds
+    is detached from the worker pool by the scheduler's watchdog.
+    """
 
+    def __init__(self, workload, interval, timeout=None):
+        self.workload = workload
+        self.interval = interval
+        self.timeout = timeout
+        self.deadline = 0.0
+        self.started = None
+        self.quarantined = False
+        self.removed = False
+        self.fresh_output = None
+        self.stale_output = None
 
-class Manager:
-    def __init__(self, target_interval):
-        self.target_interval = target_interval
-        self.upper_bound = target_interval * 1.1
-        self.lower_bound = target_interval * 0.7
+    @property
+    def module(self):
+        return unwrap_workload(self.workload)
 
-        initial_thread = Thread(target_interval, [self.wrap(self)])
-        self.threads = [initial_thread]
+    @property
+    def backoff(self):
+        workload = self.workload
+        while isinstance(workload, Wrapper):
+            if isinstance(workload, ExceptionWrapper):
+                return workload.backoff
+            workload = workload.workload
+        return 1
 
     def __call__(self):
-        separate = []
-        for thread in self.threads:
-            separate.extend(thread.branch(thread.time, self.upper_bound))
-        self.create_threads(self.partition_workloads(separate))
+        self.workload()
 
     def __repr__(self):
-        return "Manager"
-
-    def wrap(self, workload):
-        return WorkloadWrapper(ExceptionWrapper(workload))
+        return "Job({!r}, interval={})".format(self.workload, self.interval)
+
+
+class Scheduler:
+    """
+    Runs the workloads of all interval modules from a single deadline queue.
+
+    One dispatcher thread sleeps until the earliest deadline and hands all
+    due workloads to a bounded pool of worker threads. Workers are started
+    on demand, up to `max_workers`, and exit after `idle_timeout` seconds
+    without work. Deadlines are aligned to a common grid, so modules with
+    the same (or a multiple of the same) interval are dispatched together.
+
+    The number of workers is rebalanced every `rebalance_interval` seconds
+    from the smoothed cost of all jobs: the pool grows when the expected
+    load exceeds `target_utilization` of the current workers and shrinks
+    again (with some hysteresis) when it falls. Decisions are kept in
+    `rebalance_log`.
+
+    The dispatcher also acts as a watchdog: a job that runs longer than its
+    timeout is quarantined. Its worker is taken out of the pool (and
+    replaced if needed), the module output is marked stale and the job is
+    not scheduled again until the hung run returns.
+
+    :param max_workers: Maximum number of worker threads
+    :param idle_timeout: Seconds an idle worker waits for work before exiting
+    :param rebalance_interval: Seconds between two rebalancing decisions
+    """
+
+    stale_color = "#888888"
+    target_utilization = 0.7
+    hysteresis = 0.5
+
+    def __init__(self, max_workers=8, idle_timeout=30.0, rebalance_interval=10.0):
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self.rebalance_interval = rebalance_interval
+        # Until costs are known, allow the pool to grow to its bound
+        self.target_workers = max_workers
+        self.rebalance_log = collections.deque(maxlen=100)
+
+        self.lock = threading.Lock()
+        self.dispatch_cond = threading.Condition(self.lock)
+        self.work_cond = threading.Condition(self.lock)
+
+        self.queue = []
+        self.pending = collections.deque()
+        self.running = []
+        self.jobs = []
+        self.workers = 0
+        self.idle_workers = 0
+
+        self.epoch = time.monotonic()
+        self.last_rebalance = self.epoch
+        self._counter = itertools.count()
+        self._suspended = threading.Event()
+        self._dispatcher = None
+        self.stopped = False
 
-    def partition_workloads(self, workloads):
-        return partition(workloads, self.lower_bound, lambda workload: workload.time)
+    def __iter__(self):
+        return iter(self.jobs)
 
-    def create_threads(self, threads):
-        for workloads in threads:
-            self.create_thread(workloads)
+    def __len__(self):
+        return len(self.jobs)
 
-    def create_thread(self, workloads):
-        thread = Thread(self.target_interval, workloads, start_barrier=0)
-        thread.start()
-        self.threads.append(thread)
+    def wrap(self, workload):
+        return WorkloadWrapper(ExceptionWrapper(workload))
 
-    def append(self, workload):
-        self.threads[0].append(self.wrap(workload))
+    def append(self, workload, interval, timeout=None):
+        """Schedule `workload` to run now and every `interval` seconds."""
+        job = Job(self.wrap(workload), interval, timeout)
+        with self.lock:
+            self.jobs.append(job)
+            self.push(job, time.monotonic())
+        self.start()
+        return job
+
+    def remove(self, module):
+        """Stops scheduling `module`; a run in progress is finished."""
+        with self.lock:
+            for job in list(self.jobs):
+                if job.module is module:
+                    job.removed = True
+                    self.jobs.remove(job)
 
     def start(self):
-        for thread in self.threads:
-            thread.start()
+        with self.lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self.stopped = False
+                self._dispatcher = threading.Thread(target=self.dispatch_loop, name="Scheduler", daemon=True)
+                self._dispatcher.start()
+
+    def stop(self):
+        """
+        Removes all jobs and stops the dispatcher and the workers (e.g. at
+        the end of a test). Runs in progress are finished. Appending a job
+        starts the scheduler again.
+        """
+        with self.lock:
+            self.stopped = True
+            for job in self.jobs:
+                job.removed = True
+            self.jobs.clear()
+            self.queue.clear()
+            self.pending.clear()
+            self.dispatch_cond.notify()
+            self.work_cond.notify_all()
+            dispatcher = self._dispatcher
+        if dispatcher is not None:
+            dispatcher.join()
+
+    def next_deadline(self, job, now):
+        """Returns the next point on the job's interval grid after `now`."""
+        interval = job.interval * job.backoff
+        if interval <= 0:
+            return now
+        periods = (now - self.epoch) // interval + 1
+        return self.epoch + periods * interval
+
+    def push(self, job, deadline):
+        # Must be called with self.lock held
+        job.deadline = deadline
+        heapq.heappush(self.queue, (deadline, next(self._counter), job))
+        if self.queue[0][2] is job:
+            self.dispatch_cond.notify()
+
+    def dispatch_loop(self):
+        with self.lock:
+            while not self.stopped:
+                now = time.monotonic()
+                if now - self.last_rebalance >= self.rebalance_interval:
+                    self.rebalance(now)
+                while self.queue and self.queue[0][0] <= now:
+                    _, _, job = heapq.heappop(self.queue)
+                    if job.removed:
+                        continue
+                    if self.should_execute(job):
+                        self.dispatch(job)
+                    else:
+                        self.push(job, self.next_deadline(job, now))
+                wakeups = [self.queue[0][0]] if self.queue else []
+                wakeups.extend(self.watchdog(now))
+                self.dispatch_cond.wait(min(wakeups) - now if wakeups else None)
+
+    def load(self):
+        """
+        Returns the expected number of busy workers, i.e. the sum over all
+        jobs of their smoothed run time divided by their interval.
+        """
+        # Must be called with self.lock held
+        load = 0.0
+        for job in self.jobs:
+            cost = job.workload.ewma
+            if cost is None or job.quarantined:
+                continue
+            load += cost / job.interval if job.interval > 0 else 1.0
+        return load
+
+    def rebalance(self, now):
+        # Must be called with self.lock held
+        self.last_rebalance = now
+        if not self.jobs:
+            # Nothing to decide on, e.g. after a reload removed every job
+            return
+        demand = self.load() / self.target_utilization
+        target = self.target_workers
+        if demand > target:
+            target = math.ceil(demand)
+        elif demand + self.hysteresis < target - 1:
+            target = math.ceil(demand + self.hysteresis)
+        target = max(1, min(self.max_workers, target))
+        if target == self.target_workers:
+            return
+
+        slowest = max(self.jobs, key=lambda job: job.workload.ewma or 0.0)
+        entry = dict(time=time.time(), workers=self.workers, old_target=self.target_workers, new_target=target,
+                     demand=demand, slowest=repr(slowest.module), ewma=slowest.workload.ewma,
+                     p95=slowest.workload.p95)
+        self.rebalance_log.append(entry)
+        log.info("%s worker pool from %d to %d (demand %.3f, slowest %s: ewma %.4fs, p95 %.4fs)",
+                 "Growing" if target > self.target_workers else "Shrinking",
+                 self.target_workers, target, demand, entry["slowest"], entry["ewma"] or 0.0, entry["p95"] or 0.0)
+        self.target_workers = target
+        # Wake idle workers so surplus ones can exit
+        self.work_cond.notify_all()
+
+    def watchdog(self, now):
+        """
+        Quarantines running jobs that exceeded their timeout and returns the
+        points in time at which the remaining running jobs will time out.
+        """
+        # Must be called with self.lock held
+        expiries = []
+        for job in self.running:
+            if job.timeout is None or job.quarantined:
+                continue
+            expiry = job.started + job.timeout
+            if expiry <= now:
+                self.quarantine(job)
+            else:
+                expiries.append(expiry)
+        return expiries
+
+    def quarantine(self, job):
+        # Must be called with self.lock held
+        job.quarantined = True
+        self.workers -= 1
+        module = job.module
+        metrics.registry.observe_timeout(module)
+        if hasattr(module, "logger"):
+            module.logger.warning("run() exceeded run_timeout of %ss, detaching %s from the worker pool",
+                                  job.timeout, module.__class__.__name__)
+        job.fresh_output = module.output
+        job.stale_output = self.mark_stale(module)
+        if self.pending and self.idle_workers < len(self.pending):
+            self.spawn_worker()
+
+    @classmethod
+    def mark_stale(cls, module):
+        output = dict(module.output or {"full_text": module.__class__.__name__})
+        output["color"] = cls.stale_color
+        module.output = output
+        return output
+
+    def dispatch(self, job):
+        # Must be called with self.lock held
+        self.pending.append(job)
+        if self.idle_workers < len(self.pending) and self.workers < self.target_workers:
+            self.spawn_worker()
+        else:
+            self.work_cond.notify()
+
+    def spawn_worker(self):
+        # Must be called with self.lock held
+        self.workers += 1
+        threading.Thread(target=self.work_loop, name="Worker", daemon=True).start()
+
+    def work_loop(self):
+        with self.lock:
+            while True:
+                while not self.pending:
+                    if self.stopped or self.workers > self.target_workers:
+                        self.workers -= 1
+                        return
+                    self.idle_workers += 1
+                    notified = self.work_cond.wait(self.idle_timeout)
+                    self.idle_workers -= 1
+                    if not notified and not self.pending:
+                        self.workers -= 1
+                        return
+                job = self.pending.popleft()
+                if job.removed:
+                    continue
+                job.started = time.monotonic()
+                self.running.append(job)
+                if job.timeout is not None:
+                    self.dispatch_cond.notify()
+                self.lock.release()
+                try:
+                    job()
+                finally:
+                    self.lock.acquire()
+                self.running.remove(job)
+                if not job.removed:
+                    self.push(job, self.next_deadline(job, time.monotonic()))
+                if job.quarantined:
+                    # This worker was replaced while the job was hung
+                    job.quarantined = False
+                    module = job.module
+                    if module.output is job.stale_output:
+                        module.output = job.fresh_output
+                    job.fresh_output = job.stale_output = None
+                    if hasattr(module, "logger"):
+                        module.logger.warning("%s recovered after %.1fs", module.__class__.__name__,
+                                              time.monotonic() - job.started)
+                    return
+
+    def should_execute(self, job):
+        """
+        If we have been suspended by i3bar, only execute those modules that set the keep_alive flag to a truthy
+        value. See the docs on the suspend_signal_handler method of the io module for more information.
+        """
+        if not self._suspended.is_set():
+            return True
+        workload = unwrap_workload(job.workload)
+        return hasattr(workload, 'keep_alive') and getattr(workload, 'keep_alive')
 
     def suspend(self):
-        for thread in self.threads:
-            thread.suspend()
+        self._suspended.set()
 
     def resume(self):
-        for thread in self.threads:
-            thread.resume()
+        self._suspended.clear()
+        with self.lock:
+            self.dispatch_cond.notify()
@@ -0,0 +1,248 @@
+"""
+Latency tracing from a click or module update to the status line reaching
+i3bar.
+
+When enabled (``i3pystatus --trace FILE``), every click and every module
+update is followed through these stages, each one timestamped:
+
+=================  ============================================================
+Stage              Recorded when
+=================  ============================================================
+click              the click event was read by the click thread
+multi_click_wait   the callback was delayed to wait for a possible double click
+callback           the click callback was executed
+run_start          the module's ``run`` started
+run_end            the module's ``run`` returned
+refresh            a refresh of the status line was requested
+wakeup             the output loop woke up to produce a status line
+render             the status line was rendered with the changed output
+write              the status line was written to stdout
+=================  ============================================================
+
+A trace is complete when a status line containing the change was written
+(or, for a click that did not change the output, when the status line was
+rendered). Updates that did not change the output are dropped. The time
+spent reaching each stage is reported per module by :py:meth:`Tracer.report`
+and all traces can be exported in the Chrome trace event format (viewable
+in chrome://tracing or https://ui.perfetto.dev) with
+:py:meth:`Tracer.write_chrome_trace`.
+"""
+
+import collections
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+timer = time.perf_counter
+
+
+class Trace:
+    def __init__(self, module, origin):
+        self.module = module
+        self.origin = origin
+        self.events = [(origin, timer())]
+        # Set once the module ran after the click or callback
+        self.ready = origin != "click"
+        self.waiting = False
+        self.rendered = False
+        self.marked = set()
+
+    def mark(self, stage):
+        self.events.append((stage, timer()))
+
+    @property
+    def latency(self):
+        return self.events[-1][1] - self.events[0][1]
+
+    def segments(self):
+        """Yields (stage, start, duration) for every stage after the first event."""
+        for (_, start), (stage, end) in zip(self.events, self.events[1:]):
+            yield stage, start, end - start
+
+
+class Tracer:
+    """
+    Collects :py:class:`Trace` objects. All methods do nothing unless
+    :py:attr:`enabled` is set, so the hooks cost a single attribute lookup
+    when tracing is off.
+
+    :param max_traces: Number of completed traces kept
+    """
+
+    enabled = False
+
+    def __init__(self, max_traces=10000):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.completed = collections.deque(maxlen=max_traces)
+        self.dropped = 0
+        self.epoch = timer()
+
+    def enable(self):
+        self.epoch = timer()
+        self.enabled = True
+
+    def start(self, module, origin="click"):
+        """Starts a trace for `module` (a click supersedes an update in progress)."""
+        if not self.enabled:
+            return
+        with self.lock:
+            trace = self.pending.get(id(module))
+            if trace is not None and trace.origin == "click":
+                trace.mark(origin)
+                trace.ready = trace.rendered = False
+            else:
+                self.pending[id(module)] = Trace(module, origin)
+
+    def wait_for_callback(self, module):
+        if not self.enabled:
+            return
+        with self.lock:
+            trace = self.pending.get(id(module))
+            if trace is not None:
+                trace.mark("multi_click_wait")
+                trace.waiting = True
+
+    def callback(self, module):
+        if not self.enabled:
+            return
+        with self.lock:
+            trace = self.pending.get(id(module))
+            if trace is not None:
+                trace.mark("callback")
+                trace.waiting = trace.ready = trace.rendered = False
+
+    def run_started(self, module):
+        if not self.enabled:
+            return
+        with self.lock:
+            trace = self.pending.get(id(module))
+            if trace is None:
+                trace = self.pending[id(module)] = Trace(module, "run_start")
+            else:
+                trace.mark("run_start")
+
+    def run_finished(self, module):
+        if not self.enabled:
+            return
+        with self.lock:
+            trace = self.pending.get(id(module))
+            if trace is not None:
+                trace.mark("run_end")
+                trace.ready = True
+                trace.marked.clear()
+
+    def mark_ready(self, stage):
+        """Marks `stage` (once) on all traces whose module already ran."""
+        if not self.enabled:
+            return
+        with self.lock:
+            for trace in self.pending.values():
+                if trace.ready and not trace.rendered and stage not in trace.marked:
+                    trace.mark(stage)
+                    trace.marked.add(stage)
+
+    def rendered(self, module, changed):
+        """Called for every module when a status line is rendered."""
+        if not self.enabled:
+            return
+        with self.lock:
+            trace = self.pending.get(id(module))
+            if trace is None or not trace.ready or trace.rendered:
+                return
+            if changed:
+                trace.mark("render")
+                trace.rendered = True
+            elif not trace.waiting:
+                del self.pending[id(module)]
+                if trace.origin == "click":
+                    trace.mark("render")
+                    self.completed.append(trace)
+                else:
+                    self.dropped += 1
+
+    def frame_written(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            for key, trace in list(self.pending.items()):
+                if trace.rendered and not trace.waiting:
+                    trace.mark("write")
+                    del self.pending[key]
+                    self.completed.append(trace)
+
+    def breakdown(self):
+        """
+        Returns {module name: {stage: (count, mean, max)}} in seconds; the
+        stage "total" is the latency from the first to the last event.
+        """
+        with self.lock:
+            traces = list(self.completed)
+        durations = collections.defaultdict(lambda: collections.defaultdict(list))
+        for trace in traces:
+            stages = durations[module_name(trace.module)]
+            for stage, _, duration in trace.segments():
+                stages[stage].append(duration)
+            stages["total"].append(trace.latency)
+        return {
+            name: {stage: (len(values), sum(values) / len(values), max(values)) for stage, values in stages.items()}
+            for name, stages in durations.items()
+        }
+
+    def report(self):
+        """Returns the per-module latency breakdown as a table (in milliseconds)."""
+        lines = ["{:<40} {:<16} {:>6} {:>10} {:>10}".format("module", "stage", "count", "mean ms", "max ms")]
+        for name, stages in sorted(self.breakdown().items()):
+            for stage, (count, mean, maximum) in stages.items():
+                lines.append("{:<40} {:<16} {:>6} {:>10.2f} {:>10.2f}".format(
+                    name, stage, count, mean * 1000, maximum * 1000))
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """Returns the completed traces in the Chrome trace event format."""
+        with self.lock:
+            traces = list(self.completed)
+        pid = os.getpid()
+        tids = {}
+        events = []
+
+        def us(t):
+            return round((t - self.epoch) * 1e6, 1)
+
+        for trace in traces:
+            name = module_name(trace.module)
+            if name not in tids:
+                tids[name] = len(tids) + 1
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tids[name],
+                               "args": {"name": name}})
+            tid = tids[name]
+            start = trace.events[0][1]
+            events.append({"name": trace.origin, "cat": "latency", "ph": "X", "pid": pid, "tid": tid,
+                           "ts": us(start), "dur": round(trace.latency * 1e6, 1),
+                           "args": {"stages": [stage for stage, _ in trace.events]}})
+            for stage, begin, duration in trace.segments():
+                events.append({"name": stage, "cat": "stage", "ph": "X", "pid": pid, "tid": tid,
+                               "ts": us(begin), "dur": round(duration * 1e6, 1)})
+        breakdown = {
+            name: {stage: {"count": count, "mean_ms": mean * 1000, "max_ms": maximum * 1000}
+                   for stage, (count, mean, maximum) in stages.items()}
+            for name, stages in self.breakdown().items()
+        }
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"breakdown": breakdown}}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        log.info("Wrote %d traces to %s\n%s", len(self.completed), path, self.report())
+        return path
+
+
+def module_name(module):
+    return getattr(module, "__name__", None) or module.__class__.__name__
+
+
+#: The process-wide tracer
+tracer = Tracer()
@@ -4,10 +4,13 @@ import re
 import socket
 import string
 import inspect
+import operator
 from threading import Timer, RLock
 
 import time
 
+from i3pystatus.core import reload, startup
+
 
 def lchop(string, prefix):
     """Removes a prefix from string
@@ -65,23 +68,112 @@ def round_dict(dic, places):
 
 
 class ModuleList(collections.UserList):
+    """
+    List of registered modules with an index for looking them up by id.
+
+    Modules that keep their own ModuleList (like :py:class:`.Group`) are
+    indexed together with their children, so :py:meth:`get` also finds
+    nested modules.
+
+    For every module the registration it was created from (its class, or
+    the instance if one was registered, and the settings) is kept in
+    :py:attr:`registrations`, keyed by the id of the module.
+    """
+
     def __init__(self, status_handler, class_finder):
         self.status_handler = status_handler
         self.finder = class_finder
+        self.by_id = {}
+        self.registrations = {}
+        self.parent = None
         super().__init__()
 
     def append(self, module, *args, **kwargs):
+        start = startup.timer()
+        cls = self.finder.resolve(module)
+        imported = startup.timer()
         module = self.finder.instanciate_class_from_module(
-            module, *args, **kwargs)
+            cls, *args, **kwargs)
         module.registered(self.status_handler)
         super().append(module)
+        self.add_to_index(module)
+        self.registrations[id(module)] = (cls, args, kwargs)
+        if reload.collector is not None:
+            # Registered with a Group while the configuration is reloaded
+            reload.collector.modules.created.append(module)
+        startup.report.record_module(getattr(module, "__name__", module.__class__.__name__),
+                                     imported - start, startup.timer() - imported)
         return module
 
+    def replace(self, modules):
+        """
+        Makes `modules`, a list of (module, registration) pairs, the content
+        of this list: modules that are not part of it anymore are
+        unregistered, new ones registered and all others kept as they are.
+        """
+        keep = {id(module) for module, _ in modules}
+        current = {id(module) for module in self}
+        for module in list(self):
+            if id(module) not in keep:
+                self.remove(module)
+                module.unregistered()
+        for module, registration in modules:
+            if id(module) not in current:
+                module.registered(self.status_handler)
+                self.add_to_index(module)
+            self.registrations[id(module)] = registration
+        self.data = [module for module, _ in modules]
+
+    def remove(self, module):
+        super().remove(module)
+        self.remove_from_index(module)
+
+    def pop(self, i=-1):
+        module = super().pop(i)
+        self.remove_from_index(module)
+        return module
+
+    def __delitem__(self, i):
+        modules = self.data[i] if isinstance(i, slice) else [self.data[i]]
+        super().__delitem__(i)
+        for module in modules:
+            self.remove_from_index(module)
+
+    def clear(self):
+        for module in list(self):
+            self.remove_from_index(module)
+        super().clear()
+
+    @staticmethod
+    def nested(module):
+        """Yields `module` and all modules nested in it."""
+        yield module
+        children = getattr(module, "modules", None)
+        if isinstance(children, ModuleList):
+            for child in children:
+                yield from ModuleList.nested(child)
+
+    def add_to_index(self, module):
+        children = getattr(module, "modules", None)
+        if isinstance(children, ModuleList):
+            children.parent = self
+        modules = list(self.nested(module))
+        modules_list = self
+        while modules_list is not None:
+            modules_list.by_id.update((id(m), m) for m in modules)
+            modules_list = modules_list.parent
+
+    def remove_from_index(self, module):
+        self.registrations.pop(id(module), None)
+        modules = list(self.nested(module))
+        modules_list = self
+        while modules_list is not None:
+            for m in modules:
+                modules_list.by_id.pop(id(m), None)
+            modules_list = modules_list.parent
+
     def get(self, find_id):
-        find_id = int(find_id)
-        for module in self:
-            if id(module) == find_id:
-                return module
+        return self.by_id.get(int(find_id))
 
 
 class KeyConstraintDict(collections.UserDict):
@@ -187,35 +279,62 @@ def formatp(string, **kwargs):
 
     Escaped brackets, i.e. \\\\[ and \\\\] are copied verbatim to output.
 
+    Format strings are parsed once into a :py:class:`FormatTemplate`; the
+    most recently used ones are kept (see :py:func:`compile_formatp`).
+
     :param string: Format string
     :param kwargs: keyword arguments providing data for the format string
     :returns: Formatted string
     """
+    return compile_formatp(string).render(kwargs)
+
+
+@functools.lru_cache(maxsize=512)
+def compile_formatp(string):
+    """Returns the :py:class:`FormatTemplate` of `string`, cached."""
+    return FormatTemplate(string)
+
+
+class FormatTemplate:
+    """
+    A :py:func:`formatp` format string, parsed into a tree of groups.
+
+    A group is a list of nodes; a node is either a nested group or a
+    ``(string, fields, plain)`` tuple with the names of the fields the string
+    needs (None at the top level, where fields are not checked) and whether
+    it is a plain string without fields.
+    """
 
-    def build_stack(string):
+    class Token:
+        string = ""
+
+    class OpeningBracket(Token):
+        pass
+
+    class ClosingBracket(Token):
+        pass
+
+    class String(Token):
+        def __init__(self, str):
+            self.string = str
+
+    FIELD = re.compile(r"({(\w+)[^}]*})")
+
+    def __init__(self, string):
+        self.string = string
+        self.tree = self.build_tree(self.build_stack(string), 0)
+
+    @classmethod
+    def build_stack(cls, string):
         """
         Builds a stack with OpeningBracket, ClosingBracket and String tokens.
         Tokens have a level property denoting their nesting level.
         They also have a string property containing associated text (empty for
         all tokens but String tokens).
         """
-
-        class Token:
-            string = ""
-
-        class OpeningBracket(Token):
-            pass
-
-        class ClosingBracket(Token):
-            pass
-
-        class String(Token):
-            def __init__(self, str):
-                self.string = str
-
         TOKENS = {
-            "[": OpeningBracket,
-            "]": ClosingBracket,
+            "[": cls.OpeningBracket,
+            "]": cls.ClosingBracket,
         }
 
         stack = []
@@ -244,52 +363,57 @@ def formatp(string, **kwargs):
                     level += 1
                 stack.append(token)
             else:
-                if stack and isinstance(stack[-1], String):
+                if stack and isinstance(stack[-1], cls.String):
                     stack[-1].string += char
                 else:
-                    token = String(char)
+                    token = cls.String(char)
                     token.level = level
                     stack.append(token)
         return stack
 
-    def build_tree(items, level=0):
-        """
-        Builds a list-of-lists tree (in forward order) from a stack (reversed order),
-        and formats the elements on the fly, discarding everything not eligible for
-        inclusion.
-        """
+    @classmethod
+    def build_tree(cls, items, level):
+        """Builds the tree of groups from a stack (items are consumed)."""
+        items = collections.deque(items)
         subtree = []
 
         while items:
             nested = []
             while items[0].level > level:
-                nested.append(items.pop(0))
+                nested.append(items.popleft())
             if nested:
-                subtree.append(build_tree(nested, level + 1))
+                subtree.append(cls.build_tree(nested, level + 1))
 
-            item = items.pop(0)
+            item = items.popleft()
             if item.string:
-                string = item.string
-                if level == 0:
-                    subtree.append(string.format(**kwargs))
-                else:
-                    fields = re.findall(r"({(\w+)[^}]*})", string)
-                    successful_fields = 0
-                    for fieldspec, fieldname in fields:
-                        if kwargs.get(fieldname, False):
-                            successful_fields += 1
-                    if successful_fields == len(fields):
-                        subtree.append(string.format(**kwargs))
-                    else:
-                        return []
+                fields = None
+                if level != 0:
+                    fields = tuple(name for _, name in cls.FIELD.findall(item.string))
+                plain = "{" not in item.string and "}" not in item.string
+                subtree.append((item.string, fields, plain))
         return subtree
 
-    def merge_tree(items):
-        return "".join(flatten(items)).replace(r"\]", "]").replace(r"\[", "[")
-
-    stack = build_stack(string)
-    tree = build_tree(stack, 0)
-    return merge_tree(tree)
+    def render(self, kwargs):
+        """Returns the formatted string for the values in the dict `kwargs`."""
+        parts = []
+        self.render_group(self.tree, kwargs, parts)
+        return "".join(parts).replace(r"\]", "]").replace(r"\[", "[")
+
+    @classmethod
+    def render_group(cls, group, kwargs, parts):
+        start = len(parts)
+        for node in group:
+            if node.__class__ is list:
+                cls.render_group(node, kwargs, parts)
+                continue
+            string, fields, plain = node
+            if fields:
+                for field in fields:
+                    if not kwargs.get(field, False):
+                        # A field of this group is empty: drop all of it
+                        del parts[start:]
+                        return
+            parts.append(string if plain else string.format(**kwargs))
 
 
 class TimeWrapper:
@@ -437,10 +561,74 @@ class internet:
             return []
 
 
+GRAPH_STYLES = ('blocks', 'braille-fill', 'braille-peak', 'braille-snake')
+
+_GRAPH_BLOCKS = '_▁▂▃▄▅▆▇█'
+# idea from https://github.com/asciimoo/drawille
+# unicode values from http://en.wikipedia.org/wiki/Braille
+_BRAILLE_FILL = (0, 0x40, 0x44, 0x46, 0x47)
+_BRAILLE_PEAK = (0, 0x40, 0x04, 0x02, 0x01)
+# _BRAILLE_SNAKE[low][high]: the dots from height low up to height high
+_BRAILLE_SNAKE = tuple(tuple(functools.reduce(operator.or_, _BRAILLE_PEAK[low:high + 1], 0) for high in range(5))
+                       for low in range(5))
+
+
+def _graph_scale(values, lower_limit, upper_limit):
+    mn, mx = min(values), max(values)
+    mn = mn if lower_limit is None else min(mn, float(lower_limit))
+    mx = mx if upper_limit is None else max(mx, float(upper_limit))
+    return mn, mx
+
+
+def _graph_cell(style, value, mn, extent):
+    """Glyph (blocks) or height in braille dots (0-4) of a single value"""
+    return _graph_cells(style, (value,), mn, extent)[0]
+
+
+def _graph_cells(style, values, mn, extent):
+    if style == 'blocks':
+        if extent == 0:
+            return ['_'] * len(values)
+        bar_count = len(_GRAPH_BLOCKS) - 1
+        return [_GRAPH_BLOCKS[int((n - mn) / extent * bar_count)] for n in values]
+    return [round(4 * (n - mn) / extent) for n in values]
+
+
+def _draw_graph(style, cells):
+    if style == 'blocks':
+        return ''.join(cells)
+
+    # padding with the minimum (height 0) for an odd number of values
+    vscale = cells if len(cells) % 2 == 0 else cells + [0]
+    l = len(vscale) // 2
+
+    if style == 'braille-snake':
+        # there are a few choices for what to put last in vb2.
+        # arguable vscale[-1] from the _previous_ call is best.
+        vb2 = [vscale[0]] + vscale + [0]
+        vbits = [_BRAILLE_SNAKE[min(vb2[i - 1], vb2[i], vb2[i + 1])][vb2[i]] for i in range(1, l + 1)]
+    else:
+        bits = _BRAILLE_FILL if style == 'braille-fill' else _BRAILLE_PEAK
+        vbits = [bits[vs] for vs in vscale[:l + 1]]
+
+    # 2-character collapse
+    columns = []
+    for i in range(0, l, 2):
+        b1 = vbits[i]
+        b2 = vbits[i + 1]
+        if b2 & 0x40:
+            b2 = b2 - 0x30
+        columns.append(chr(0x2800 + b1 + (b2 << 3)))
+    return ''.join(columns)
+
+
 def make_graph(values, lower_limit=0.0, upper_limit=100.0, style="blocks"):
     """
     Draws a graph made of unicode characters.
 
+    Modules drawing a graph of their latest values on every update should use
+    a :py:class:`Graph` instead.
+
     :param values: An array of values to graph.
     :param lower_limit: Minimum value for the y axis (or None for dynamic).
     :param upper_limit: Maximum value for the y axis (or None for dynamic).
@@ -448,56 +636,84 @@ def make_graph(values, lower_limit=0.0, upper_limit=100.0, style="blocks"):
     :returns: Bar as a string
     """
 
+    if style not in GRAPH_STYLES:
+        raise NotImplementedError("Graph drawing style '%s' unimplemented." % style)
     values = [float(n) for n in values]
-    mn, mx = min(values), max(values)
-    mn = mn if lower_limit is None else min(mn, float(lower_limit))
-    mx = mx if upper_limit is None else max(mx, float(upper_limit))
-    extent = mx - mn
+    mn, mx = _graph_scale(values, lower_limit, upper_limit)
+    return _draw_graph(style, _graph_cells(style, values, mn, mx - mn))
 
-    if style == 'blocks':
-        bar = '_▁▂▃▄▅▆▇█'
-        bar_count = len(bar) - 1
-        if extent == 0:
-            graph = '_' * len(values)
-        else:
-            graph = ''.join(bar[int((n - mn) / extent * bar_count)] for n in values)
-    elif style in ['braille-fill', 'braille-peak', 'braille-snake']:
-        # idea from https://github.com/asciimoo/drawille
-        # unicode values from http://en.wikipedia.org/wiki/Braille
-
-        vpad = values if len(values) % 2 == 0 else values + [mn]
-        vscale = [round(4 * (vp - mn) / extent) for vp in vpad]
-        l = len(vscale) // 2
-
-        # do the 2-character collapse separately for clarity
-        if 'fill' in style:
-            vbits = [[0, 0x40, 0x44, 0x46, 0x47][vs] for vs in vscale]
-        elif 'peak' in style:
-            vbits = [[0, 0x40, 0x04, 0x02, 0x01][vs] for vs in vscale]
-        else:
-            assert('snake' in style)
-            # there are a few choices for what to put last in vb2.
-            # arguable vscale[-1] from the _previous_ call is best.
-            vb2 = [vscale[0]] + vscale + [0]
-            vbits = []
-            for i in range(1, l + 1):
-                c = 0
-                for j in range(min(vb2[i - 1], vb2[i], vb2[i + 1]), vb2[i] + 1):
-                    c |= [0, 0x40, 0x04, 0x02, 0x01][j]
-                vbits.append(c)
-
-        # 2-character collapse
-        graph = ''
-        for i in range(0, l, 2):
-            b1 = vbits[i]
-            b2 = vbits[i + 1]
-            if b2 & 0x40:
-                b2 = b2 - 0x30
-            b2 = b2 << 3
-            graph += chr(0x2800 + b1 + b2)
-    else:
-        raise NotImplementedError("Graph drawing style '%s' unimplemented." % style)
-    return graph
+
+class Graph:
+    """
+    A graph of the last `width` values, drawn like :py:func:`make_graph`.
+
+    The values are kept in a ring buffer, newest first, together with what
+    each of them looks like in the graph. As long as the scale (given by the
+    limits and, if they are exceeded or None, by the values) does not change,
+    adding a value only works out how that one value is drawn.
+
+    .. code:: python
+
+        def init(self):
+            self.graph = Graph(self.graph_width, 0.0, 100.0, self.graph_style)
+
+        def run(self):
+            self.graph.push(usage)
+            graph = self.graph.draw()
+
+    :param width: Number of values in the graph
+    :param lower_limit: Minimum value for the y axis (or None for dynamic).
+    :param upper_limit: Maximum value for the y axis (or None for dynamic).
+    :param style: Drawing style ('blocks', 'braille-fill', 'braille-peak', or 'braille-snake').
+    :param initial: Value the graph is filled with initially
+    """
+
+    def __init__(self, width, lower_limit=0.0, upper_limit=100.0, style="blocks", initial=0.0):
+        if style not in GRAPH_STYLES:
+            raise NotImplementedError("Graph drawing style '%s' unimplemented." % style)
+        self.style = style
+        self.lower_limit = lower_limit
+        self.upper_limit = upper_limit
+        #: The values, newest first
+        self.values = collections.deque([float(initial)] * width, maxlen=width)
+        self._cells = collections.deque(maxlen=width)
+        self._scale = None
+        # Number of values pushed since the cells were last brought up to date
+        self._pending = width
+        self._graph = None
+
+    def push(self, value):
+        """Adds `value` as the newest value, dropping the oldest one."""
+        self.values.appendleft(float(value))
+        self._pending += 1
+        self._graph = None
+
+    def draw(self):
+        """
+        Draws the graph, newest value first.
+
+        :returns: Graph as a string
+        """
+        scale = _graph_scale(self.values, self.lower_limit, self.upper_limit)
+        if scale != self._scale:
+            self._scale = scale
+            self._pending = len(self.values)
+        if self._pending:
+            mn, mx = scale
+            cells = self._cells
+            if self._pending >= len(self.values):
+                cells.clear()
+                cells.extend(_graph_cells(self.style, self.values, mn, mx - mn))
+            else:
+                for index in range(self._pending - 1, -1, -1):
+                    cells.appendleft(_graph_cell(self.style, self.values[index], mn, mx - mn))
+            self._pending = 0
+            self._graph = None
+        if self._graph is None:
+            self._graph = _draw_graph(self.style, list(self._cells))
+        return self._graph
+
+    __str__ = draw
 
 
 def make_vertical_bar(percentage, width=1, glyphs=None):
@@ -1,14 +1,163 @@
-from collections import defaultdict
+from collections import Counter
 from string import Formatter
+import operator
 import re
+import threading
+import time
+import weakref
 
 from i3pystatus import IntervalModule
 from i3pystatus.core.color import ColorRangeModule
+from i3pystatus.core.settings import SettingsSchema
+from i3pystatus.core.util import make_glyph, make_graph
 
-try:
-    from natsort import natsorted as sorted
-except ImportError:
-    pass
+
+class ProcStatSample:
+    """
+    The cpu lines of /proc/stat at one point in time.
+
+    Lines are only parsed when the usage of their cpu is needed, so modules
+    showing a few cpus of a machine with hundreds of them stay cheap.
+    """
+
+    __slots__ = ("time", "names", "lines", "totals", "busy", "usages", "__weakref__")
+
+    def __init__(self, time, names, lines):
+        self.time = time
+        #: Tuple of cpu names ('cpu' for all cores, then 'cpu0', 'cpu1', ...).
+        #: Samples of the same cpus share the same tuple.
+        self.names = names
+        self.lines = lines
+        # Total and busy (not idle or waiting for IO) time of each cpu in USER_HZ, None until parsed
+        self.totals = [None] * len(lines)
+        self.busy = [None] * len(lines)
+        # previous sample -> usage of all cpus since then
+        self.usages = weakref.WeakKeyDictionary()
+
+    def times(self, index):
+        """Returns the total and busy time of the cpu at `index`."""
+        if self.totals[index] is None:
+            timings = list(map(int, self.lines[index].split()[1:]))
+            total = sum(timings)
+            # idle and iowait
+            self.busy[index] = total - sum(timings[3:5])
+            self.totals[index] = total
+        return self.totals[index], self.busy[index]
+
+    def parse(self):
+        """Parses the lines of all cpus at once."""
+        if None not in self.totals:
+            return self.totals, self.busy
+        tokens = " ".join(self.lines).split()
+        width = len(tokens) // len(self.lines)
+        if width * len(self.lines) != len(tokens) or width < 6:
+            # Not the same number of timings for all cpus, or no iowait (Linux < 2.5.41)
+            for index in range(len(self.lines)):
+                self.times(index)
+            return self.totals, self.busy
+        # Without the names
+        del tokens[::width]
+        timings = list(map(int, tokens))
+        width -= 1
+        totals = [sum(timings[start:start + width]) for start in range(0, len(timings), width)]
+        # idle and iowait
+        self.busy = list(map(operator.sub, totals, map(operator.add, timings[3::width], timings[4::width])))
+        self.totals = totals
+        return self.totals, self.busy
+
+    def cpu_usage(self, previous, index):
+        """
+        Returns the usage of the cpu at `index` since the `previous` sample
+        (or since boot), in percent.
+        """
+        total, busy = self.times(index)
+        if previous is None:
+            prev_total = prev_busy = 0
+        elif previous.names is self.names:
+            prev_total, prev_busy = previous.times(index)
+        elif self.names[index] in previous.names:
+            prev_total, prev_busy = previous.times(previous.names.index(self.names[index]))
+        else:
+            # went online
+            prev_total = prev_busy = 0
+        if total == prev_total:
+            return 0
+        return int((busy - prev_busy) / (total - prev_total) * 100)
+
+    def usage(self, previous):
+        """
+        Returns the usage of all cpus since the `previous` sample (or since
+        boot) in percent, in the order of `names`.
+
+        The list is shared and must not be modified.
+        """
+        if previous is not None and previous in self.usages:
+            return self.usages[previous]
+        totals, busy = self.parse()
+        if previous is not None and previous.names is self.names:
+            prev_totals, prev_busy = previous.parse()
+            usage = [int((b - pb) / (t - pt) * 100) if t != pt else 0
+                     for t, b, pt, pb in zip(totals, busy, prev_totals, prev_busy)]
+        else:
+            usage = [self.cpu_usage(previous, index) for index in range(len(self.names))]
+        if previous is not None:
+            self.usages[previous] = usage
+        return usage
+
+
+class ProcStat:
+    """
+    Samples /proc/stat for all CPU modules.
+
+    Modules updating at about the same time share one sample instead of
+    each reading and parsing /proc/stat, and modules whose previous update
+    used the same sample share the usage computed from the two samples.
+    Every module still gets the usage since its own previous update, so
+    modules with different intervals are not affected by each other.
+    """
+
+    def __init__(self, path="/proc/stat"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.sample = None
+        self.names = None
+
+    def read(self):
+        """
+        Reads /proc/stat (see man 5 proc for further informations)
+
+        :returns: :py:class:`ProcStatSample` of all available cores including the global average
+        """
+        with open(self.path, 'r') as file_obj:
+            stat = file_obj.read()
+        # The cpu lines come first, no other line starts with 'cpu'
+        end = stat.find('\n', stat.rfind('\ncpu') + 1)
+        lines = stat[:end if end >= 0 else len(stat)].split('\n')
+        names = tuple([line.partition(' ')[0] for line in lines])
+        if names == self.names:
+            names = self.names
+        self.names = names
+        return ProcStatSample(time.monotonic(), names, lines)
+
+    def get_sample(self, max_age):
+        """
+        Returns the latest sample, or a new one if it is older than
+        `max_age` seconds.
+        """
+        with self.lock:
+            if self.sample is None or time.monotonic() - self.sample.time > max_age:
+                self.sample = self.read()
+            return self.sample
+
+
+#: The :py:class:`ProcStat` shared by all CPU modules
+proc_stat = ProcStat()
+
+
+def core_order(name):
+    """Sort key of cpu names: cores in numerical order, then the average of all cores ('cpu')."""
+    number = name[3:]
+    return (0, int(number)) if number.isdigit() else (1, 0)
 
 
 class CpuUsage(IntervalModule, ColorRangeModule):
@@ -17,13 +166,21 @@ class CpuUsage(IntervalModule, ColorRangeModule):
     The first output will be inacurate.
 
     Linux only
-    Requires the PyPI package 'colour'.
+    Requires the PyPI package 'colour' for colors given by name.
+
+    Formatters are only computed if they are used in `format` (or a
+    callback), so modules showing a few cores of a machine with hundreds of
+    them stay cheap. For an overview of many cores, `{usage_heat}` and
+    `{usage_histogram}` are much shorter than `{usage_all}`.
 
     .. rubric:: Available formatters
 
     * `{usage}`      — usage average of all cores
     * `{usage_cpu*}` — usage of one specific core. replace "*" by core number starting at 0
-    * `{usage_all}`  — usage of all cores separate. usess natsort when available(relevant for more than 10 cores)
+    * `{usage_all}`  — usage of all cores separate, in order of the core number
+    * `{usage_heat}` — one glyph per core showing its usage (see `heat_width`)
+    * `{usage_histogram}` — how many cores are how busy: one bar per usage range
+      (see `histogram_bins`), from idle to fully used, as high as the share of cores in that range
 
     """
 
@@ -34,6 +191,8 @@ class CpuUsage(IntervalModule, ColorRangeModule):
     color = '#FFFFFF'
     dynamic_color = False
     upper_limit = 100
+    heat_width = 0
+    histogram_bins = 10
     settings = (
         ("format", "format string."),
         ("format_all", ("format string used for {usage_all} per core. "
@@ -43,13 +202,25 @@ class CpuUsage(IntervalModule, ColorRangeModule):
         ("color", "HTML color code #RRGGBB"),
         ("dynamic_color", "Set color dynamically based on CPU usage. Note: this overrides color_up"),
         ("start_color", "Hex or English name for start of color range, eg '#00FF00' or 'green'"),
-        ("end_color", "Hex or English name for end of color range, eg '#FF0000' or 'red'")
+        ("end_color", "Hex or English name for end of color range, eg '#FF0000' or 'red'"),
+        ("heat_width", "Number of glyphs in {usage_heat}. Consecutive cores are grouped into that many glyphs "
+                       "showing their average usage, 0 for one glyph per core."),
+        ("histogram_bins", "Number of usage ranges (bars) in {usage_histogram}"),
     )
 
     def init(self):
-        self.prev_total = defaultdict(int)
-        self.prev_busy = defaultdict(int)
+        self.sample = None
+        self.names = None
+        # Usage of all cpus (in the order of their names) if it is needed
+        self.usage = None
+        self.last_usage = None
         self.formatter = Formatter()
+        self.fields = self.get_used_fields()
+        # Usage (0-100) -> glyph
+        self.heat_glyphs = [make_glyph(usage, glyphs="▁▂▃▄▅▆▇█") for usage in range(101)]
+        # Usage (0-100) -> histogram bin
+        self.histogram_bin = [min(usage * self.histogram_bins // 100, self.histogram_bins - 1)
+                              for usage in range(101)]
 
         self.key = re.findall(r'usage_cpu\d+', self.format)
         if len(self.key) == 1:
@@ -62,80 +233,117 @@ class CpuUsage(IntervalModule, ColorRangeModule):
             self.end_color = self.color
         self.colors = self.get_hex_color_range(self.start_color, self.end_color, int(self.upper_limit))
 
-    def get_cpu_timings(self):
+    def get_used_fields(self):
         """
-        reads and parses /proc/stat
-        returns dictionary with all available cores including global average
+        Returns the names of the formatters used in `format` and in the
+        callbacks (external commands are formatted with the data of the
+        module), or None if that cannot be told.
         """
-        timings = {}
-        with open('/proc/stat', 'r') as file_obj:
-            for line in file_obj:
-                if 'cpu' in line:
-                    line = line.strip().split()
-                    timings[line[0]] = [int(x) for x in line[1:]]
-
-        return timings
+        strings = [self.format]
+        for name in SettingsSchema.of(type(self)).names:
+            if name.startswith("on_"):
+                callback = getattr(self, name)
+                strings.extend(value for value in (callback if isinstance(callback, (list, tuple)) else [callback])
+                               if isinstance(value, str))
+        fields = set()
+        try:
+            for string in strings:
+                for _, field, _, _ in self.formatter.parse(string):
+                    if field:
+                        fields.add(re.match(r"[^.\[]*", field).group())
+        except ValueError:
+            return None
+        return fields
 
-    def calculate_usage(self, cpu, total, busy):
+    def get_used_cpus(self):
         """
-        calculates usage
+        Returns the names of the cpus whose usage is used, or None if the
+        usage of all of them is needed.
         """
-        diff_total = total - self.prev_total[cpu]
-        diff_busy = busy - self.prev_busy[cpu]
+        if self.fields is None or self.fields & {'usage_all', 'usage_heat', 'usage_histogram'}:
+            return None
+        cpus = {'cpu', self.key[len('usage_'):]}
+        cpus.update(field[len('usage_'):] for field in self.fields if re.fullmatch(r'usage_cpu\d+', field))
+        return cpus
 
-        self.prev_total[cpu] = total
-        self.prev_busy[cpu] = busy
+    def uses(self, field):
+        """Whether formatter `field` is used, see :py:meth:`get_used_fields`."""
+        return self.fields is None or field in self.fields
 
-        if diff_total == 0:
-            return 0
+    def update_cores(self, names):
+        """Precomputes the keys and the order of the cpus `names`."""
+        self.names = names
+        self.keys = tuple('usage_' + name for name in names)
+        used_cpus = self.get_used_cpus()
+        #: Indices of the cpus whose usage is used, None for all
+        self.used = None if used_cpus is None else [index for index, name in enumerate(names) if name in used_cpus]
+        order = sorted(range(len(names)), key=lambda index: core_order(names[index]))
+        #: Indices of the cores (without the average) in order
+        self.cores = [index for index in order if names[index] != 'cpu']
+        #: (core, key) of the cpus listed in {usage_all}
+        self.all_cores = [(names[index], self.keys[index]) for index in order
+                          if not (self.exclude_average and names[index] == 'cpu')]
+        if self.heat_width and self.heat_width < len(self.cores):
+            count = len(self.cores)
+            self.heat_groups = [(count * i // self.heat_width, count * (i + 1) // self.heat_width)
+                                for i in range(self.heat_width)]
         else:
-            return int(diff_busy / diff_total * 100)
+            self.heat_groups = None
 
     def gen_format_all(self, usage):
         """
         generates string for format all
         """
-        format_string = " "
-        core_strings = []
-        for core, usage in usage.items():
-            if core == 'usage_cpu' and self.exclude_average:
-                continue
-            elif core == 'usage':
-                continue
+        format_core = self.format_all.format
+        return " ".join([format_core(core=core, usage=usage[key]) for core, key in self.all_cores])
 
-            core = core.replace('usage_', '')
-            string = self.formatter.format(self.format_all,
-                                           core=core,
-                                           usage=usage)
-            core_strings.append(string)
-
-        core_strings = sorted(core_strings)
+    def gen_heat(self):
+        """
+        generates the heat strip of all cores
+        """
+        glyphs = self.heat_glyphs
+        usage = [self.usage[index] for index in self.cores]
+        if self.heat_groups is not None:
+            usage = [int(sum(usage[start:end]) / (end - start)) for start, end in self.heat_groups]
+        return "".join([glyphs[min(max(value, 0), 100)] for value in usage])
 
-        return format_string.join(core_strings)
+    def gen_histogram(self):
+        """
+        generates the histogram of the usage of all cores
+        """
+        histogram_bin = self.histogram_bin
+        counts = Counter([histogram_bin[min(max(self.usage[index], 0), 100)] for index in self.cores])
+        return make_graph([counts[i] for i in range(self.histogram_bins)], 0.0, len(self.cores))
 
     def get_usage(self):
         """
-        parses /proc/stat and calcualtes total and busy time
-        (more specific USER_HZ see man 5 proc for further informations )
+        calculates the usage of the cpus since the last update from the
+        total and busy time in /proc/stat, shared with other CPU modules
         """
-        usage = {}
-
-        for cpu, timings in self.get_cpu_timings().items():
-            cpu_total = sum(timings)
-            del timings[3:5]
-            cpu_busy = sum(timings)
-            cpu_usage = self.calculate_usage(cpu, cpu_total, cpu_busy)
+        previous = self.sample
+        self.sample = proc_stat.get_sample(self.interval / 4)
+        if self.sample is not previous:
+            if self.sample.names is not self.names:
+                self.update_cores(self.sample.names)
+            if self.used is None:
+                self.usage = self.sample.usage(previous)
+                self.last_usage = dict(zip(self.keys, self.usage))
+            else:
+                self.last_usage = {self.keys[index]: self.sample.cpu_usage(previous, index) for index in self.used}
+            # for backward compatibility
+            self.last_usage['usage'] = self.last_usage['usage_cpu']
+        # else: updated again before there is a new sample, keep the last usage
 
-            usage['usage_' + cpu] = cpu_usage
-
-        # for backward compatibility
-        usage['usage'] = usage['usage_cpu']
-
-        return usage
+        return dict(self.last_usage)
 
     def run(self):
         usage = self.get_usage()
-        usage['usage_all'] = self.gen_format_all(usage)
+        if self.uses('usage_all'):
+            usage['usage_all'] = self.gen_format_all(usage)
+        if self.uses('usage_heat'):
+            usage['usage_heat'] = self.gen_heat()
+        if self.uses('usage_histogram'):
+            usage['usage_histogram'] = self.gen_histogram()
 
         color = self.get_gradient(usage[self.key], self.colors, int(self.upper_limit))
 
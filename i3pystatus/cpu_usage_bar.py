@@ -1,3 +1,5 @@
+import re
+
 from i3pystatus.core.color import ColorRangeModule
 from i3pystatus.cpu_usage import CpuUsage
 from i3pystatus.core.util import make_bar, make_vertical_bar
@@ -36,25 +38,45 @@ class CpuUsageBar(CpuUsage, ColorRangeModule):
     def init(self):
         super().init()
         self.colors = self.get_hex_color_range(self.start_color, self.end_color, 100)
+        if self.bar_type == 'horizontal':
+            self.make_bar = make_bar
+        elif self.bar_type == 'vertical':
+            self.make_bar = make_vertical_bar
+        else:
+            raise Exception("bar_type must be 'horizontal' or 'vertical'!")
+        # usage -> bar
+        self.bars = {}
 
-    def run(self):
-        cpu_usage = self.get_usage()
+    def get_used_cpus(self):
+        cpus = super().get_used_cpus()
+        if cpus is not None:
+            cpus.add(self.cpu[len('usage_'):])
+            cpus.update(field[len('usage_bar_'):] for field in self.fields
+                        if re.fullmatch(r'usage_bar_cpu\d+', field))
+        return cpus
 
-        cpu_usage_bar = {}
+    def get_bar(self, usage):
+        bar = self.bars.get(usage)
+        if bar is None:
+            bar = self.bars[usage] = self.make_bar(usage)
+        return bar
 
-        for core, usage in cpu_usage.items():
-            core = core.replace('usage', 'usage_bar')
-            if self.bar_type == 'horizontal':
-                cpu_usage_bar[core] = make_bar(usage)
-            elif self.bar_type == 'vertical':
-                cpu_usage_bar[core] = make_vertical_bar(usage)
-            else:
-                raise Exception("bar_type must be 'horizontal' or 'vertical'!")
+    def run(self):
+        cpu_usage = self.get_usage()
 
-        cpu_usage.update(cpu_usage_bar)
+        # Only the bars that are used, there may be hundreds of cores
+        if self.fields is None:
+            fields = [core.replace('usage', 'usage_bar') for core in cpu_usage]
+        else:
+            fields = [field for field in self.fields if field.startswith('usage_bar')]
+        for field in fields:
+            core = field.replace('usage_bar', 'usage')
+            if core in cpu_usage:
+                cpu_usage[field] = self.get_bar(cpu_usage[core])
 
         # for backward compatibility
-        cpu_usage['usage_bar'] = cpu_usage['usage_bar_cpu']
+        if 'usage_bar_cpu' in cpu_usage:
+            cpu_usage['usage_bar'] = cpu_usage['usage_bar_cpu']
 
         self.data = cpu_usage
         self.output = {
@@ -1,6 +1,6 @@
 from i3pystatus.core.color import ColorRangeModule
 from i3pystatus.cpu_usage import CpuUsage
-from i3pystatus.core.util import make_graph
+from i3pystatus.core.util import Graph
 
 
 class CpuUsageGraph(CpuUsage, ColorRangeModule):
@@ -38,17 +38,21 @@ class CpuUsageGraph(CpuUsage, ColorRangeModule):
 
     def init(self):
         super().init()
-        self.cpu_readings = self.graph_width * [0]
+        self.graph = Graph(self.graph_width, 0.0, 100.0, self.graph_style)
         self.colors = self.get_hex_color_range(self.start_color, self.end_color, int(100))
 
+    def get_used_cpus(self):
+        cpus = super().get_used_cpus()
+        if cpus is not None:
+            cpus.add(self.cpu[len('usage_'):])
+        return cpus
+
     def run(self):
         format_options = self.get_usage()
         core_reading = format_options[self.cpu]
 
-        self.cpu_readings.insert(0, core_reading)
-        self.cpu_readings = self.cpu_readings[:self.graph_width]
-
-        graph = make_graph(self.cpu_readings, 0.0, 100.0, self.graph_style)
+        self.graph.push(core_reading)
+        graph = self.graph.draw()
 
         if self.direction == "right-to-left":
             graph = graph[::-1]
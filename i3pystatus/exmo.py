@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
 
-import requests
-
 from i3pystatus import IntervalModule, formatp
 from i3pystatus.core.util import internet, require, user_open
+from i3pystatus.core.imputil import lazy_import
+
+requests = lazy_import("requests")
 
 
 class Exmo(IntervalModule):
@@ -294,6 +294,7 @@ class Github(IntervalModule):
         self.logger.debug('colors = %s', self.colors)
 
         self.condition = threading.Condition()
+        self.stopped = False
         self.thread = threading.Thread(target=self.update_loop, daemon=True)
         self.thread.start()
 
@@ -302,7 +303,10 @@ class Github(IntervalModule):
             self.perform_update()
             while True:
                 with self.condition:
-                    self.condition.wait(self.interval)
+                    if not self.stopped:
+                        self.condition.wait(self.interval)
+                if self.stopped:
+                    return
                 self.perform_update()
         except Exception:
             msg = 'Exception in {thread} at {time}, module {name}'.format(
@@ -312,6 +316,12 @@ class Github(IntervalModule):
             )
             self.logger.error(msg, exc_info=True)
 
+    def unregistered(self):
+        super().unregistered()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
     @require(internet)
     def status_api_request(self, url):
         self.logger.debug('Making GitHub Status API request to %s', url)
@@ -404,8 +414,9 @@ class Github(IntervalModule):
 
     @require(internet)
     def perform_update(self):
-        self.output['full_text'] = \
-            self.refresh_icon + self.output.get('full_text', '')
+        self.output = dict(
+            self.output,
+            full_text=self.refresh_icon + self.output.get('full_text', ''))
         self.failed_update = False
 
         self.update_status()
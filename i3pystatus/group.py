@@ -32,10 +32,16 @@ class Group(Module, Status):
         Module.__init__(self, *args, **kwargs)
         self.modules = util.ModuleList(self, ClassFinder(Module))
         self.active = 0
+        self.default_hints = None
         self.__name__ = 'Group'
 
+    def unregistered(self):
+        for module in self.modules:
+            module.unregistered()
+        super().unregistered()
+
     def get_active_module(self):
-        if self.active > len(self.modules):
+        if self.active >= len(self.modules):
             return
         return self.modules[self.active]
 
@@ -45,6 +51,15 @@ class Group(Module, Status):
             return
         self.output = activemodule.output
 
+    def update_fragment(self):
+        # Children are not rendered themselves, so their dirty flag (e.g. set
+        # after a run that changed the output dict in place) is taken over here
+        activemodule = self.get_active_module()
+        if activemodule and activemodule.dirty:
+            activemodule.dirty = False
+            self.run()
+        return super().update_fragment()
+
     def register(self, *args, **kwargs):
         module = Status.register(self, *args, **kwargs)
         if module:
@@ -58,6 +73,7 @@ class Group(Module, Status):
         elif active < 0:
             active = len(self.modules) - 1
         self.active = active
+        self.run()
 
     def on_click(self, button, **kwargs):
         """
@@ -1,8 +1,9 @@
-import requests
-
 from i3pystatus import IntervalModule
 from i3pystatus.core.color import ColorRangeModule
 from i3pystatus.core.util import internet, require
+from i3pystatus.core.imputil import lazy_import
+
+requests = lazy_import("requests")
 
 __author__ = 'facetoe'
 
@@ -14,6 +14,9 @@ class Backend(SettingsBase):
 
     You'll probably implement that as a property"""
 
+    def stop(self):
+        """Called when the mail module is unregistered, stops background threads"""
+
 
 class Mail(IntervalModule):
     """
@@ -52,6 +55,11 @@ class Mail(IntervalModule):
         for backend in self.backends:
             pass
 
+    def unregistered(self):
+        super().unregistered()
+        for backend in self.backends:
+            backend.stop()
+
     def run(self):
         """
         Returns the sum of unread messages across all registered backends
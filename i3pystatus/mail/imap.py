@@ -38,6 +38,7 @@ class IMAP(Backend):
 
     imap_class = IMAP4
     connection = None
+    stopped = False
     last = 0
 
     def init(self):
@@ -79,13 +80,22 @@ class IMAP(Backend):
         # update mail count on startup
         with self.ensure_connection():
             self.count_new_mail()
-        while True:
+        while not self.stopped:
             with self.ensure_connection():
                 # Block until new mails
                 self.connection.idle()
                 # Read how many
                 self.count_new_mail()
 
+    def stop(self):
+        self.stopped = True
+        if use_idle and self.connection:
+            try:
+                # Interrupts the idle call of the thread
+                self.connection.logout()
+            except IMAP_EXCEPTIONS:
+                pass
+
     def count_new_mail(self):
         self.last = len(self.connection.search(None, "UnSeen")[1][0].split())
 
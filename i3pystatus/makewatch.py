@@ -1,6 +1,8 @@
 from i3pystatus import IntervalModule
-import psutil
 import getpass
+from i3pystatus.core.imputil import lazy_import
+
+psutil = lazy_import("psutil")
 
 
 class MakeWatch(IntervalModule):
@@ -1,6 +1,8 @@
 from i3pystatus import IntervalModule
-import psutil
 from .core.util import round_dict
+from i3pystatus.core.imputil import lazy_import
+
+psutil = lazy_import("psutil")
 
 
 class Mem(IntervalModule):
@@ -1,6 +1,5 @@
 from i3pystatus import IntervalModule
 import speedtest
-import requests
 import time
 import os
 from urllib.parse import urlparse
@@ -1,10 +1,11 @@
 from fnmatch import fnmatch
 
-import netifaces
-
 from i3pystatus import IntervalModule, formatp
 from i3pystatus.core.color import ColorRangeModule
-from i3pystatus.core.util import make_graph, round_dict, make_bar, bytes_info_dict
+from i3pystatus.core.util import Graph, round_dict, make_bar, bytes_info_dict
+from i3pystatus.core.imputil import lazy_import
+
+netifaces = lazy_import("netifaces")
 
 
 def count_bits(integer):
@@ -379,13 +380,13 @@ class Network(IntervalModule, ColorRangeModule):
         if not self.dynamic_color:
             self.end_color = self.start_color = self.color_up
         self.colors = self.get_hex_color_range(self.start_color, self.end_color, 100)
-        self.kbs_recv_arr = [0.0] * self.graph_width
-        self.kbs_sent_arr = [0.0] * self.graph_width
         self.pango_enabled = self.hints.get("markup", False) and self.hints["markup"] == "pango"
 
         # convert settings from the nominated unit to bytes (backwards compatibility)
         self.sent_limit *= 1024
         self.recv_limit *= 1024
+        self.recv_graph = Graph(self.graph_width, 0.0, self.recv_limit, self.graph_style)
+        self.sent_graph = Graph(self.graph_width, 0.0, self.sent_limit, self.graph_style)
 
         self.graph_direction = self.graph_direction.lower()
         if self.graph_direction not in ('left-to-right', 'right-to-left'):
@@ -405,20 +406,18 @@ class Network(IntervalModule, ColorRangeModule):
             self.kbs_arr = [0.0] * self.graph_width
 
     def get_network_graph_recv(self, kbs, limit):
-        # Cycle array by inserting at the start and chopping off the last element
-        self.kbs_recv_arr.insert(0, kbs)
-        self.kbs_recv_arr = self.kbs_recv_arr[:self.graph_width]
-        graph = make_graph(self.kbs_recv_arr, 0.0, limit, self.graph_style)
+        self.recv_graph.upper_limit = limit
+        self.recv_graph.push(kbs)
+        graph = self.recv_graph.draw()
         if self.graph_direction == 'right-to-left':
             return graph[::-1]
         else:
             return graph
 
     def get_network_graph_sent(self, kbs, limit):
-        # Cycle array by inserting at the start and chopping off the last element
-        self.kbs_sent_arr.insert(0, kbs)
-        self.kbs_sent_arr = self.kbs_sent_arr[:self.graph_width]
-        graph = make_graph(self.kbs_sent_arr, 0.0, limit, self.graph_style)
+        self.sent_graph.upper_limit = limit
+        self.sent_graph.push(kbs)
+        graph = self.sent_graph.draw()
         if self.graph_direction == 'right-to-left':
             return graph[::-1]
         else:
@@ -1,9 +1,10 @@
 from os.path import basename
 
-import dbus
-
 from i3pystatus import IntervalModule, formatp
 from i3pystatus.core.util import TimeWrapper
+from i3pystatus.core.imputil import lazy_import
+
+dbus = lazy_import("dbus")
 
 
 class Dbus:
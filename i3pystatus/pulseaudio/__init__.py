@@ -103,10 +103,20 @@ class PulseAudio(Module, ColorRangeModule):
         pa_context_set_state_callback(context, self._context_notify_cb, None)
         pa_context_connect(context, None, 0, None)
         pa_threaded_mainloop_start(_mainloop)
+        self._mainloop = _mainloop
+        self._context = context
 
         self.colors = self.get_hex_color_range(self.color_muted, self.color_unmuted, 100)
         self.sinks = []
 
+    def unregistered(self):
+        """Stops the mainloop thread and closes the connection to Pulseaudio"""
+        super().unregistered()
+        pa_threaded_mainloop_stop(self._mainloop)
+        pa_context_disconnect(self._context)
+        pa_context_unref(self._context)
+        pa_threaded_mainloop_free(self._mainloop)
+
     def request_update(self, context):
         """Requests a sink info update (sink_info_cb is called)"""
         pa_operation_unref(pa_context_get_sink_info_by_name(
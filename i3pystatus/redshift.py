@@ -97,6 +97,11 @@ class RedshiftController(threading.Thread):
             os.kill(self._pid, signal.SIGUSR1)
             self._inhibited = inhibit
 
+    def stop(self):
+        """Terminate the child process, which ends this thread"""
+        if self._pid and self.is_alive():
+            os.kill(self._pid, signal.SIGTERM)
+
     def run(self):
         with Popen(**self._params) as proc:
             self._pid = proc.pid
@@ -146,6 +151,10 @@ class Redshift(IntervalModule):
         self._controller.start()
         self.update_values()
 
+    def unregistered(self):
+        super().unregistered()
+        self._controller.stop()
+
     def update_values(self):
         self.inhibit = self._controller.inhibited
         self.period = self._controller.period
@@ -1,7 +1,6 @@
 import copy
 import json
 import operator
-import pytz
 import re
 import threading
 import time
@@ -11,6 +10,9 @@ from urllib.error import HTTPError, URLError
 
 from i3pystatus import SettingsBase, Module, formatp
 from i3pystatus.core.util import user_open, internet, require
+from i3pystatus.core.imputil import lazy_import
+
+pytz = lazy_import("pytz")
 
 
 class ScoresBackend(SettingsBase):
@@ -426,6 +428,7 @@ class Scores(Module):
                 backend.team_format = self.team_format
 
         self.condition = threading.Condition()
+        self.stopped = False
         self.thread = threading.Thread(target=self.update_thread, daemon=True)
         self.thread.start()
 
@@ -434,7 +437,10 @@ class Scores(Module):
             self.check_scores(force='scheduled')
             while True:
                 with self.condition:
-                    self.condition.wait(self.interval)
+                    if not self.stopped:
+                        self.condition.wait(self.interval)
+                if self.stopped:
+                    return
                 self.check_scores(force='scheduled')
         except Exception:
             thread = threading.current_thread().name,
@@ -443,6 +449,12 @@ class Scores(Module):
                 f'Exception in {thread} at {timestamp}, module {self.name}'
             )
 
+    def unregistered(self):
+        super().unregistered()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
     @property
     def current_backend(self):
         return self.backends[self.backend_id]
@@ -628,8 +640,9 @@ class Scores(Module):
         self.refresh_display()
 
     def show_refresh_icon(self):
-        self.output['full_text'] = \
-            self.refresh_icon + self.output.get('full_text', '')
+        self.output = dict(
+            self.output,
+            full_text=self.refresh_icon + self.output.get('full_text', ''))
 
     def refresh_display(self):
         if self.current_scroll_index is None:
@@ -3,11 +3,13 @@ from i3pystatus.scores import ScoresBackend
 
 import copy
 import json
-import pytz
 import re
 import time
 from datetime import datetime
 from urllib.request import urlopen
+from i3pystatus.core.imputil import lazy_import
+
+pytz = lazy_import("pytz")
 
 LIVE_URL = 'https://www.mlb.com/gameday/{id}'
 SCOREBOARD_URL = 'http://m.mlb.com/scoreboard'
@@ -2,7 +2,6 @@ from i3pystatus.core.util import internet, require
 from i3pystatus.scores import ScoresBackend
 
 import copy
-import pytz
 import re
 import time
 from datetime import datetime, timezone
@@ -36,6 +36,8 @@ class Scratchpad(Module):
     def init(self):
         self.count = 0
         self.urgent = False
+        self.conn = None
+        self.stopped = False
 
         t = Thread(target=self._listen)
         t.daemon = True
@@ -62,8 +64,14 @@ class Scratchpad(Module):
             "color": color,
         }
 
+    def unregistered(self):
+        super().unregistered()
+        self.stopped = True
+        if self.conn is not None:
+            self.conn.main_quit()
+
     def _listen(self):
-        conn = i3ipc.Connection()
+        self.conn = conn = i3ipc.Connection()
         self.update_scratchpad_counter(conn)
 
         conn.on('window::move', self.update_scratchpad_counter)
@@ -71,4 +79,5 @@ class Scratchpad(Module):
         conn.on('window::new', self.update_scratchpad_counter)
         conn.on('window::close', self.update_scratchpad_counter)
 
-        conn.main()
+        if not self.stopped:
+            conn.main()
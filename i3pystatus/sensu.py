@@ -1,8 +1,10 @@
 from i3pystatus import IntervalModule, formatp
 
 from enum import IntEnum
-import requests
 from urllib.parse import urljoin
+from i3pystatus.core.imputil import lazy_import
+
+requests = lazy_import("requests")
 
 
 class SensuCheck(IntervalModule):
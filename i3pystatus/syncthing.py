@@ -1,11 +1,13 @@
 import json
 import os.path
-import requests
 from subprocess import call
 from urllib.parse import urljoin
 import xml.etree.ElementTree as ET
 from i3pystatus import IntervalModule
 from i3pystatus.core.util import user_open
+from i3pystatus.core.imputil import lazy_import
+
+requests = lazy_import("requests")
 
 
 class Syncthing(IntervalModule):
@@ -1,19 +1,15 @@
 #!/usr/bin/env python
 import glob
-import inspect
 import os
 import getpass
 import sys
 import signal
-import pkgutil
 from collections import defaultdict, OrderedDict
 
 import keyring
 
-import i3pystatus
 from i3pystatus import Module, SettingsBase
-from i3pystatus.core import ClassFinder
-from i3pystatus.core.exceptions import ConfigInvalidModuleError
+from i3pystatus.core.imputil import ModuleIndex
 
 
 def signal_handler(signal, frame):
@@ -44,40 +40,32 @@ def enumerate_choices(choices):
     return "".join(lines)
 
 
-def get_modules():
-    for importer, modname, ispkg in pkgutil.iter_modules(i3pystatus.__path__):
-        if modname not in ["core", "tools"]:
-            yield modname
-
-
 def get_credential_modules():
     verbose = "-v" in sys.argv
 
     protected_settings = SettingsBase._SettingsBase__PROTECTED_SETTINGS
-    class_finder = ClassFinder(Module)
     credential_modules = defaultdict(dict)
-    for module_name in get_modules():
-        try:
-            module = class_finder.get_module(module_name)
-            clazz = class_finder.get_class(module)
-        except (ImportError, ConfigInvalidModuleError):
+    for module_name, entry in ModuleIndex(Module).entries().items():
+        if "error" in entry:
             if verbose:
                 print("ImportError while importing", module_name)
             continue
+        if len(entry["classes"]) != 1:
+            continue
 
-        members = [m[0] for m in inspect.getmembers(clazz) if not m[0].startswith('_')]
-        if any([hasattr(clazz, setting) for setting in protected_settings]):
-            credential_modules[clazz.__name__]['credentials'] = list(set(protected_settings) & set(members))
-            credential_modules[clazz.__name__]['key'] = "%s.%s" % (clazz.__module__, clazz.__name__)
-        elif hasattr(clazz, 'required'):
+        clazz = entry["classes"][0]
+        if any(setting in clazz["defaults"] for setting in protected_settings):
+            credential_modules[clazz["name"]]['credentials'] = [
+                setting for setting in protected_settings if setting in clazz["defaults"]]
+            credential_modules[clazz["name"]]['key'] = clazz["path"]
+        else:
             protected = []
-            required = getattr(clazz, 'required')
             for setting in protected_settings:
-                if setting in required:
+                if setting in clazz["required"]:
                     protected.append(setting)
             if protected:
-                credential_modules[clazz.__name__]['credentials'] = protected
-                credential_modules[clazz.__name__]['key'] = "%s.%s" % (clazz.__module__, clazz.__name__)
+                credential_modules[clazz["name"]]['credentials'] = protected
+                credential_modules[clazz["name"]]['key'] = clazz["path"]
     return credential_modules
 
 
@@ -98,6 +98,7 @@ class Updates(Module):
         }
         self.notif_body = {}
         self.condition = threading.Condition()
+        self.stopped = False
         self.thread = threading.Thread(target=self.update_thread, daemon=True)
         self.thread.start()
 
@@ -105,9 +106,18 @@ class Updates(Module):
         self.check_updates()
         while True:
             with self.condition:
-                self.condition.wait(self.interval)
+                if not self.stopped:
+                    self.condition.wait(self.interval)
+            if self.stopped:
+                return
             self.check_updates()
 
+    def unregistered(self):
+        super().unregistered()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
     @require(internet)
     def check_updates(self):
         for backend in self.backends:
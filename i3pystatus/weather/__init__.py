@@ -228,6 +228,7 @@ class Weather(IntervalModule):
         self.backend.init()
 
         self.condition = threading.Condition()
+        self.stopped = False
         self.thread = threading.Thread(target=self.update_thread, daemon=True)
         self.thread.start()
 
@@ -240,7 +241,10 @@ class Weather(IntervalModule):
             self.check_weather()
             while True:
                 with self.condition:
-                    self.condition.wait(self.interval)
+                    if not self.stopped:
+                        self.condition.wait(self.interval)
+                if self.stopped:
+                    return
                 self.check_weather()
         except Exception:
             msg = 'Exception in {thread} at {time}, module {name}'.format(
@@ -250,12 +254,19 @@ class Weather(IntervalModule):
             )
             self.logger.error(msg, exc_info=True)
 
+    def unregistered(self):
+        super().unregistered()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
     def check_weather(self):
         '''
         Check the weather using the configured backend
         '''
-        self.output['full_text'] = \
-            self.refresh_icon + self.output.get('full_text', '')
+        self.output = dict(
+            self.output,
+            full_text=self.refresh_icon + self.output.get('full_text', ''))
         self.backend.check_weather()
         self.refresh_display()
 
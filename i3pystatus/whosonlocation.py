@@ -1,7 +1,9 @@
 from i3pystatus import IntervalModule
-import requests
 from collections import OrderedDict
 from bs4 import BeautifulSoup
+from i3pystatus.core.imputil import lazy_import
+
+requests = lazy_import("requests")
 
 
 class WhosOnLocation():
@@ -103,7 +103,7 @@ class WifiOnIceAPI(Module):
 
     def _loop(self):
         self.logger.debug('begin of _loop()')
-        while True:
+        while not self.stopped:
             self.logger.debug('new _loop()')
             if self._check_wifi():
                 self.logger.info('On a train :)')
@@ -123,7 +123,8 @@ class WifiOnIceAPI(Module):
                 self.update_bar()
 
                 with self.condition:
-                    self.condition.wait(self.on_train_interval)
+                    if not self.stopped:
+                        self.condition.wait(self.on_train_interval)
             else:
                 self.logger.info('Not on a train :(')
 
@@ -136,7 +137,8 @@ class WifiOnIceAPI(Module):
                 self.update_bar()
 
                 with self.condition:
-                    self.condition.wait(self.off_train_interval)
+                    if not self.stopped:
+                        self.condition.wait(self.off_train_interval)
 
     @property
     def _format_vars(self):
@@ -196,12 +198,19 @@ class WifiOnIceAPI(Module):
 
     def init(self):
         self.condition = Condition()
+        self.stopped = False
         self.thread = Thread(
             target=self._loop,
             daemon=True
         )
         self.thread.start()
 
+    def unregistered(self):
+        super().unregistered()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
     def open_url(self):
         if not (self.trip_info and self.ice_status and self.url_on_click):
             return
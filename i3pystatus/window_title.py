@@ -45,6 +45,8 @@ class WindowTitle(Module):
         }
 
         # we are listening to i3 events in a separate thread
+        self.conn = None
+        self.stopped = False
         t = Thread(target=self._loop)
         t.daemon = True
         t.start()
@@ -97,8 +99,14 @@ class WindowTitle(Module):
             "color": self.color,
         }
 
+    def unregistered(self):
+        super().unregistered()
+        self.stopped = True
+        if self.conn is not None:
+            self.conn.main_quit()
+
     def _loop(self):
-        conn = i3ipc.Connection()
+        self.conn = conn = i3ipc.Connection()
         self.title = self.get_title(conn)  # set title on startup
         self.update_display()
 
@@ -113,4 +121,5 @@ class WindowTitle(Module):
         conn.on("window::title", self.update_title)
         conn.on("window::focus", self.update_title)
 
-        conn.main()  # run the event loop
+        if not self.stopped:
+            conn.main()  # run the event loop
@@ -0,0 +1,36 @@
+import pytest
+
+from i3pystatus.core.color import ColorRangeModule, color_range, hex_to_hsl, hsl_to_hex
+
+
+@pytest.mark.parametrize("start, end, quantity, expected", [
+    # Reference values from the colour package
+    ("#00FF00", "#FF0000", 5, ("#00ff00", "#7fff00", "#ffff00", "#ff7f00", "#ff0000")),
+    ("#FFFFFF", "#000", 3, ("#ffffff", "#7f7f7f", "#000000")),
+    ("#aa0500", "#FFFFFF", 4, ("#aa0500", "#d94542", "#d9b4b3", "#ffffff")),
+    ("#123456", "#FFFFFF", 1, ("#123456",)),
+])
+def test_color_range(start, end, quantity, expected):
+    assert color_range.__wrapped__(start, end, quantity) == expected
+
+
+def test_color_range_shared():
+    colors = ColorRangeModule.get_hex_color_range("#00FF00", "#FF0000", 100)
+    assert len(colors) == 100
+    assert ColorRangeModule.get_hex_color_range("#00FF00", "#FF0000", 100) is colors
+    assert ColorRangeModule.get_hex_color_range("#00FF00", "#FF0000", 50) is not colors
+
+
+def test_color_range_negative():
+    with pytest.raises(ValueError):
+        color_range("#00FF00", "#FF0000", 0)
+
+
+@pytest.mark.parametrize("color", ["#000000", "#ffffff", "#ff0000", "#00ff00", "#0000ff", "#123456", "#aa0500"])
+def test_hsl_round_trip(color):
+    assert hsl_to_hex(hex_to_hsl(color)) == color
+    assert hsl_to_hex(hex_to_hsl(color.upper())) == color
+
+
+def test_short_hex():
+    assert hex_to_hsl("#0f0") == hex_to_hsl("#00ff00")
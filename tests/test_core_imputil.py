@@ -0,0 +1,47 @@
+import sys
+
+import pytest
+
+from i3pystatus import Module, clock
+from i3pystatus.core.imputil import ClassFinder, LazyModule, ModuleIndex, lazy_import
+
+
+def test_lazy_import_defers_import():
+    sys.modules.pop("wave", None)
+    wave = lazy_import("wave")
+    assert isinstance(wave, LazyModule)
+    assert "wave" not in sys.modules
+    assert wave.Error.__name__ == "Error"
+    assert "wave" in sys.modules
+    assert wave.open is sys.modules["wave"].open
+
+
+def test_lazy_import_returns_imported_module():
+    assert lazy_import("os") is sys.modules["os"]
+
+
+def test_lazy_import_missing_module():
+    with pytest.raises(ImportError):
+        lazy_import("i3pystatus_no_such_module")
+
+
+def test_class_finder_remembers_classes():
+    finder = ClassFinder(Module)
+    classes = finder.get_matching_classes(clock)
+    assert classes == [clock.Clock]
+    assert ClassFinder(Module).get_matching_classes(clock) is classes
+
+
+def test_module_index(tmpdir):
+    path = str(tmpdir.join("index.json"))
+    index = ModuleIndex(Module, path=path)
+    entries = index.entries()
+    entry = entries["clock"]["classes"][0]
+    assert entry["path"] == "i3pystatus.clock.Clock"
+    assert ["format", "`None` means to use the default, locale-dependent format."] in entry["settings"]
+    assert "interval" in entry["defaults"]
+    assert "core" not in entries
+
+    signature = index.signature()
+    assert index.load(signature) == entries
+    assert index.load("outdated") is None
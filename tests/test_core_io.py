@@ -0,0 +1,187 @@
+import json
+import os
+import time
+
+from i3pystatus.core import metrics
+from i3pystatus.core.io import FrameWriter, IOHandler, JSONIO, StandaloneIO
+
+
+class FakeIO(IOHandler):
+    """IOHandler with a fixed list of input lines."""
+
+    def __init__(self, lines):
+        self.lines = list(lines)
+        self.written = []
+
+    def read(self):
+        while self.lines:
+            yield self.read_line()
+
+    def read_line(self):
+        return self.lines.pop(0)
+
+    def write_line(self, line):
+        self.written.append(line)
+
+
+def run_frames(jsonio, frames):
+    for j, frame in zip(jsonio.read(), frames):
+        j.extend(frame)
+
+
+def test_jsonio_writes_every_line():
+    io = FakeIO(['{"version": 1}', "[", "[]", ",[]", ",[]"])
+    run_frames(JSONIO(io), [[{"full_text": "a"}]] * 3)
+    assert io.written[:2] == ['{"version": 1}', "["]
+    assert [line[0] for line in io.written[2:]] == ["[", ",", ","]
+    assert all(json.loads(line.lstrip(",")) == [{"full_text": "a"}] for line in io.written[2:])
+
+
+def test_jsonio_no_echo():
+    io = FakeIO(["[", '{"button": 1}', ',{"button": 3}'])
+    events = list(JSONIO(io, skiplines=1, echo=False).read())
+    assert events == [{"button": 1}, {"button": 3}]
+    assert io.written == ["["]
+
+
+def test_jsonio_write_frames():
+    frames = ['[{"full_text": "a"}]', '[{"full_text": "a"}]', '[{"full_text": "b"}]']
+    io = FakeIO(['{"version": 1}', "[", "[]", ",[]", ",[]"])
+    JSONIO(io).write_frames(lambda: frames.pop(0))
+    assert io.written[2:] == ['[{"full_text": "a"}]', ',[{"full_text": "b"}]']
+
+
+def test_jsonio_resend():
+    io = FakeIO(['{"version": 1}', "[", "[]", ",[]", ",[]"])
+    JSONIO(io, resend_interval=0).write_frames(lambda: '[{"full_text": "a"}]')
+    assert io.written[2:] == ['[{"full_text": "a"}]'] + [',[{"full_text": "a"}]'] * 2
+
+
+class FakeClock:
+    """Returns `now`, advanced by `step` after every call."""
+
+    def __init__(self, now=100.0, step=0.0):
+        self.now = now
+        self.step = step
+
+    def __call__(self):
+        now = self.now
+        self.now += self.step
+        return now
+
+
+def test_standalone_refresh_coalescing():
+    io = StandaloneIO(False, [], False, interval=10, min_frame_interval=0.1, max_latency=0.5)
+    io.clock = clock = FakeClock()
+    io.last_frame = clock.now
+    assert io.next_frame() == 110.0
+
+    # The first request right after a frame waits for the window to end
+    clock.now = 100.02
+    io.async_refresh()
+    assert io.next_frame() == 100.1
+    io.start_frame(100.1)
+
+    # Outside of the window, requests are served immediately
+    clock.now = 100.25
+    io.async_refresh()
+    assert io.next_frame() <= clock.now
+    io.start_frame(clock.now)
+
+    # Requests within the window are merged into one frame
+    clock.now = 100.26
+    for _ in range(20):
+        io.async_refresh()
+    assert io.next_frame() == 100.35
+    io.start_frame(100.35)
+    assert io.next_frame() == 110.35
+    assert io.frames == 3
+    assert io.refresh_requests == 22
+    assert io.merged_refreshes == 19
+
+
+def test_standalone_max_latency():
+    io = StandaloneIO(False, [], False, interval=10, min_frame_interval=2, max_latency=0.5)
+    io.clock = clock = FakeClock()
+    io.last_frame = clock.now
+    clock.now = 100.1
+    io.async_refresh()
+    assert io.next_frame() == 100.6
+
+
+def test_standalone_read_waits_for_due_frame():
+    io = StandaloneIO(False, [], False, interval=10)
+    # Every look at the clock is a full interval later, so read() never waits
+    io.clock = FakeClock(step=10)
+    frames = io.read()
+    assert json.loads(next(frames))["version"] == 1
+    assert io.frames == 1
+    assert io.last_frame == 110.0
+
+
+def test_frame_writer_latest_frame_wins():
+    read_fd, write_fd = os.pipe()
+    out = os.fdopen(write_fd, "w")
+    writer = FrameWriter(out)
+    writer.start()
+    writer.write_line("[")
+    big = "x" * 100000  # more than a pipe buffer holds
+    writer.write_frame(big)
+    # Wait until the writer is stuck on the big frame
+    deadline = time.monotonic() + 5
+    while not writer.blocked_writes and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert writer.blocked_writes >= 1
+    for n in range(10):
+        writer.write_frame(str(n))
+    writer.write_line("must not be dropped")
+
+    data = b""
+    with os.fdopen(read_fd, "rb") as reader:
+        while not data.endswith(b",9\n"):
+            data += reader.read1(65536)
+        writer.close()
+        writer.thread.join(5)
+    out.close()
+    assert not writer.thread.is_alive()
+    assert data.split(b"\n")[:-1] == [b"[", big.encode(), b"must not be dropped", b",9"]
+    assert writer.dropped_frames == 9
+    assert writer.frames == 2
+
+
+def test_frame_writer_metrics():
+    read_fd, write_fd = os.pipe()
+    out = os.fdopen(write_fd, "w")
+    writer = FrameWriter(out, name="test")
+    writer.start()
+    writer.write_line("[")
+    writer.write_frame("[]")
+    with os.fdopen(read_fd, "rb") as reader:
+        data = b""
+        while not data.endswith(b"[]\n"):
+            data += reader.read1(65536)
+        text = metrics.registry.prometheus()
+        labels = 'writer="test",instance="{}"'.format(id(writer))
+        assert "i3pystatus_writer_frames_total{%s} 1" % labels in text
+        assert "i3pystatus_writer_dropped_frames_total{%s} 0" % labels in text
+        assert "i3pystatus_writer_blocked_writes_total{%s} 0" % labels in text
+        assert "i3pystatus_writer_blocked_seconds_total{%s} 0.000000" % labels in text
+        writer.close()
+        writer.thread.join(5)
+    out.close()
+    assert 'writer="test"' not in metrics.registry.prometheus()
+
+
+def test_frame_writer_restores_blocking_mode():
+    read_fd, write_fd = os.pipe()
+    out = os.fdopen(write_fd, "w")
+    writer = FrameWriter(out)
+    writer.start()
+    assert not os.get_blocking(write_fd)
+    writer.write_line("[")
+    writer.close()
+    writer.thread.join(5)
+    assert os.get_blocking(write_fd)
+    out.close()
+    with os.fdopen(read_fd, "rb") as reader:
+        assert reader.read() == b"[\n"
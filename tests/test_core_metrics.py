@@ -0,0 +1,97 @@
+import os
+import socket
+import tempfile
+import time
+
+from i3pystatus.core import metrics
+from i3pystatus.core.threading import ExceptionWrapper, WorkloadWrapper
+
+
+class Workload:
+    __name__ = "test.Workload"
+    output = None
+    fail = False
+
+    def __call__(self):
+        if self.fail:
+            raise ValueError("fail")
+
+
+def test_registry():
+    registry = metrics.Registry()
+    workload = Workload()
+    registry.observe_run(workload, 0.003)
+    registry.observe_run(workload, 0.2, failed=True)
+    registry.observe_timeout(workload)
+    registry.observe_output_change(workload)
+
+    text = registry.prometheus()
+    labels = 'module="test.Workload",instance="{}"'.format(id(workload))
+    assert "i3pystatus_module_runs_total{%s} 2" % labels in text
+    assert "i3pystatus_module_errors_total{%s} 1" % labels in text
+    assert "i3pystatus_module_timeouts_total{%s} 1" % labels in text
+    assert "i3pystatus_module_output_changes_total{%s} 1" % labels in text
+    assert 'i3pystatus_module_run_seconds_bucket{%s,le="0.0025"} 0' % labels in text
+    assert 'i3pystatus_module_run_seconds_bucket{%s,le="0.005"} 1' % labels in text
+    assert 'i3pystatus_module_run_seconds_bucket{%s,le="+Inf"} 2' % labels in text
+    assert "i3pystatus_module_run_seconds_count{%s} 2" % labels in text
+    assert "i3pystatus_module_last_success_timestamp_seconds{%s}" % labels in text
+
+
+def test_registry_forgets_modules():
+    registry = metrics.Registry()
+    workload = Workload()
+    registry.observe_run(workload, 0.01)
+    registry.remove(workload)
+    assert "test.Workload" not in registry.prometheus()
+
+    # Metrics of a collected module are not inherited by one with the same id
+    registry.observe_run(workload, 0.01)
+    registry.modules[id(workload)].ref = lambda: None
+    assert registry.get(workload).runs == 0
+    registry.modules[id(workload)].ref = lambda: None
+    assert "test.Workload" not in registry.prometheus()
+
+
+def test_workload_wrapper_records_runs():
+    workload = Workload()
+    wrapper = WorkloadWrapper(ExceptionWrapper(workload))
+    wrapper()
+    workload.fail = True
+    wrapper()
+    wrapper()
+    workload.fail = False
+    wrapper()
+
+    recorded = metrics.registry.get(workload)
+    assert recorded.runs == 4
+    assert recorded.errors == 2
+
+
+def test_exporter():
+    registry = metrics.Registry()
+    registry.observe_run(Workload(), 0.01)
+    with tempfile.TemporaryDirectory() as tmp:
+        textfile = os.path.join(tmp, "i3pystatus.prom")
+        socket_path = os.path.join(tmp, "metrics.sock")
+        metrics.Exporter(registry, textfile, socket_path).start()
+
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(socket_path)
+            sock.sendall(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            response = b""
+            while True:
+                data = sock.recv(4096)
+                if not data:
+                    break
+                response += data
+        head, _, body = response.decode().partition("\r\n\r\n")
+        assert head.startswith("HTTP/1.0 200 OK")
+        assert "i3pystatus_module_runs_total" in body
+
+        for _ in range(100):
+            if os.path.exists(textfile):
+                break
+            time.sleep(0.01)
+        with open(textfile) as f:
+            assert "i3pystatus_module_runs_total" in f.read()
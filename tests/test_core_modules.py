@@ -1,3 +1,4 @@
+import json
 import time
 from unittest.mock import MagicMock
 
@@ -226,3 +227,74 @@ def test_required_subclass_overide():
         some_setting = 'foo'
 
     TestSubClass()
+
+
+def test_async_interval_module():
+    import asyncio
+    from i3pystatus import AsyncIntervalModule
+
+    class TestAsync(AsyncIntervalModule):
+        interval = 60
+
+        async def run(self):
+            await asyncio.sleep(0)
+            self.output = {"full_text": "async"}
+
+    class TestSync(AsyncIntervalModule):
+        interval = 60
+
+        def run(self):
+            self.output = {"full_text": "sync"}
+
+    class TestFailing(AsyncIntervalModule):
+        async def run(self):
+            raise ValueError("broken")
+
+    for cls, text in ((TestAsync, "async"), (TestSync, "sync"), (TestFailing, "ValueError: broken")):
+        module = cls()
+        module()
+        assert text in module.output["full_text"]
+
+
+def test_group_update_fragment():
+    from i3pystatus.group import Group
+    from i3pystatus.text import Text
+
+    group = Group()
+    a = group.register(Text(text="a"))
+    group.register(Text(text="b"))
+    group.run()
+    assert group.update_fragment()
+    assert json.loads(group.fragment)["full_text"] == "a"
+
+    # Like IntervalModule.__call__ after run() changed the output in place
+    a.output["full_text"] = "c"
+    a.dirty = True
+    assert group.update_fragment()
+    assert json.loads(group.fragment)["full_text"] == "c"
+
+    group.cycle_module()
+    assert group.update_fragment()
+    assert json.loads(group.fragment)["full_text"] == "b"
+    assert not group.update_fragment()
+
+
+def test_update_fragment():
+    from i3pystatus.text import Text
+
+    status = Status(standalone=False)
+    text = status.register(Text(text="a & b", hints={"markup": "pango"}, color="#FFFFFF"))
+    assert text.update_fragment()
+    assert not text.update_fragment()
+    assert json.loads(text.fragment) == {
+        "full_text": "a &amp; b", "name": "i3pystatus.text.Text", "instance": str(id(text)), "markup": "pango"}
+    assert text.output == {"full_text": "a & b", "color": "#FFFFFF"}
+
+    text.output = {"full_text": "a & b"}
+    assert not text.update_fragment()
+    text.output = {"full_text": "c"}
+    assert text.update_fragment()
+
+    frame = status.render_frame()
+    assert frame == "[" + text.fragment + "]"
+    assert status.render_frame() is frame
@@ -0,0 +1,39 @@
+import os
+import tempfile
+import threading
+import time
+
+from i3pystatus import IntervalModule
+from i3pystatus.core.profiler import SamplingProfiler
+
+
+class Busy(IntervalModule):
+    def init(self):
+        self.stop = threading.Event()
+
+    def run(self):
+        while not self.stop.is_set():
+            sum(range(1000))
+
+
+def test_sampling_profiler():
+    busy = Busy()
+    thread = threading.Thread(target=busy)
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = SamplingProfiler(os.path.join(tmp, "profile.collapsed"), interval=0.005)
+        profiler.toggle()
+        thread.start()
+        time.sleep(0.2)
+        busy.stop.set()
+        thread.join()
+        profiler.toggle()
+        assert not profiler.running.is_set()
+
+        with open(profiler.path) as f:
+            lines = f.read().splitlines()
+    root = "{}@{}".format(busy.__name__, id(busy))
+    busy_samples = [line for line in lines if line.startswith(root + ";")]
+    assert busy_samples
+    stack, count = busy_samples[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert stack.split(";")[-1].startswith("run (")
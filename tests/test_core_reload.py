@@ -0,0 +1,151 @@
+import sys
+
+import pytest
+
+from i3pystatus import IntervalModule
+from i3pystatus.calendar import Calendar, CalendarBackend
+from i3pystatus.core import Status, metrics
+from i3pystatus.core.imputil import load_config
+from i3pystatus.core.reload import settings_equal
+from i3pystatus.core.threading import Scheduler
+from i3pystatus.text import Text
+
+CONFIG = """
+import io
+from i3pystatus import Status
+
+status = Status(standalone=False, input_stream=io.StringIO('{{"version": 1}}\\n[\\n'))
+{registrations}
+{code}
+status.run()
+"""
+
+GROUP = """
+from i3pystatus import IntervalModule
+from i3pystatus.group import Group
+
+class Counter(IntervalModule):
+    interval = 60
+
+group = Group()
+group.register(Counter)
+status.register(group)
+status.register(Counter)
+"""
+
+
+def make_callback(value):
+    return lambda: value
+
+
+@pytest.mark.parametrize("a, b, equal", [
+    ({"text": "a", "color": None}, {"text": "a", "color": None}, True),
+    ({"text": "a"}, {"text": "b"}, False),
+    ((["x", 1],), (["x", 1],), True),
+    (make_callback(1), make_callback(1), True),
+    (make_callback(1), make_callback(2), False),
+    (lambda: 1, lambda: 2, False),
+    (Text(text="a"), Text(text="a"), True),
+    (Text(text="a"), Text(text="b"), False),
+    (1, 1.0, False),
+])
+def test_settings_equal(a, b, equal):
+    assert settings_equal(a, b) is equal
+
+
+@pytest.fixture
+def config(tmpdir):
+    path = tmpdir.join("config.py")
+
+    def write(*registrations, code=""):
+        path.write(CONFIG.format(registrations="\n".join("status.register({})".format(r) for r in registrations),
+                                 code=code))
+        return str(path)
+    yield write
+    sys.modules.pop("i3pystatus-config", None)
+
+
+def test_reload(config):
+    status = load_config(config('"text", text="a"', '"text", text="b"', '"text", text="c", on_leftclick=lambda: 1')).status
+    a, b, c = status.modules
+
+    config('"text", text="c", on_leftclick=lambda: 1', '"text", text="a"', '"text", text="d"')
+    assert status.reload()
+    assert list(status.modules)[:2] == [c, a]
+    d = status.modules[2]
+    assert d not in (a, b) and d.text == "d"
+    assert status.modules.get(id(d)) is d
+    assert status.modules.get(id(b)) is None
+    assert id(b) not in status.modules.registrations
+
+
+def test_reload_failure_keeps_modules(config):
+    status = load_config(config('"text", text="a"')).status
+    modules = list(status.modules)
+
+    config('"text", text="b"', '"text" (')
+    assert not status.reload()
+    assert list(status.modules) == modules
+    assert sys.modules["i3pystatus-config"].status is status
+
+
+def test_reload_removes_metrics(config):
+    status = load_config(config('"text", text="a"', '"text", text="b"')).status
+    a, b = status.modules
+    for module in (a, b):
+        metrics.registry.observe_run(module, 0.01)
+
+    config('"text", text="a"')
+    assert status.reload()
+    text = metrics.registry.prometheus()
+    assert 'instance="{}"'.format(id(a)) in text
+    assert 'instance="{}"'.format(id(b)) not in text
+
+
+def scheduled_counters():
+    return [job.module for job in IntervalModule.scheduler.jobs if type(job.module).__name__ == "Counter"]
+
+
+def test_reload_failure_unregisters_created_modules(config):
+    status = load_config(config('"text", text="a"')).status
+
+    config('"text", text="b"', code=GROUP + "raise RuntimeError")
+    assert not status.reload()
+    assert scheduled_counters() == []
+
+    config('"text", text="b"', code=GROUP)
+    assert status.reload()
+    group, counter = list(status.modules)[1:]
+    assert scheduled_counters() == [group.modules[0], counter]
+    status.modules.replace([])
+    assert scheduled_counters() == []
+
+
+class NoEvents(CalendarBackend):
+    def update(self):
+        pass
+
+
+def test_unregistered_stops_update_thread():
+    calendar = Calendar(backend=NoEvents())
+    calendar.registered(None)
+    calendar.unregistered()
+    calendar.thread.join(5)
+    assert not calendar.thread.is_alive()
+
+
+class Workload:
+    def __init__(self):
+        self.runs = 0
+
+    def __call__(self):
+        self.runs += 1
+
+
+def test_scheduler_remove():
+    scheduler = Scheduler()
+    workload = Workload()
+    scheduler.append(workload, 60)
+    scheduler.remove(workload)
+    assert len(scheduler) == 0
+    assert scheduler.queue[0][2].removed
@@ -0,0 +1,84 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from i3pystatus import Module, Status
+from i3pystatus.core.server import Server, read_lines
+
+
+class Bar:
+    """A client connected to a server, like ``i3pystatus --connect``."""
+
+    def __init__(self, path, output):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.sock.sendall(json.dumps({"output": output}).encode() + b"\n")
+        self.lines = read_lines(self.sock)
+
+    def read(self, n):
+        return [next(self.lines) for _ in range(n)]
+
+    def click(self, line):
+        self.sock.sendall(line.encode() + b"\n")
+
+
+def wait_for(predicate, timeout=1):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end
+        time.sleep(0.01)
+
+
+def test_server():
+    tick = threading.Event()
+    clicks = []
+
+    def ticks():
+        while True:
+            tick.wait()
+            tick.clear()
+            yield
+
+    def render_frames(outputs):
+        return {output: "[{}]".format(json.dumps(output)) for output in outputs}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "i3pystatus.sock")
+        server = Server(path, render_frames, clicks.append, tick.set)
+        server.start()
+        threading.Thread(target=server.serve, args=(ticks(),), daemon=True).start()
+
+        left = Bar(path, "DP-1")
+        assert left.read(3) == ['{"version": 1, "click_events": true}', "[", '["DP-1"]']
+        right = Bar(path, "DP-2")
+        assert right.read(3)[2] == '["DP-2"]'
+
+        left.click("[")
+        left.click('{"instance": "1", "button": 1}')
+        right.click(',{"instance": "2", "button": 3}')
+        wait_for(lambda: len(clicks) == 2)
+        assert sorted(click["button"] for click in clicks) == [1, 3]
+
+        left.sock.close()
+        wait_for(lambda: len(server.clients) == 1)
+
+
+class Output(Module):
+    def __init__(self, text, **kwargs):
+        super().__init__(**kwargs)
+        self.output = {"full_text": text}
+
+
+def test_render_frames():
+    status = Status(standalone=False)
+    status.register(Output("everywhere"))
+    status.register(Output("left", outputs=["DP-1"]))
+
+    frames = status.render_frames(["DP-1", "DP-2", None])
+    texts = {output: [block["full_text"] for block in json.loads(frame)] for output, frame in frames.items()}
+    # Modules are inserted at position 0, i.e. in reverse order
+    assert texts == {"DP-1": ["left", "everywhere"], "DP-2": ["everywhere"], None: ["left", "everywhere"]}
+    assert status.render_frame("DP-2") is frames["DP-2"]
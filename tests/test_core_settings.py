@@ -0,0 +1,48 @@
+import pytest
+
+from i3pystatus.core.exceptions import ConfigKeyError, ConfigMissingError
+from i3pystatus.core.settings import SettingsBase, SettingsSchema
+
+
+class Base(SettingsBase):
+    settings = (
+        ("host", "Host name"),
+        "port",
+        "password",
+    )
+    required = ("host", "port")
+    password = None
+
+
+class Derived(Base):
+    settings = ("ssl",)
+    port = 993
+    ssl = True
+
+
+def test_merged_settings():
+    assert [s if isinstance(s, str) else s[0] for s in Derived.settings] == [
+        "ssl", "host", "port", "password", "log_level"]
+    assert Base.required == {"host", "port"}
+    assert Derived.required == {"host"}
+
+
+def test_init():
+    obj = Derived(host="example.com")
+    assert (obj.host, obj.port, obj.ssl) == ("example.com", 993, True)
+    assert Derived({"host": "example.com", "port": 1}).port == 1
+
+
+def test_init_errors():
+    with pytest.raises(ConfigKeyError):
+        Derived(host="example.com", prot=1)
+    with pytest.raises(ConfigMissingError):
+        Derived(port=1)
+
+
+def test_schema():
+    schema = SettingsSchema.of(Derived)
+    assert SettingsSchema.of(Derived) is schema
+    assert SettingsSchema.of(Base) is not schema
+    assert schema.names == {"ssl", "host", "port", "password", "log_level"}
+    assert schema.protected == ("password",)
@@ -0,0 +1,221 @@
+import threading
+import time
+
+import pytest
+
+from i3pystatus.core.threading import ExceptionWrapper, Scheduler
+
+
+@pytest.fixture
+def make_scheduler():
+    """Creates schedulers that are stopped at the end of the test."""
+    schedulers = []
+
+    def make(**kwargs):
+        schedulers.append(Scheduler(**kwargs))
+        return schedulers[-1]
+    yield make
+    for scheduler in schedulers:
+        scheduler.stop()
+
+
+def wait_until(predicate, timeout=2.0):
+    """Polls `predicate` until it is true; returns False after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class Counter:
+    def __init__(self, keep_alive=False):
+        self.keep_alive = keep_alive
+        self.calls = 0
+        self.threads = set()
+        self.ran = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.threads.add(threading.current_thread().name)
+        self.ran.set()
+
+
+def test_scheduler_runs_immediately(make_scheduler):
+    scheduler = make_scheduler()
+    counter = Counter()
+    scheduler.append(counter, 60)
+    assert counter.ran.wait(1)
+    assert counter.calls == 1
+
+
+def test_scheduler_repeats(make_scheduler):
+    scheduler = make_scheduler()
+    counter = Counter()
+    scheduler.append(counter, 0.02)
+    assert wait_until(lambda: counter.calls >= 5)
+
+
+def test_scheduler_bounded_workers(make_scheduler):
+    scheduler = make_scheduler(max_workers=2)
+    counters = [Counter() for _ in range(10)]
+    for counter in counters:
+        scheduler.append(counter, 0.02)
+    assert wait_until(lambda: all(counter.calls >= 2 for counter in counters))
+    assert scheduler.workers <= 2
+
+
+def test_scheduler_aligned_deadlines(make_scheduler):
+    scheduler = make_scheduler()
+    jobs = [scheduler.append(Counter(), 10) for _ in range(3)]
+    # After their first run, all jobs are due at the same point of the grid
+    assert wait_until(lambda: len({job.deadline for job in jobs}) == 1)
+    assert all(job.module.calls == 1 for job in jobs)
+
+
+def test_scheduler_suspend(make_scheduler):
+    scheduler = make_scheduler()
+    scheduler.suspend()
+    sleeper = Counter()
+    keep_alive = Counter(keep_alive=True)
+    scheduler.append(sleeper, 0.02)
+    scheduler.append(keep_alive, 0.02)
+    assert wait_until(lambda: keep_alive.calls >= 3)
+    assert not sleeper.calls
+    scheduler.resume()
+    assert sleeper.ran.wait(1)
+
+
+def test_scheduler_watchdog(make_scheduler):
+    class Hung:
+        output = {"full_text": "hung"}
+
+        def __init__(self):
+            self.release = threading.Event()
+
+        def __call__(self):
+            self.release.wait()
+
+    scheduler = make_scheduler(max_workers=1)
+    hung = Hung()
+    job = scheduler.append(hung, 0.02, timeout=0.05)
+    counter = Counter()
+    scheduler.append(counter, 0.02)
+
+    assert counter.ran.wait(1)
+    assert job.quarantined
+    assert hung.output == {"full_text": "hung", "color": Scheduler.stale_color}
+    assert scheduler.workers == 1
+
+    hung.release.set()
+    assert wait_until(lambda: not job.quarantined)
+    assert job not in scheduler.running
+    assert hung.output == {"full_text": "hung"}
+
+
+def test_scheduler_rebalance(make_scheduler):
+    scheduler = make_scheduler(max_workers=4, rebalance_interval=0.05)
+    for _ in range(8):
+        scheduler.append(Counter(), 0.02)
+    assert wait_until(lambda: scheduler.rebalance_log and scheduler.rebalance_log[-1]["new_target"] == 1)
+    assert scheduler.target_workers == 1
+    assert wait_until(lambda: scheduler.workers <= 1)
+
+    def busy():
+        time.sleep(0.02)
+
+    for _ in range(4):
+        scheduler.append(busy, 0.02)
+    assert wait_until(lambda: scheduler.target_workers > 1)
+    assert any(entry["old_target"] == 1 and entry["new_target"] > 1 for entry in scheduler.rebalance_log)
+
+
+def test_exception_wrapper_backoff():
+    class Flaky:
+        interval = 10
+        max_backoff = 60
+        output = None
+        broken = True
+
+        def __call__(self):
+            if self.broken:
+                raise OSError("backend down")
+
+    flaky = Flaky()
+    breaker = ExceptionWrapper(flaky)
+    backoffs = []
+    for _ in range(5):
+        breaker()
+        backoffs.append(breaker.backoff)
+    assert backoffs == [1, 2, 4, 6, 6]
+    assert breaker.is_open
+    assert flaky.output["full_text"] == "Flaky: OSError: backend down (retry in 60s)"
+
+    flaky.broken = False
+    breaker()
+    assert breaker.backoff == 1
+    assert not breaker.is_open
+
+
+def test_scheduler_rebalance_without_jobs():
+    scheduler = Scheduler()
+    scheduler.target_workers = 3
+    with scheduler.lock:
+        scheduler.rebalance(time.monotonic())
+    assert scheduler.target_workers == 3
+    assert not scheduler.rebalance_log
+
+
+def test_scheduler_all_jobs_removed(make_scheduler):
+    scheduler = make_scheduler(max_workers=4, rebalance_interval=0.05)
+
+    def busy():
+        time.sleep(0.02)
+
+    for _ in range(4):
+        scheduler.append(busy, 0.02)
+    appended = time.monotonic()
+    assert wait_until(lambda: scheduler.last_rebalance > appended)
+    for job in list(scheduler):
+        scheduler.remove(job.module)
+    # Rebalancing with no jobs left must not kill the dispatcher
+    removed = time.monotonic()
+    with scheduler.lock:
+        scheduler.last_rebalance = removed - scheduler.rebalance_interval
+        scheduler.dispatch_cond.notify()
+    assert wait_until(lambda: scheduler.last_rebalance > removed)
+    assert scheduler._dispatcher.is_alive()
+
+    counter = Counter()
+    scheduler.append(counter, 60)
+    assert counter.ran.wait(1)
+
+
+def test_scheduler_restarts_dispatcher(make_scheduler):
+    scheduler = make_scheduler()
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    scheduler._dispatcher = dead
+    counter = Counter()
+    scheduler.append(counter, 60)
+    assert counter.ran.wait(1)
+    assert scheduler._dispatcher is not dead
+
+
+def test_scheduler_stop(make_scheduler):
+    scheduler = make_scheduler()
+    counter = Counter()
+    scheduler.append(counter, 0.02)
+    assert counter.ran.wait(1)
+    dispatcher = scheduler._dispatcher
+    scheduler.stop()
+    assert not dispatcher.is_alive()
+    assert len(scheduler) == 0
+    assert wait_until(lambda: scheduler.workers == 0)
+
+    # Appending starts it again
+    counter = Counter()
+    scheduler.append(counter, 60)
+    assert counter.ran.wait(1)
@@ -0,0 +1,73 @@
+from i3pystatus.core.tracing import Tracer
+
+
+class Module:
+    __name__ = "test.Module"
+
+
+def test_click_trace():
+    tracer = Tracer()
+    module = Module()
+    tracer.start(module)
+    assert not tracer.pending
+
+    tracer.enable()
+    tracer.start(module, "click")
+    tracer.callback(module)
+    tracer.run_started(module)
+    tracer.run_finished(module)
+    tracer.mark_ready("refresh")
+    tracer.mark_ready("refresh")
+    tracer.mark_ready("wakeup")
+    tracer.rendered(module, True)
+    tracer.mark_ready("wakeup")
+    tracer.frame_written()
+
+    trace, = tracer.completed
+    assert [stage for stage, _ in trace.events] == [
+        "click", "callback", "run_start", "run_end", "refresh", "wakeup", "render", "write"]
+    assert not tracer.pending
+    assert set(tracer.breakdown()["test.Module"]) == {
+        "callback", "run_start", "run_end", "refresh", "wakeup", "render", "write", "total"}
+
+    events = tracer.chrome_trace()["traceEvents"]
+    assert events[0] == {"name": "thread_name", "ph": "M", "pid": events[0]["pid"], "tid": 1,
+                         "args": {"name": "test.Module"}}
+    assert [event["name"] for event in events[1:]] == [
+        "click", "callback", "run_start", "run_end", "refresh", "wakeup", "render", "write"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events[1:])
+
+
+def test_delayed_callback():
+    tracer = Tracer()
+    tracer.enable()
+    module = Module()
+    tracer.start(module, "click")
+    tracer.wait_for_callback(module)
+    tracer.run_started(module)
+    tracer.run_finished(module)
+    tracer.rendered(module, False)
+    tracer.frame_written()
+    # Still waiting for the callback
+    assert not tracer.completed
+
+    tracer.callback(module)
+    tracer.run_started(module)
+    tracer.run_finished(module)
+    tracer.rendered(module, True)
+    tracer.frame_written()
+    trace, = tracer.completed
+    assert [stage for stage, _ in trace.events] == [
+        "click", "multi_click_wait", "run_start", "run_end", "callback", "run_start", "run_end", "render", "write"]
+
+
+def test_unchanged_update_dropped():
+    tracer = Tracer()
+    tracer.enable()
+    module = Module()
+    tracer.run_started(module)
+    tracer.run_finished(module)
+    tracer.rendered(module, False)
+    assert not tracer.pending
+    assert not tracer.completed
+    assert tracer.dropped == 1
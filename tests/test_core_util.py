@@ -104,6 +104,35 @@ class ModuleListTests(unittest.TestCase):
         pymod.some_class.__init__.assert_called_with()
         pymod.some_class.registered.assert_called_with(self.status_handler)
 
+    def test_get(self):
+        modules = [self.ml.append(self._create_module_class("m%d" % i)) for i in range(3)]
+
+        self.assertIs(self.ml.get(id(modules[1])), modules[1])
+        self.assertIs(self.ml.get(str(id(modules[2]))), modules[2])
+        self.assertIsNone(self.ml.get(id(self)))
+
+        self.ml.remove(modules[1])
+        self.assertIsNone(self.ml.get(id(modules[1])))
+        del self.ml[0]
+        self.assertIsNone(self.ml.get(id(modules[0])))
+        self.assertIs(self.ml.pop(), modules[2])
+        self.assertEqual(self.ml.by_id, {})
+
+    def test_get_nested(self):
+        group = self._create_module_class("group")()
+        group.modules = util.ModuleList(group, ClassFinder(self.ModuleBase))
+        self.ml.append(group)
+        child = group.modules.append(self._create_module_class("child"))
+
+        self.assertIs(self.ml.get(id(group)), group)
+        self.assertIs(self.ml.get(id(child)), child)
+
+        group.modules.remove(child)
+        self.assertIsNone(self.ml.get(id(child)))
+        group.modules.append(child)
+        self.ml.clear()
+        self.assertIsNone(self.ml.get(id(child)))
+
     def test_append_module2(self):
         # Here we test if imported classes are ignored as they should
         pymod = types.ModuleType("test_mod")
@@ -223,6 +252,21 @@ class FormatPTests(unittest.TestCase):
             s, status="", album="Foo", title="Die, Die, Crucified", song_elapsed="2:52") == " Die, Die, Crucified"
         assert util.formatp("[[{a}][{b}]]", b=1) == "1"
 
+    def test_failed_group_drops_nested_groups(self):
+        assert util.formatp("[[{a}] {b}]x", a=1, b=0) == "x"
+        assert util.formatp("[[{a}] {b}]x", a=1, b=2) == "1 2x"
+
+    def test_escaped_values(self):
+        # Unescaping applies to the whole result, values included
+        assert util.formatp("{a}", a=r"\[") == "["
+
+    def test_compiled_once(self):
+        util.compile_formatp.cache_clear()
+        util.formatp("[{a}]", a=1)
+        util.formatp("[{a}]", a=0)
+        assert util.compile_formatp.cache_info().misses == 1
+        assert util.compile_formatp("[{a}]").string == "[{a}]"
+
     def test_complex_field(self):
         class NS:
             pass
@@ -232,3 +276,47 @@ class FormatPTests(unittest.TestCase):
         s = "[{a:.3f} m]{obj.attr}"
         assert util.formatp(s, a=3.14123456789, obj=obj) == "3.141 mbar"
         assert util.formatp(s, a=0.0, obj=obj) == "bar"
+
+
+class GraphTests(unittest.TestCase):
+    STYLES = ("blocks", "braille-fill", "braille-peak", "braille-snake")
+
+    def test_make_graph(self):
+        assert util.make_graph([0, 50, 100, 25], 0.0, 100.0) == "_▄█▂"
+        assert util.make_graph([0, 0]) == "__"
+        assert util.make_graph([0, 4, 2, 1, 0, 0, 0, 0], 0.0, 4.0, "braille-fill") == "⢸⣄"
+        with pytest.raises(NotImplementedError):
+            util.make_graph([1], style="dots")
+
+    def test_same_as_make_graph(self):
+        rng = random.Random(0)
+        for style in self.STYLES:
+            for width in (3, 4, 15, 16):
+                for upper_limit in (100.0, None):
+                    graph = util.Graph(width, 0.0, upper_limit, style)
+                    values = [0.0] * width
+                    for _ in range(3 * width):
+                        # Values above the limit change the scale
+                        value = rng.uniform(0, 150)
+                        graph.push(value)
+                        values = [value] + values[:width - 1]
+                        assert graph.draw() == util.make_graph(values, 0.0, upper_limit, style)
+
+    def test_ring_buffer(self):
+        graph = util.Graph(3, 0.0, 8.0)
+        assert graph.draw() == "___"
+        for value in (8, 4, 2, 1):
+            graph.push(value)
+        assert list(graph.values) == [1.0, 2.0, 4.0]
+        assert str(graph) == "▁▂▄"
+
+    def test_limit_changed(self):
+        graph = util.Graph(2, 0.0, 8.0)
+        graph.push(4)
+        assert graph.draw() == "▄_"
+        graph.upper_limit = 4.0
+        assert graph.draw() == "█_"
+
+    def test_unknown_style(self):
+        with pytest.raises(NotImplementedError):
+            util.Graph(3, style="dots")
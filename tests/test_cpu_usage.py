@@ -0,0 +1,163 @@
+"""
+Tests for the cpu_usage module and the /proc/stat sampler shared by the CPU modules
+"""
+
+import pytest
+
+from i3pystatus import cpu_usage, cpu_usage_bar
+
+STAT = """\
+cpu  {0} 0 0 {1} 0 0 0 0 0 0
+cpu0 {0} 0 0 {1} 0 0 0 0 0 0
+intr 358972 0 0 0 0 0 0 0
+ctxt 932708
+"""
+
+
+@pytest.fixture
+def proc_stat(tmpdir, monkeypatch):
+    path = tmpdir.join("stat")
+    stat = cpu_usage.ProcStat(str(path))
+    stat.reads = 0
+    read = stat.read
+
+    def counting_read():
+        stat.reads += 1
+        return read()
+    stat.read = counting_read
+
+    def write(busy, idle):
+        path.write(STAT.format(busy, idle))
+        # Force a new sample
+        stat.sample = None
+    stat.write = write
+    monkeypatch.setattr(cpu_usage, "proc_stat", stat)
+    return stat
+
+
+def test_read(proc_stat):
+    proc_stat.write(30, 70)
+    sample = proc_stat.read()
+    assert sample.names == ("cpu", "cpu0")
+    # Parsed when needed
+    assert sample.totals == [None, None]
+    assert sample.times(1) == (100, 30)
+    assert sample.parse() == ([100, 100], [30, 30])
+    # Shared while the cpus stay the same
+    assert proc_stat.read().names is sample.names
+
+
+def test_usage(proc_stat):
+    module = cpu_usage.CpuUsage(format="{usage_cpu0}")
+    proc_stat.write(30, 70)
+    module.run()
+    # Since boot
+    assert module.output["full_text"] == "30"
+    proc_stat.write(130, 120)
+    module.run()
+    assert module.output["full_text"] == "66"
+    assert module.data["usage"] == 66
+
+
+def test_shared_sample(proc_stat):
+    modules = [cpu_usage.CpuUsage(), cpu_usage.CpuUsage(format="{usage_all}"), cpu_usage_bar.CpuUsageBar()]
+    for busy, idle in ((30, 70), (130, 120), (130, 220)):
+        proc_stat.write(busy, idle)
+        for module in modules:
+            module.run()
+    assert proc_stat.reads == 3
+    assert [module.data["usage"] for module in modules] == [0, 0, 0]
+    assert modules[1].output["full_text"] == "cpu0:00% cpu:00%"
+
+
+def test_different_intervals(proc_stat):
+    fast, slow = cpu_usage.CpuUsage(), cpu_usage.CpuUsage()
+    proc_stat.write(0, 100)
+    fast.run()
+    slow.run()
+    proc_stat.write(100, 100)
+    fast.run()
+    proc_stat.write(100, 200)
+    fast.run()
+    slow.run()
+    assert fast.data["usage"] == 0
+    # Since its own previous update
+    assert slow.data["usage"] == 50
+
+
+def test_updated_again(proc_stat):
+    module = cpu_usage.CpuUsage()
+    proc_stat.write(0, 100)
+    module.run()
+    proc_stat.write(50, 100)
+    module.run()
+    # Within the same tick, e.g. after a click
+    module.run()
+    assert proc_stat.reads == 2
+    assert module.data["usage"] == 100
+
+
+def write_cores(path, usage):
+    """/proc/stat of len(usage) cores, busy for usage[i] of 100 USER_HZ (since boot)"""
+    lines = ["cpu  {} 0 0 {} 0 0 0 0 0 0".format(sum(usage), 100 * len(usage) - sum(usage))]
+    lines += ["cpu{} {} 0 0 {} 0 0 0 0 0 0".format(i, u, 100 - u) for i, u in enumerate(usage)]
+    path.write("\n".join(lines + ["intr 1 2 3", ""]))
+
+
+def test_many_cores(proc_stat, tmpdir):
+    write_cores(tmpdir.join("stat"), [i % 101 for i in range(12)])
+    module = cpu_usage.CpuUsage(format="{usage_all}", format_all="{core}:{usage}", exclude_average=True)
+    module.run()
+    assert module.output["full_text"] == " ".join("cpu{0}:{0}".format(i) for i in range(12))
+    # Only used formatters are computed
+    assert "usage_heat" not in module.data
+    assert module.data["usage_cpu11"] == 11
+
+
+def test_heat(proc_stat, tmpdir):
+    write_cores(tmpdir.join("stat"), [0, 100, 50, 100])
+    module = cpu_usage.CpuUsage(format="{usage_heat}")
+    module.run()
+    assert module.output["full_text"] == "▁█▅█"
+    assert "usage_all" not in module.data
+
+    module = cpu_usage.CpuUsage(format="{usage_heat}", heat_width=2)
+    module.run()
+    assert module.output["full_text"] == "▅▇"
+
+
+def test_histogram(proc_stat, tmpdir):
+    write_cores(tmpdir.join("stat"), [0, 0, 0, 100, 60, 99, 0, 0])
+    module = cpu_usage.CpuUsage(format="{usage_histogram}", histogram_bins=5)
+    module.run()
+    assert module.output["full_text"] == "▅__▁▂"
+
+
+def test_used_in_callback(proc_stat, tmpdir):
+    write_cores(tmpdir.join("stat"), [10, 20])
+    module = cpu_usage_bar.CpuUsageBar(format="{usage_bar_cpu1}", on_leftclick="notify-send {usage_bar_cpu0}")
+    module.run()
+    assert module.output["full_text"] == "██        "
+    assert module.data["usage_bar_cpu0"] == "█         "
+    assert "usage_bar_cpu" not in module.data
+
+
+def test_only_used_cpus_parsed(proc_stat, tmpdir):
+    write_cores(tmpdir.join("stat"), [50] * 64)
+    module = cpu_usage_bar.CpuUsageBar(format="{usage_bar} {usage_bar_cpu7}")
+    module.run()
+    parsed = [proc_stat.sample.names[index] for index, total in enumerate(proc_stat.sample.totals)
+              if total is not None]
+    assert parsed == ["cpu", "cpu7"]
+    assert module.output["full_text"] == "█████      █████     "
+
+
+def test_cpu_offline(proc_stat, tmpdir):
+    path = tmpdir.join("stat")
+    module = cpu_usage.CpuUsage(format="{usage_all}", format_all="{core}:{usage}")
+    path.write("cpu  40 0 0 60\ncpu0 10 0 0 40\ncpu1 30 0 0 20\nintr 1\n")
+    module.run()
+    path.write("cpu  90 0 0 110\ncpu1 80 0 0 20\nintr 1\n")
+    proc_stat.sample = None
+    module.run()
+    assert module.output["full_text"] == "cpu1:100 cpu:50"